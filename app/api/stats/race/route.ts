@@ -0,0 +1,66 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { prisma } from '@/lib/prisma'
+import { League } from '@/types'
+
+// Force dynamic rendering
+export const dynamic = 'force-dynamic'
+
+// Race to N - how often the first team to N points goes on to win, per threshold
+// (race_events is filled at ingest, so this is an indexed lookup instead of a PBP scan)
+export async function GET(request: NextRequest) {
+  try {
+    const { searchParams } = request.nextUrl
+
+    const league = searchParams.get('league') as League | null
+    const season = searchParams.get('season') || '2024-25'
+    const threshold = searchParams.get('threshold')
+
+    // Build where clause
+    const where: any = {
+      game: {
+        season,
+        gameStatus: 'FINAL',
+      },
+    }
+    if (league) where.game = { ...where.game, league }
+    if (threshold) where.threshold = parseInt(threshold)
+
+    const groups = await prisma.raceEvent.groupBy({
+      by: ['threshold', 'won'],
+      where,
+      _count: { _all: true },
+      _avg: { tToN: true, margin: true },
+    })
+
+    // Fold won / lost groups into one row per threshold
+    const byThreshold = new Map<number, { games: number, wins: number, tToN: number, margin: number }>()
+    for (const group of groups) {
+      const row = byThreshold.get(group.threshold) || { games: 0, wins: 0, tToN: 0, margin: 0 }
+      const count = group._count._all
+      row.games += count
+      if (group.won) row.wins += count
+      row.tToN += (group._avg.tToN || 0) * count
+      row.margin += (group._avg.margin || 0) * count
+      byThreshold.set(group.threshold, row)
+    }
+
+    const races = Array.from(byThreshold.entries())
+      .sort(([a], [b]) => a - b)
+      .map(([n, row]) => ({
+        threshold: n,
+        games: row.games,
+        wins: row.wins,
+        winPct: row.games > 0 ? Number(((row.wins / row.games) * 100).toFixed(2)) : 0,
+        avgTToN: row.games > 0 ? Math.round(row.tToN / row.games) : 0,
+        avgMarginAtN: row.games > 0 ? Number((row.margin / row.games).toFixed(2)) : 0,
+      }))
+
+    return NextResponse.json({ season, league, races })
+  } catch (error) {
+    console.error('Error fetching race to N stats:', error)
+    return NextResponse.json(
+      { error: 'Failed to fetch race to N stats' },
+      { status: 500 }
+    )
+  }
+}
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+R69W Distributed Backfill
+Splits a historical backfill into date-range shards that any number of worker
+processes, on one or more machines, lease and ingest in parallel
+
+The coordinator step (`plan`) writes the shards to backfill_shards and sets
+the job's global request budget in rate_budgets. Each `work` process leases
+one shard at a time (SELECT ... FOR UPDATE SKIP LOCKED), ingests its days with
+the same path as fetch_historical_data.py, and draws every ESPN request from
+the shared budget, so adding workers never exceeds the configured rate.
+
+Usage:
+    python backfill_cluster.py plan --job full-10 --seasons 10 --league mens --league womens --rate 10
+    python backfill_cluster.py work --job full-10 -c 8      # run on each node
+    python backfill_cluster.py work --job full-10 --metrics-port 9469
+    python backfill_cluster.py status --job full-10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from fetch_historical_data import get_basketball_seasons, get_specific_season, load_pbp_batch, process_day
+from r69w.batch_writer import BatchWriter
+from r69w.client import League, fetch_scoreboard
+from r69w.fetcher import ConcurrentFetcher
+from r69w.known_games import KnownGameIds
+from r69w.metrics import DEFAULT_HOST as METRICS_HOST, METRICS, MetricsExporter
+from r69w.shards import (
+    DEFAULT_LEASE_SECONDS, DEFAULT_SHARD_DAYS, GlobalRateLimiter, ShardQueue, plan_shards, set_rate_budget
+)
+from r69w.work_queue import worker_name
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+# Seconds an idle worker waits before looking for shards again (with --wait)
+IDLE_POLL_SECONDS = 30
+
+
+class LeaseLost(Exception):
+    """The shard's lease expired and another worker took it over"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distributed historical backfill")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    plan = sub.add_parser('plan', help="Create shards and the global rate budget for a job")
+    plan.add_argument('--job', required=True, help="Backfill job name")
+    scope = plan.add_mutually_exclusive_group(required=True)
+    scope.add_argument('--seasons', type=int, help="Last N seasons (1-20)")
+    scope.add_argument('--season', action='append', help="Specific season, e.g. 2015-16 (repeatable)")
+    plan.add_argument('--league', choices=[league.value for league in League], action='append',
+                      help="League to backfill (repeatable; default: mens)")
+    plan.add_argument('--shard-days', type=int, default=DEFAULT_SHARD_DAYS,
+                      help=f"Days per shard (default: {DEFAULT_SHARD_DAYS})")
+    plan.add_argument('--rate', '-r', type=float, default=5.0,
+                      help="Global request budget per second across all workers (default: 5)")
+
+    work = sub.add_parser('work', help="Lease and ingest shards until the job is done")
+    work.add_argument('--job', required=True, help="Backfill job name")
+    work.add_argument('--concurrency', '-c', type=int, default=8, help="Concurrent requests in this worker (default: 8)")
+    work.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS,
+                      help=f"Shard lease in seconds, renewed after every day (default: {DEFAULT_LEASE_SECONDS})")
+    work.add_argument('--wait', action='store_true',
+                      help="Keep polling while other workers still hold leases (takes over expired ones)")
+    work.add_argument('--metrics-file', default=None,
+                      help="Write Prometheus-format stage timings and counters here (every 15s and at exit)")
+    work.add_argument('--metrics-port', type=int, default=None,
+                      help="Serve the same metrics at http://localhost:PORT/metrics")
+    work.add_argument('--metrics-host', default=METRICS_HOST,
+                      help="Interface for --metrics-port (default: 127.0.0.1; 0.0.0.0 for all)")
+
+    status = sub.add_parser('status', help="Show shard progress for a job")
+    status.add_argument('--job', required=True, help="Backfill job name")
+    status.add_argument('--retry-failed', action='store_true', help="Requeue shards that failed too often")
+
+    return parser.parse_args()
+
+
+def connect():
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+    return psycopg2.connect(DATABASE_URL)
+
+
+def plan(args):
+    """Coordinator: partition the requested seasons into shards"""
+    if args.seasons:
+        seasons = get_basketball_seasons(max(1, min(20, args.seasons)))
+    else:
+        seasons = [get_specific_season(label) for label in args.season]
+        if not all(seasons):
+            print("❌ Invalid or future season label")
+            return
+
+    shards = plan_shards([(s['start'], s['end'], s['label']) for s in seasons], args.shard_days)
+
+    leagues = [League(value) for value in (args.league or [League.MENS.value])]
+
+    conn = connect()
+    queue = ShardQueue(conn, args.job, worker_name())
+    created = sum(queue.add(league.path, shards) for league in leagues)
+    set_rate_budget(conn, args.job, args.rate)
+    conn.close()
+
+    print(f"✅ Job '{args.job}': {len(shards) * len(leagues)} shards planned, {created} new "
+          f"({', '.join(s['label'] for s in seasons)}; {', '.join(league.value for league in leagues)})")
+    print(f"Global request budget: {args.rate:g} requests/sec")
+
+
+def work_shard(writer, fetcher, queue, shard, stats):
+    """
+    Ingest every day of a leased shard, renewing the lease after each committed day
+
+    Returns:
+        (games ingested, days whose scoreboard fetch failed)
+    """
+    known_games = KnownGameIds()
+    known_games.load(writer.cursor, shard.start_date, shard.end_date)
+    writer.flush()
+
+    games_before = stats['games']
+    scoreboards = fetcher.imap(
+        lambda day: fetch_scoreboard(day, shard.league, fetcher=fetcher),
+        shard.dates()
+    )
+    failed_days = []
+    for day, data in scoreboards:
+        if data is None:
+            failed_days.append(day)
+        else:
+            process_day(writer, fetcher, known_games, day, data.get('events', []), shard.season, stats,
+                        league=shard.league)
+            writer.flush()
+        if not queue.renew(shard):
+            raise LeaseLost(f"lease on {shard} was taken over")
+
+    return stats['games'] - games_before, failed_days
+
+
+def work(args):
+    """Worker: lease shards until none are left"""
+    conn = connect()
+    queue = ShardQueue(connect(), args.job, worker_name(), lease_seconds=args.lease)
+    limiter = GlobalRateLimiter(connect(), args.job)
+
+    stats = {'games': 0, 'cached': 0, 'r69_events': 0, 'r69w': 0, 'errors': 0,
+             'pbp_rows': 0, 'pbp_seconds': 0.0}
+
+    # Savepoint per game; commits only at day boundaries, where the lease is renewed
+    writer = BatchWriter(
+        conn, max_games=None, max_seconds=None,
+        load_pbp=lambda cursor, rows, blocks: load_pbp_batch(cursor, rows, stats, blocks)
+    )
+    shards_done = 0
+    start = time.perf_counter()
+
+    print(f"Worker {queue.worker} on job '{args.job}' ({args.concurrency} concurrent, shared budget)")
+
+    with MetricsExporter(path=args.metrics_file, port=args.metrics_port, host=args.metrics_host), \
+            ConcurrentFetcher(concurrency=args.concurrency, limiter=limiter) as fetcher:
+        while True:
+            shard = queue.lease()
+            if shard is None:
+                counts = queue.status()
+                if args.wait and 'leased' in counts:
+                    time.sleep(IDLE_POLL_SECONDS)
+                    continue
+                break
+
+            print(f"\n{'='*60}")
+            print(f"SHARD: {shard} (season {shard.season}, attempt {shard.attempts + 1})")
+            print(f"{'='*60}")
+
+            try:
+                games, failed_days = work_shard(writer, fetcher, queue, shard, stats)
+            except LeaseLost as e:
+                writer.rollback()
+                print(f"  ⚠ {e}")
+                continue
+            except KeyboardInterrupt:
+                writer.rollback()
+                queue.release(shard)
+                raise
+            except Exception as e:
+                writer.rollback()
+                print(f"  ❌ Shard failed: {e}")
+                stats['errors'] += 1
+                queue.fail(shard, e)
+                continue
+
+            if failed_days:
+                # The other days are committed; a retry skips their games via known_games
+                days = ', '.join(day.strftime('%Y-%m-%d') for day in failed_days)
+                print(f"  ❌ Scoreboard fetch failed for {len(failed_days)} day(s): {days}")
+                stats['errors'] += 1
+                queue.fail(shard, f"scoreboard fetch failed: {days}")
+                continue
+
+            queue.complete(shard, games)
+            shards_done += 1
+
+    writer.close()
+    conn.close()
+    limiter.close()
+    queue.conn.close()
+
+    elapsed = time.perf_counter() - start
+    print("\n" + "=" * 80)
+    print("📊 WORKER SUMMARY")
+    print("=" * 80)
+    print(f"Shards completed: {shards_done}")
+    print(f"Games ingested: {stats['games']}")
+    print(f"Games skipped (cached): {stats['cached']}")
+    print(f"R69 events: {stats['r69_events']} (R69W: {stats['r69w']})")
+    print(f"PBP events loaded: {stats['pbp_rows']}")
+    print(f"Errors: {stats['errors']}")
+    if elapsed > 0:
+        print(f"Elapsed: {elapsed:.1f}s ({stats['games'] / elapsed:.1f} games/sec)")
+    for line in METRICS.summary_lines():
+        print(f"  {line}")
+    print("=" * 80)
+
+
+def status(args):
+    """Print shard counts for a job"""
+    conn = connect()
+    queue = ShardQueue(conn, args.job, worker_name())
+    if args.retry_failed:
+        print(f"Requeued {queue.retry_failed()} failed shards")
+
+    counts = queue.status()
+    conn.close()
+
+    if not counts:
+        print(f"No shards for job '{args.job}'")
+        return
+
+    total = sum(count for count, _ in counts.values())
+    print(f"Job '{args.job}': {total} shards")
+    for state in ('pending', 'leased', 'done', 'failed'):
+        count, games = counts.get(state, (0, 0))
+        print(f"  {state:<8} {count:>5}" + (f"  ({games} games)" if state == 'done' else ""))
+
+
+def main():
+    args = parse_args()
+
+    print("\n" + "=" * 80)
+    print("🏀 R69W DISTRIBUTED BACKFILL")
+    print("=" * 80)
+
+    {'plan': plan, 'work': work, 'status': status}[args.command](args)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+R69W Clock Parser Benchmark
+Per-play cost of the table-backed clock parser (r69w.clock) against the
+split-and-int() parsing it replaced
+
+The workload is a stream of clock displays shaped like real play-by-play:
+"MM:SS" through each half and overtime, "SS.s" tenths in the last minute.
+
+Usage:
+    python benchmark_clock.py
+    python benchmark_clock.py --plays 1000000 --repeat 7
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from r69w.clock import calculate_elapsed_time, convert_clock_to_seconds
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def naive_clock_to_seconds(clock_display):
+    """The previous parser: partition on ':' and int() both halves on every call"""
+    if not clock_display or clock_display == '0:00':
+        return 0
+    minutes, sep, seconds = clock_display.partition(':')
+    if not sep:
+        return 0
+    try:
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return 0
+
+
+def naive_elapsed_time(period_num, clock_display):
+    """The previous elapsed-time calculation (halves, 5 minute overtimes)"""
+    remaining = naive_clock_to_seconds(clock_display)
+    if period_num == 1:
+        return 1200 - remaining
+    if period_num == 2:
+        return 1200 + (1200 - remaining)
+    return 2400 + (period_num - 2) * 300 + (300 - remaining)
+
+
+def sample_clocks(n_plays, seed=69):
+    """(period, clock display) pairs with roughly play-by-play's mix of displays"""
+    rng = random.Random(seed)
+    plays = []
+    for _ in range(n_plays):
+        period = rng.choice((1, 1, 1, 2, 2, 2, 3))
+        length = 1200 if period <= 2 else 300
+        remaining = rng.uniform(0, length)
+        if remaining < 60:
+            display = f"{remaining:.1f}"
+        else:
+            display = f"{int(remaining) // 60}:{int(remaining) % 60:02d}"
+        plays.append((period, display))
+    return plays
+
+
+def per_play_ns(fn, plays, repeat):
+    """Best-of-`repeat` time for one pass over the plays, in ns per play"""
+    best = min(timeit.repeat(lambda: fn(plays), number=1, repeat=repeat))
+    return best / len(plays) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared clock parser")
+    parser.add_argument('--plays', type=int, default=500000, help="Clock displays per pass (default: 500000)")
+    parser.add_argument('--repeat', type=int, default=5, help="Passes; the best one is reported (default: 5)")
+    args = parser.parse_args()
+
+    plays = sample_clocks(args.plays)
+    displays = [display for _, display in plays]
+
+    cases = [
+        ("clock -> seconds remaining",
+         lambda _: [naive_clock_to_seconds(d) for d in displays],
+         lambda _: [convert_clock_to_seconds(d) for d in displays]),
+        ("period + clock -> elapsed",
+         lambda ps: [naive_elapsed_time(p, d) for p, d in ps],
+         lambda ps: [calculate_elapsed_time(p, d) for p, d in ps]),
+    ]
+
+    print("=" * 80)
+    print(f"⏱  Clock parser benchmark: {args.plays:,} plays, best of {args.repeat}")
+    print("=" * 80)
+    print(f"{'Case':<28} {'Before ns':>10} {'After ns':>10} {'Speedup':>8}")
+    for name, before, after in cases:
+        before_ns = per_play_ns(before, plays, args.repeat)
+        after_ns = per_play_ns(after, plays, args.repeat)
+        print(f"{name:<28} {before_ns:>10.1f} {after_ns:>10.1f} {before_ns / after_ns:>7.2f}x")
+
+    # Sub-minute displays are where the previous parser returned 0
+    tenths = [d for d in displays if ':' not in d]
+    print()
+    print(f"Sub-minute displays: {len(tenths):,} "
+          f"({len(tenths) / len(displays) * 100:.1f}%), previously parsed as 0:00")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
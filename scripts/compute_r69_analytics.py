@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+R69 Analytics Batch Job
+Precomputes r69_analytics (pace index, lead duration, swing margin,
+comeback69L, possessions, pace rating) for every final game
+
+Play-by-play is streamed from pbp_events in one ordered pass (server-side
+cursor) and handled --batch-size games at a time as NumPy arrays; each batch
+is upserted with a single statement and committed. Metric definitions follow
+lib/analytics.ts so the API can read stored values instead of recomputing
+them from raw plays.
+
+With --recompute-r69 the same pass also re-detects each game's R69 event
+from its stored plays (columnar first-to-69 over the batch arrays, see
+r69w.columnar) and replaces the r69_events rows that changed, so an
+algorithm fix can be applied to the full history without refetching.
+--race-events fills race_events (first team to 20, 40, ... 100 points) the
+same way, e.g. for games ingested before the table existed.
+
+Usage:
+    python compute_r69_analytics.py
+    python compute_r69_analytics.py --missing-only
+    python compute_r69_analytics.py --season 2024-25 --league womens
+    python compute_r69_analytics.py --recompute-r69
+    python compute_r69_analytics.py --race-events --season 2024-25
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from r69w.analytics import SIDE_AWAY, SIDE_HOME, SIDE_NONE, compute_analytics, upsert_analytics
+from r69w.clock import period_lengths
+from r69w.columnar import (
+    detect_r69_columnar, detect_race_columnar, elapsed_by_game, offsets_from_index, r69_event_at
+)
+from r69w.detector import r69_outcome
+from r69w.writer import delete_r69_events, insert_r69_event, race_event_rows, upsert_race_events
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+# Rows pulled per round trip from the server-side play-by-play cursor
+PBP_FETCH_SIZE = 20000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute r69_analytics for final games")
+    parser.add_argument('--season', action='append', default=[],
+                        help="Only games from this season, e.g. 2024-25 (repeatable)")
+    parser.add_argument('--league', choices=('mens', 'womens'), default=None,
+                        help="Only games from this league (default: both)")
+    parser.add_argument('--missing-only', action='store_true',
+                        help="Skip games that already have an r69_analytics row")
+    parser.add_argument('--recompute-r69', action='store_true',
+                        help="Re-detect R69 events from stored play-by-play and replace those that changed")
+    parser.add_argument('--race-events', action='store_true',
+                        help="(Re)compute race_events (first to each threshold) from stored play-by-play")
+    parser.add_argument('--batch-size', type=int, default=500, help="Games per upsert/commit (default: 500)")
+    return parser.parse_args()
+
+
+def game_filter(args):
+    """WHERE clause and params selecting the games to compute"""
+    clauses = ["g.game_status = 'final'"]
+    params = []
+    if args.season:
+        clauses.append("g.season = ANY(%s)")
+        params.append(args.season)
+    if args.league:
+        clauses.append("g.league = %s")
+        params.append(args.league)
+    if args.missing_only:
+        clauses.append("NOT EXISTS (SELECT 1 FROM r69_analytics a WHERE a.game_id = g.id)")
+    return ' AND '.join(clauses), params
+
+
+def load_games(conn, where, params):
+    """
+    Final games with their first R69 event
+
+    Returns:
+        Dict of games.id -> game dict (see r69w.analytics.compute_analytics,
+        plus team IDs, names and period lengths for --recompute-r69)
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT g.id, g.home_score, g.away_score, g.final_margin,
+               e.t_to_69, e.team_id = g.home_team_id, e.margin_at_69, e.r69w,
+               g.home_team_id, g.away_team_id, g.home_team_name, g.away_team_name, g.league
+        FROM games g
+        LEFT JOIN LATERAL (
+            SELECT t_to_69, team_id, margin_at_69, r69w
+            FROM r69_events
+            WHERE game_id = g.id
+            ORDER BY t_to_69
+            LIMIT 1
+        ) e ON TRUE
+        WHERE {where}
+    """, params)
+
+    games = {}
+    for (game_id, home_score, away_score, final_margin, t_to_69, is_home, margin_at_69, r69w,
+         home_team_id, away_team_id, home_team_name, away_team_name, league) in cursor:
+        r69 = None
+        if t_to_69 is not None:
+            r69 = {'t_to_69': t_to_69, 'is_home': is_home, 'margin_at_69': margin_at_69, 'r69w': r69w}
+        games[game_id] = {
+            'game_id': game_id,
+            'home_score': home_score or 0,
+            'away_score': away_score or 0,
+            'final_margin': final_margin,
+            'r69': r69,
+            'home_team_id': home_team_id,
+            'away_team_id': away_team_id,
+            'home_team_name': home_team_name,
+            'away_team_name': away_team_name,
+            'lengths': period_lengths(league),
+        }
+    cursor.close()
+    return games
+
+
+def iter_pbp_batches(conn, where, params, batch_size, games):
+    """
+    Stream play-by-play for the selected games, batch_size games at a time
+
+    Rows for games not in `games` (e.g. finalized after load_games ran) are
+    skipped. The cursor is WITH HOLD so it survives the per-batch commits.
+
+    Yields:
+        (game_ids, game_index, elapsed, home_score, away_score, possession_side,
+        period, clock_seconds, sequence_number) with rows ordered by game then
+        sequence number
+    """
+    cursor = conn.cursor(name='r69_analytics_pbp', withhold=True)
+    cursor.itersize = PBP_FETCH_SIZE
+    cursor.execute(f"""
+        SELECT p.game_id, p.elapsed_seconds, p.home_score, p.away_score,
+               CASE WHEN p.event_type NOT LIKE '%%shot%%' AND p.event_type NOT LIKE '%%turnover%%' THEN {SIDE_NONE}
+                    WHEN p.team_id = g.home_team_id THEN {SIDE_HOME}
+                    WHEN p.team_id = g.away_team_id THEN {SIDE_AWAY}
+                    ELSE {SIDE_NONE} END,
+               p.period, p.clock_seconds, p.sequence_number
+        FROM pbp_events p
+        JOIN games g ON g.id = p.game_id
+        WHERE {where}
+        ORDER BY p.game_id, p.sequence_number
+    """, params)
+
+    def empty():
+        return [], [], [], [], [], [], [], [], []
+
+    batch = empty()
+    for game_id, elapsed, home_score, away_score, side, period, clock_seconds, sequence_number in cursor:
+        if game_id not in games:
+            continue
+        game_ids, game_index = batch[0], batch[1]
+        if not game_ids or game_ids[-1] != game_id:
+            if len(game_ids) >= batch_size:
+                yield batch
+                batch = empty()
+                game_ids, game_index = batch[0], batch[1]
+            game_ids.append(game_id)
+        game_index.append(len(game_ids) - 1)
+        batch[2].append(elapsed)
+        batch[3].append(home_score)
+        batch[4].append(away_score)
+        batch[5].append(side)
+        batch[6].append(period)
+        batch[7].append(clock_seconds)
+        batch[8].append(sequence_number)
+
+    if batch[0]:
+        yield batch
+    cursor.close()
+
+
+def play_descriptions(cursor, keys):
+    """Description of each (game_id, sequence_number) play, in one query"""
+    if not keys:
+        return {}
+    game_ids, sequences = zip(*keys)
+    cursor.execute("""
+        SELECT p.game_id, p.description
+        FROM pbp_events p
+        JOIN unnest(%s::text[], %s::int[]) AS k(game_id, sequence_number)
+          ON p.game_id = k.game_id AND p.sequence_number = k.sequence_number
+    """, (list(game_ids), list(sequences)))
+    return dict(cursor.fetchall())
+
+
+def r69_changed(stored, event):
+    """True if a re-detected event (or its absence) differs from the stored one"""
+    if stored is None or event is None:
+        return (stored is None) != (event is None)
+    return (stored['t_to_69'], bool(stored['is_home']), stored['margin_at_69']) != \
+        (event['t_to_69'], event['team_is_home'], event['margin_at_69'])
+
+
+def recompute_r69(cursor, batch_games, game_index, home_score, away_score, period, clock_seconds, sequence,
+                  stats):
+    """
+    Re-detect R69 for a batch of games and replace the stored events that changed
+
+    Detection runs over the whole batch at once (r69w.columnar); only games
+    whose result differs are written. Each game's `r69` entry is updated so
+    the analytics computed afterwards use the new event.
+    """
+    start = time.perf_counter()
+    offsets = offsets_from_index(game_index, len(batch_games))
+    elapsed = elapsed_by_game(period, clock_seconds, offsets, [game['lengths'] for game in batch_games])
+    columns = detect_r69_columnar(offsets, home_score, away_score, elapsed, period)
+    stats['detect_seconds'] += time.perf_counter() - start
+    stats['plays'] += len(game_index)
+
+    changed = []
+    for i, game in enumerate(batch_games):
+        event = r69_event_at(columns, i, game['home_team_id'], game['away_team_id'])
+        if r69_changed(game['r69'], event):
+            changed.append((i, game, event))
+
+    descriptions = play_descriptions(cursor, [
+        (game['game_id'], sequence[columns['row'][i]]) for i, game, event in changed if event
+    ])
+
+    for i, game, event in changed:
+        game_id = game['game_id']
+        delete_r69_events(cursor, game_id)
+
+        if event is None:
+            game['r69'] = None
+            stats['r69_removed'] += 1
+            continue
+
+        event['description'] = descriptions.get(game_id, '')
+        event['team_name'] = game['home_team_name'] if event['team_is_home'] else game['away_team_name']
+        insert_r69_event(cursor, game_id, event, game['home_score'], game['away_score'])
+
+        r69w, _ = r69_outcome(event, game['home_score'], game['away_score'])
+        stats['r69_added' if game['r69'] is None else 'r69_changed'] += 1
+        game['r69'] = {'t_to_69': event['t_to_69'], 'is_home': event['team_is_home'],
+                       'margin_at_69': event['margin_at_69'], 'r69w': r69w}
+
+
+def race_rows(batch_games, game_index, home_score, away_score, period, clock_seconds, stats):
+    """race_events rows for a batch of games, every threshold detected over the batch at once"""
+    start = time.perf_counter()
+    offsets = offsets_from_index(game_index, len(batch_games))
+    elapsed = elapsed_by_game(period, clock_seconds, offsets, [game['lengths'] for game in batch_games])
+    by_threshold = detect_race_columnar(offsets, home_score, away_score, elapsed, period)
+    stats['detect_seconds'] += time.perf_counter() - start
+
+    rows = []
+    for i, game in enumerate(batch_games):
+        race_events = {}
+        for threshold, columns in by_threshold.items():
+            event = r69_event_at(columns, i, game['home_team_id'], game['away_team_id'])
+            if event:
+                race_events[threshold] = event
+        rows.extend(race_event_rows(game['game_id'], race_events, game['home_score'], game['away_score']))
+    return rows
+
+
+def main():
+    args = parse_args()
+
+    print("\n" + "=" * 80)
+    print("🏀 R69 ANALYTICS BATCH JOB")
+    print("=" * 80)
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        print("\n✅ Connected to database")
+    except Exception as e:
+        print(f"\n❌ Database connection failed: {e}")
+        return
+
+    start = time.perf_counter()
+    where, params = game_filter(args)
+    games = load_games(conn, where, params)
+    print(f"Final games selected: {len(games)}")
+
+    if not games:
+        conn.close()
+        return
+
+    stats = {'games': 0, 'with_r69': 0, 'without_pbp': 0,
+             'plays': 0, 'detect_seconds': 0.0, 'r69_added': 0, 'r69_changed': 0, 'r69_removed': 0,
+             'race_events': 0}
+    seen = set()
+    write_cursor = conn.cursor()
+
+    def write(batch_games, *arrays):
+        rows = compute_analytics(batch_games, *arrays)
+        upsert_analytics(write_cursor, rows)
+        conn.commit()
+        stats['games'] += len(rows)
+        stats['with_r69'] += sum(1 for g in batch_games if g['r69'])
+        print(f"  ✓ {stats['games']}/{len(games)} games")
+
+    for game_ids, game_index, elapsed, home, away, side, period, clock, sequence in iter_pbp_batches(
+            conn, where, params, args.batch_size, games):
+        seen.update(game_ids)
+        batch_games = [games[g] for g in game_ids]
+        if args.recompute_r69:
+            recompute_r69(write_cursor, batch_games, game_index, home, away, period, clock, sequence, stats)
+        if args.race_events:
+            stats['race_events'] += upsert_race_events(
+                write_cursor, race_rows(batch_games, game_index, home, away, period, clock, stats))
+        write(batch_games, game_index, elapsed, home, away, side)
+
+    # Games without play-by-play still get nice_score / double_nice
+    remaining = [game for game_id, game in games.items() if game_id not in seen]
+    stats['without_pbp'] = len(remaining)
+    for i in range(0, len(remaining), args.batch_size):
+        write(remaining[i:i + args.batch_size], [], [], [], [], [])
+
+    write_cursor.close()
+    conn.close()
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "=" * 80)
+    print("📊 SUMMARY")
+    print("=" * 80)
+    print(f"Analytics rows written: {stats['games']}")
+    print(f"Games with R69 event: {stats['with_r69']}")
+    print(f"Games without PBP: {stats['without_pbp']}")
+    if args.recompute_r69:
+        print(f"R69 events re-detected over {stats['plays']:,} plays")
+        print(f"R69 events added: {stats['r69_added']}, changed: {stats['r69_changed']}, "
+              f"removed: {stats['r69_removed']}")
+    if args.race_events:
+        print(f"Race events written: {stats['race_events']}")
+    if stats['detect_seconds']:
+        print(f"Detection: {stats['detect_seconds']:.2f}s")
+    if elapsed > 0:
+        print(f"Elapsed: {elapsed:.1f}s ({stats['games'] / elapsed:.1f} games/sec)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
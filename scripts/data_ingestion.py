@@ -3,19 +3,18 @@ R69W Data Ingestion Pipeline
 Fetches NCAA basketball game data from ESPN API and processes R69 events
 """
 
-import requests
-import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import time
-import os
 from dataclasses import dataclass
 from enum import Enum
 
-
-class League(Enum):
-    MENS = "mens"
-    WOMENS = "womens"
+from r69w.client import ESPNAPIClient, League, extract_plays
+from r69w.clock import HALVES, PeriodLengths, calculate_elapsed_time, period_lengths
+from r69w.detector import R69_TARGET, IncrementalR69Detector, detect_r69_event
+from r69w.metrics import METRICS
+from r69w.parser import parse_plays
+from r69w.writer import GAME_STATUS_MAP, PBP_COLUMNS
 
 
 class GameStatus(Enum):
@@ -38,162 +37,114 @@ class R69Event:
     final_margin: Optional[int] = None
 
 
-class ESPNAPIClient:
-    """Client for fetching data from ESPN's hidden API"""
-    
-    BASE_URL = "https://site.api.espn.com/apis/site/v2/sports/basketball"
-    
-    def __init__(self, league: League = League.MENS):
-        self.league = league
-        self.league_path = "mens-college-basketball" if league == League.MENS else "womens-college-basketball"
-    
-    def get_scoreboard(self, date: Optional[datetime] = None) -> Dict:
-        """
-        Fetch scoreboard for a given date
-        
-        Args:
-            date: Date to fetch (defaults to today)
-            
-        Returns:
-            JSON response with game data
-        """
-        if date is None:
-            date = datetime.now()
-        
-        date_str = date.strftime("%Y%m%d")
-        url = f"{self.BASE_URL}/{self.league_path}/scoreboard"
-        
-        params = {
-            "dates": date_str,
-            "limit": 100
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching scoreboard: {e}")
-            return {"events": []}
-    
-    def get_play_by_play(self, game_id: str) -> Dict:
-        """
-        Fetch play-by-play data for a specific game
-        
-        Args:
-            game_id: ESPN game ID
-            
-        Returns:
-            JSON response with play-by-play data
-        """
-        url = f"{self.BASE_URL}/{self.league_path}/summary"
-        params = {"event": game_id}
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching play-by-play for game {game_id}: {e}")
-            return {}
+class Play:
+    """
+    One processed play, shaped like a pbp_events row
+
+    Fixed slots instead of a 12-key dict per play, built from the same row
+    r69w.parser.parse_plays writes for every other ingestion path, so the raw
+    summary can be released as soon as a game is parsed.
+    """
+
+    __slots__ = PBP_COLUMNS[1:]
+
+    def __init__(self, sequence_number, period, clock_seconds, elapsed_seconds, team_id, player_name,
+                 event_type, points_scored, home_score, away_score, description):
+        self.sequence_number = sequence_number
+        self.period = period
+        self.clock_seconds = clock_seconds
+        self.elapsed_seconds = elapsed_seconds
+        self.team_id = team_id
+        self.player_name = player_name
+        self.event_type = event_type
+        self.points_scored = points_scored
+        self.home_score = home_score
+        self.away_score = away_score
+        self.description = description
+
+    def row(self, game_db_id) -> Tuple:
+        """pbp_events row tuple (PBP_COLUMNS order)"""
+        return (game_db_id, self.sequence_number, self.period, self.clock_seconds, self.elapsed_seconds,
+                self.team_id, self.player_name, self.event_type, self.points_scored,
+                self.home_score, self.away_score, self.description)
 
 
 class R69Detector:
     """Detects Race-to-69 events from play-by-play data"""
     
     @staticmethod
-    def convert_clock_to_seconds(clock: str, period: int, regulation_period_length: int = 1200) -> int:
+    def convert_clock_to_seconds(clock: str, period: int, lengths: PeriodLengths = HALVES) -> int:
         """
         Convert game clock to elapsed seconds
         
         Args:
             clock: Clock string (e.g., "12:30")
-            period: Period number (1, 2, or OT)
-            regulation_period_length: Length of regulation period in seconds (20 min = 1200s)
+            period: Period number (half, quarter or OT)
+            lengths: Game's PeriodLengths (QUARTERS for women's games)
             
         Returns:
             Total elapsed seconds from start of game
         """
-        try:
-            parts = clock.split(":")
-            minutes = int(parts[0])
-            seconds = int(parts[1])
-            remaining_in_period = minutes * 60 + seconds
-            
-            # Calculate elapsed time
-            if period == 1:
-                elapsed = regulation_period_length - remaining_in_period
-            elif period == 2:
-                elapsed = regulation_period_length + (regulation_period_length - remaining_in_period)
-            else:  # Overtime (5 min periods)
-                ot_number = period - 2
-                elapsed = (regulation_period_length * 2) + (ot_number * 300) + (300 - remaining_in_period)
-            
-            return max(0, elapsed)
-        except (ValueError, IndexError):
-            return 0
+        return max(0, calculate_elapsed_time(period, clock, lengths))
     
     @staticmethod
-    def detect_r69_event(plays: List[Dict], home_team_id: str, away_team_id: str) -> Optional[R69Event]:
+    def detect_r69_event(plays: List[Dict], home_team_id: str, away_team_id: str,
+                         home_team_name: str = "Home Team", away_team_name: str = "Away Team",
+                         lengths: PeriodLengths = HALVES) -> Optional[R69Event]:
         """
-        Detect when a team first reaches 69 points while leading
+        Detect when a team first reaches 69 points (regardless of whether leading)
         
         Args:
             plays: List of play-by-play events
             home_team_id: Home team ID
             away_team_id: Away team ID
+            home_team_name: Home team display name
+            away_team_name: Away team display name
+            lengths: Game's PeriodLengths (QUARTERS for women's games)
             
         Returns:
             R69Event if detected, None otherwise
         """
-        if not plays:
+        event = detect_r69_event(plays, home_team_id, away_team_id, lengths)
+        if event is None:
             return None
-        
-        r69_triggered = False
-        
-        for i, play in enumerate(plays):
-            # Extract scores from play
-            home_score = play.get("homeScore", 0)
-            away_score = play.get("awayScore", 0)
-            
-            # Check if home team hit 69 first while leading
-            if home_score >= 69 and away_score < 69 and home_score > away_score and not r69_triggered:
-                elapsed = R69Detector.convert_clock_to_seconds(
-                    play.get("clock", {}).get("displayValue", "0:00"),
-                    play.get("period", {}).get("number", 1)
-                )
-                
-                r69_event = R69Event(
-                    team_id=home_team_id,
-                    team_name=play.get("homeTeamName", "Home Team"),
-                    t_to_69=elapsed,
-                    period_at_69=play.get("period", {}).get("number", 1),
-                    margin_at_69=home_score - away_score,
-                    score_at_69_opponent=away_score,
-                    play_description=play.get("text", "")
-                )
-                return r69_event
-            
-            # Check if away team hit 69 first while leading
-            if away_score >= 69 and home_score < 69 and away_score > home_score and not r69_triggered:
-                elapsed = R69Detector.convert_clock_to_seconds(
-                    play.get("clock", {}).get("displayValue", "0:00"),
-                    play.get("period", {}).get("number", 1)
-                )
-                
-                r69_event = R69Event(
-                    team_id=away_team_id,
-                    team_name=play.get("awayTeamName", "Away Team"),
-                    t_to_69=elapsed,
-                    period_at_69=play.get("period", {}).get("number", 1),
-                    margin_at_69=away_score - home_score,
-                    score_at_69_opponent=home_score,
-                    play_description=play.get("text", "")
-                )
-                return r69_event
-        
+        return R69Detector.to_r69_event(event, home_team_name, away_team_name)
+    
+    @staticmethod
+    def detect_from_plays(plays: List[Play], home_team_id: str, away_team_id: str,
+                          home_team_name: str = "Home Team", away_team_name: str = "Away Team") -> Optional[R69Event]:
+        """detect_r69_event over processed Play records instead of raw ESPN plays"""
+        for play in plays:
+            home_score, away_score = play.home_score, play.away_score
+            if home_score >= R69_TARGET:
+                team_id, team_name, team_score, opponent_score = home_team_id, home_team_name, home_score, away_score
+            elif away_score >= R69_TARGET:
+                team_id, team_name, team_score, opponent_score = away_team_id, away_team_name, away_score, home_score
+            else:
+                continue
+            return R69Event(
+                team_id=team_id,
+                team_name=team_name,
+                t_to_69=play.elapsed_seconds,
+                period_at_69=play.period,
+                margin_at_69=team_score - opponent_score,
+                score_at_69_opponent=opponent_score,
+                play_description=play.description
+            )
         return None
+    
+    @staticmethod
+    def to_r69_event(event: Dict, home_team_name: str = "Home Team", away_team_name: str = "Away Team") -> R69Event:
+        """Wrap a detected event dict (see r69w.detector) as an R69Event"""
+        return R69Event(
+            team_id=event["team_id"],
+            team_name=home_team_name if event["team_is_home"] else away_team_name,
+            t_to_69=max(0, event["t_to_69"]),
+            period_at_69=event["period"],
+            margin_at_69=event["margin_at_69"],
+            score_at_69_opponent=event["opponent_score"],
+            play_description=event["description"]
+        )
 
 
 class GameProcessor:
@@ -201,7 +152,11 @@ class GameProcessor:
     
     def __init__(self, api_client: ESPNAPIClient):
         self.api_client = api_client
+        # Halves for men's games, quarters for women's
+        self.lengths = period_lengths(api_client.league)
         self.detector = R69Detector()
+        # Streaming R69 state per in-progress game (see process_live_play_by_play)
+        self.live_detectors: Dict[str, IncrementalR69Detector] = {}
     
     def process_game(self, game_data: Dict) -> Dict:
         """
@@ -244,16 +199,20 @@ class GameProcessor:
             "final_margin": abs(int(home_team.get("score", 0)) - int(away_team.get("score", 0))),
             
             "game_status": self._map_game_status(status.get("type", {}).get("name")),
-            "overtime_flag": status.get("period", 2) > 2,
-            "total_periods": status.get("period", 2)
+            "overtime_flag": status.get("period", self.lengths.periods) > self.lengths.periods,
+            "total_periods": status.get("period", self.lengths.periods)
         }
         
         return processed_game
     
-    def process_play_by_play(self, game_id: str) -> Tuple[List[Dict], Optional[R69Event]]:
+    def process_play_by_play(self, game_id: str) -> Tuple[List[Play], Optional[R69Event]]:
         """
         Process play-by-play data and detect R69 event
         
+        Only the compact Play records outlive this call: the raw summary is
+        dropped once the header and plays have been read, and detection runs
+        over the records.
+        
         Args:
             game_id: ESPN game ID
             
@@ -265,54 +224,77 @@ class GameProcessor:
         if not pbp_data:
             return [], None
         
-        plays = []
-        all_plays_raw = []
+        home_team, away_team = self._header_teams(pbp_data)
+        home_id, home_name = home_team.get("id"), home_team.get("team", {}).get("displayName", "Home Team")
+        away_id, away_name = away_team.get("id"), away_team.get("team", {}).get("displayName", "Away Team")
+        
+        with METRICS.time('parse'):
+            plays = [Play(*row) for row in parse_plays(extract_plays(pbp_data), self.lengths)]
         
-        # Extract plays from all drives
-        for drive in pbp_data.get("drives", {}).get("previous", []):
-            for play in drive.get("plays", []):
-                all_plays_raw.append(play)
+        # Release the raw payload before detection
+        del pbp_data, home_team, away_team
+        
+        with METRICS.time('detect'):
+            r69_event = self.detector.detect_from_plays(plays, home_id, away_id, home_name, away_name)
+        
+        return plays, r69_event
+    
+    def process_live_play_by_play(self, game_id: str) -> Tuple[List[Play], Optional[R69Event]]:
+        """
+        Incrementally process an in-progress game
         
-        # Current drive
-        current_drive = pbp_data.get("drives", {}).get("current", {})
-        for play in current_drive.get("plays", []):
-            all_plays_raw.append(play)
+        Each game keeps an IncrementalR69Detector, so only plays after the
+        last seen sequenceNumber are processed on each poll and the R69 event
+        is returned exactly once, on the poll where it happens.
         
-        # Process each play
-        for i, play in enumerate(all_plays_raw):
-            processed_play = {
-                "sequence_number": i,
-                "period": play.get("period", {}).get("number", 1),
-                "clock_seconds": self._parse_clock(play.get("clock", {}).get("displayValue", "0:00")),
-                "elapsed_seconds": R69Detector.convert_clock_to_seconds(
-                    play.get("clock", {}).get("displayValue", "0:00"),
-                    play.get("period", {}).get("number", 1)
-                ),
-                "team_id": play.get("team", {}).get("id"),
-                "player_name": self._extract_player_name(play),
-                "event_type": play.get("type", {}).get("text", "unknown"),
-                "points_scored": self._extract_points(play),
-                "home_score": play.get("homeScore", 0),
-                "away_score": play.get("awayScore", 0),
-                "description": play.get("text", "")
-            }
-            plays.append(processed_play)
+        Args:
+            game_id: ESPN game ID
+            
+        Returns:
+            Tuple of (new_processed_plays, r69_event_if_it_just_happened)
+        """
+        pbp_data = self.api_client.get_play_by_play(game_id)
         
-        # Detect R69 event
+        if not pbp_data:
+            return [], None
+        
+        detector = self.live_detectors.get(game_id)
+        home_team, away_team = self._header_teams(pbp_data)
+        if detector is None:
+            detector = IncrementalR69Detector(home_team.get("id"), away_team.get("id"), self.lengths)
+            self.live_detectors[game_id] = detector
+        
+        all_plays_raw = extract_plays(pbp_data)
+        offset = detector.plays_seen
+        fresh = detector.new_plays(all_plays_raw)
+        with METRICS.time('parse'):
+            plays = [Play(*row) for row in parse_plays(fresh, self.lengths, start=offset)]
+        
+        with METRICS.time('detect'):
+            event = detector.feed(fresh)
+        if event is None:
+            return plays, None
+        
+        r69_event = self.detector.to_r69_event(
+            event,
+            home_team.get("team", {}).get("displayName", "Home Team"),
+            away_team.get("team", {}).get("displayName", "Away Team")
+        )
+        return plays, r69_event
+    
+    def finish_live_game(self, game_id: str) -> Optional[IncrementalR69Detector]:
+        """Drop (and return) the live detector state for a game that has ended"""
+        return self.live_detectors.pop(game_id, None)
+    
+    def _header_teams(self, pbp_data: Dict) -> Tuple[Dict, Dict]:
+        """(home, away) competitors from a summary header"""
         header = pbp_data.get("header", {})
         competitions = header.get("competitions", [{}])[0]
         competitors = competitions.get("competitors", [])
         
         home_team = next((c for c in competitors if c.get("homeAway") == "home"), {})
         away_team = next((c for c in competitors if c.get("homeAway") == "away"), {})
-        
-        r69_event = self.detector.detect_r69_event(
-            all_plays_raw,
-            home_team.get("id"),
-            away_team.get("id")
-        )
-        
-        return plays, r69_event
+        return home_team, away_team
     
     def _determine_game_type(self, game_data: Dict) -> str:
         """Determine if game is regular season, conference, or tournament"""
@@ -330,36 +312,7 @@ class GameProcessor:
     
     def _map_game_status(self, status_name: str) -> str:
         """Map ESPN status to our GameStatus enum"""
-        status_map = {
-            "STATUS_SCHEDULED": "scheduled",
-            "STATUS_IN_PROGRESS": "in_progress",
-            "STATUS_FINAL": "final",
-            "STATUS_POSTPONED": "postponed",
-            "STATUS_CANCELED": "canceled"
-        }
-        return status_map.get(status_name, "scheduled")
-    
-    def _parse_clock(self, clock_str: str) -> int:
-        """Parse clock string to seconds remaining"""
-        try:
-            parts = clock_str.split(":")
-            minutes = int(parts[0])
-            seconds = int(parts[1])
-            return minutes * 60 + seconds
-        except (ValueError, IndexError):
-            return 0
-    
-    def _extract_player_name(self, play: Dict) -> Optional[str]:
-        """Extract player name from play"""
-        athletes = play.get("athletesInvolved", [])
-        if athletes:
-            return athletes[0].get("displayName")
-        return None
-    
-    def _extract_points(self, play: Dict) -> int:
-        """Extract points scored from play"""
-        score_value = play.get("scoreValue", 0)
-        return score_value if score_value else 0
+        return GAME_STATUS_MAP.get(status_name, "scheduled")
 
 
 def main():
@@ -380,7 +333,7 @@ def main():
     
     # Men's games
     print("\n👨 Processing Men's Basketball...")
-    mens_scoreboard = mens_client.get_scoreboard(today)
+    mens_scoreboard = mens_client.get_scoreboard(today) or {}
     mens_games = mens_scoreboard.get("events", [])
     print(f"Found {len(mens_games)} men's games")
     
@@ -5,15 +5,17 @@ Fetch ONLY Arkansas Razorbacks basketball games from ESPN API
 Specialized script for Arkansas-only data collection
 """
 
-import requests
 import psycopg2
-from psycopg2.extras import execute_values
 import os
 from datetime import datetime
 import time
 from dotenv import load_dotenv
 import sys
 
+from r69w.client import extract_plays, fetch_summary, fetch_team_schedule
+from r69w.detector import detect_r69_event, r69_outcome
+from r69w.writer import competitor_score, insert_r69_event, upsert_game
+
 # Fix Windows console encoding for Unicode characters
 if sys.platform == 'win32':
     import io
@@ -29,223 +31,14 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 
 ARKANSAS_TEAM_ID = '8'  # ESPN ID for Arkansas Razorbacks
 
-def convert_clock_to_seconds(clock_display):
-    """Convert clock display (e.g., '12:34') to seconds"""
-    try:
-        if not clock_display or clock_display == '0:00':
-            return 0
-        parts = clock_display.split(':')
-        if len(parts) == 2:
-            minutes, seconds = parts
-            return int(minutes) * 60 + int(seconds)
-        return 0
-    except:
-        return 0
-
-def calculate_elapsed_time(period_num, clock_display):
-    """Calculate total elapsed time from start of game"""
-    remaining_seconds = convert_clock_to_seconds(clock_display)
-
-    if period_num == 1:
-        elapsed = 1200 - remaining_seconds
-    elif period_num == 2:
-        elapsed = 1200 + (1200 - remaining_seconds)
-    else:  # Overtime
-        elapsed = 2400 + ((period_num - 2) * 300) + (300 - remaining_seconds)
-
-    return elapsed
-
 def fetch_arkansas_schedule(season_year):
     """Fetch Arkansas schedule for a specific season"""
-    url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/teams/{ARKANSAS_TEAM_ID}/schedule?season={season_year}"
-    try:
-        print(f"  Fetching schedule from ESPN API...")
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.Timeout:
-        print(f"  ⏱ Timeout fetching schedule for {season_year}")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"  ❌ Error fetching schedule for {season_year}: {e}")
-        return None
+    print(f"  Fetching schedule from ESPN API...")
+    return fetch_team_schedule(ARKANSAS_TEAM_ID, season_year)
 
 def fetch_game_details(game_id, retries=3):
     """Fetch detailed game data with retry logic"""
-    url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/summary?event={game_id}"
-
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.Timeout:
-            if attempt < retries - 1:
-                print(f"    ⏱ Timeout (attempt {attempt + 1}/{retries}), retrying...")
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                print(f"    ❌ Timeout after {retries} attempts")
-                return None
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code in [502, 503, 504]:
-                if attempt < retries - 1:
-                    print(f"    ⚠ Server error {e.response.status_code} (attempt {attempt + 1}/{retries}), retrying...")
-                    time.sleep(2 ** attempt)
-                else:
-                    print(f"    ❌ Server error {e.response.status_code} after {retries} attempts")
-                    return None
-            else:
-                print(f"    ❌ HTTP error: {e}")
-                return None
-        except requests.exceptions.RequestException as e:
-            print(f"    ❌ Request error: {e}")
-            return None
-
-    return None
-
-def detect_r69_event(plays, home_team_id, away_team_id):
-    """
-    Detect R69 event from play-by-play data
-    Tracks first team to reach 69 points (regardless of leading status)
-    """
-    home_hit_69 = False
-    away_hit_69 = False
-
-    for play in plays:
-        home_score = play.get('homeScore', 0)
-        away_score = play.get('awayScore', 0)
-
-        # Check if home team hit 69 first
-        if home_score >= 69 and not home_hit_69 and not away_hit_69:
-            home_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            return {
-                'team_id': home_team_id,
-                'team_is_home': True,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': home_score - away_score,
-                'opponent_score': away_score,
-                'description': play.get('text', '')
-            }
-
-        # Check if away team hit 69 first
-        if away_score >= 69 and not away_hit_69 and not home_hit_69:
-            away_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            return {
-                'team_id': away_team_id,
-                'team_is_home': False,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': away_score - home_score,
-                'opponent_score': home_score,
-                'description': play.get('text', '')
-            }
-
-    return None
-
-def insert_game(cursor, game_data):
-    """Insert game into database"""
-    try:
-        cursor.execute("""
-            INSERT INTO games (
-                id, game_id, game_date, season, league,
-                home_team_id, home_team_name, home_conference, home_score, home_team_logo,
-                away_team_id, away_team_name, away_conference, away_score, away_team_logo,
-                final_margin, game_status, game_type, venue,
-                created_at, updated_at
-            ) VALUES (
-                gen_random_uuid(), %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s, %s, %s,
-                NOW(), NOW()
-            )
-            ON CONFLICT (game_id) DO UPDATE SET
-                home_score = EXCLUDED.home_score,
-                away_score = EXCLUDED.away_score,
-                final_margin = EXCLUDED.final_margin,
-                game_status = EXCLUDED.game_status,
-                updated_at = NOW()
-            RETURNING id
-        """, (
-            game_data['game_id'],
-            game_data['game_date'],
-            game_data['season'],
-            game_data['league'],
-            game_data['home_team_id'],
-            game_data['home_team_name'],
-            game_data['home_conference'],
-            game_data['home_score'],
-            game_data['home_team_logo'],
-            game_data['away_team_id'],
-            game_data['away_team_name'],
-            game_data['away_conference'],
-            game_data['away_score'],
-            game_data['away_team_logo'],
-            game_data['final_margin'],
-            game_data['game_status'],
-            game_data['game_type'],
-            game_data['venue']
-        ))
-        return cursor.fetchone()[0]
-    except Exception as e:
-        print(f"    ❌ Error inserting game: {e}")
-        return None
-
-def insert_r69_event(cursor, game_db_id, r69_data, team_name, final_home_score, final_away_score):
-    """Insert R69 event into database"""
-    try:
-        team_is_home = r69_data.get('team_is_home', False)
-        if team_is_home:
-            r69w = final_home_score > final_away_score
-            final_margin = final_home_score - final_away_score
-        else:
-            r69w = final_away_score > final_home_score
-            final_margin = final_away_score - final_home_score
-
-        cursor.execute("""
-            INSERT INTO r69_events (
-                id, game_id, team_id, team_name,
-                t_to_69, period_at_69, margin_at_69,
-                score_at_69_team, score_at_69_opponent,
-                r69w, final_margin, play_description,
-                created_at
-            ) VALUES (
-                gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            )
-            ON CONFLICT DO NOTHING
-            RETURNING id
-        """, (
-            game_db_id,
-            r69_data['team_id'],
-            team_name,
-            r69_data['t_to_69'],
-            r69_data['period'],
-            r69_data['margin_at_69'],
-            69,
-            r69_data['opponent_score'],
-            r69w,
-            final_margin,
-            r69_data.get('description', '')
-        ))
-
-        result = cursor.fetchone()
-        if result:
-            return True, r69w
-        return False, False
-    except Exception as e:
-        print(f"    ❌ Error inserting R69 event: {e}")
-        return False, False
+    return fetch_summary(game_id, retries=retries) or None
 
 def get_basketball_seasons(num_seasons):
     """Generate list of basketball season years (oldest to newest)"""
@@ -374,10 +167,8 @@ def main():
                 opp_name = opp_competitor.get('team', {}).get('displayName', 'Unknown')
 
                 # Scores
-                ark_score_raw = ark_competitor.get('score', 0)
-                opp_score_raw = opp_competitor.get('score', 0)
-                ark_score = int(ark_score_raw) if not isinstance(ark_score_raw, dict) else int(ark_score_raw.get('value', 0))
-                opp_score = int(opp_score_raw) if not isinstance(opp_score_raw, dict) else int(opp_score_raw.get('value', 0))
+                ark_score = competitor_score(ark_competitor)
+                opp_score = competitor_score(opp_competitor)
 
                 # Display game info
                 location = "(H)" if is_home else "(A)"
@@ -440,7 +231,7 @@ def main():
                 }
 
                 # Insert game
-                game_db_id = insert_game(cursor, game_data)
+                game_db_id = upsert_game(cursor, game_data)
 
                 if not game_db_id:
                     print(" - ❌ Failed to insert game")
@@ -450,7 +241,7 @@ def main():
                 total_games += 1
 
                 # Fetch play-by-play for R69 detection
-                plays = game_details.get('plays', [])
+                plays = extract_plays(game_details)
 
                 if not plays:
                     print(" - No PBP data")
@@ -470,10 +261,12 @@ def main():
                     else:
                         team_name = game_data['away_team_name']
 
-                    success, r69w = insert_r69_event(
-                        cursor, game_db_id, r69_event, team_name,
+                    r69_event['team_name'] = team_name
+                    success = insert_r69_event(
+                        cursor, game_db_id, r69_event,
                         game_data['home_score'], game_data['away_score']
                     )
+                    r69w, _ = r69_outcome(r69_event, game_data['home_score'], game_data['away_score'])
 
                     if success:
                         total_r69_events += 1
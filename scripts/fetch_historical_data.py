@@ -3,16 +3,38 @@
 """
 R69W Historical Data Fetcher
 Fetches historical NCAA basketball game data from ESPN API
+
+Usage:
+    python fetch_historical_data.py                          # menu (terminal) or last 7 days
+    python fetch_historical_data.py --seasons 10 --league both -c 12 -r 8
+    python fetch_historical_data.py --since 2025-01-01 --limit 500 --json-progress
+    python fetch_historical_data.py --season 2023-24 --dry-run
+    python fetch_historical_data.py --seasons 5 --metrics-file metrics/backfill.prom
 """
 
+import argparse
 import os
 import sys
-import requests
+from contextlib import nullcontext
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import time
+
+from r69w.archive import PayloadArchive
+from r69w.batch_writer import DEFAULT_COMMIT_GAMES, DEFAULT_COMMIT_SECONDS, BatchWriter
+from r69w.clock import period_lengths
+from r69w.client import MENS_LEAGUE, League, extract_plays, fetch_scoreboard, fetch_summary, league_value
+from r69w.detector import R69_TARGET, detect_race_events, r69_outcome
+from r69w.fetcher import ConcurrentFetcher
+from r69w.known_games import KnownGameIds
+from r69w.metrics import DEFAULT_HOST as METRICS_HOST, METRICS, MetricsExporter
+from r69w.parser import pbp_rows as build_pbp_rows
+from r69w.progress import ProgressReporter
+from r69w.work_queue import KIND_DATE, KIND_GAME, WorkQueue
+from r69w.writer import (
+    bulk_load_pbp_events, competitor_score, delete_r69_events, event_competitors,
+    insert_game, insert_r69_event, race_event_rows, season_label_for_event, upsert_race_events
+)
 
 # Fix Windows console encoding for Unicode characters
 if sys.platform == 'win32':
@@ -27,352 +49,27 @@ else:
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-ESPN_API_BASE = "https://site.api.espn.com/apis/site/v2/sports/basketball"
-
-def fetch_scoreboard(date, league='mens-college-basketball'):
-    """Fetch scoreboard for a specific date"""
-    date_str = date.strftime("%Y%m%d")
-    url = f"{ESPN_API_BASE}/{league}/scoreboard"
-    params = {"dates": date_str, "limit": 100}
-
-    try:
-        print(f"  Fetching {date_str}...")
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"  Error fetching {date_str}: {e}")
-        return {"events": []}
-
-def fetch_play_by_play(game_id, league='mens-college-basketball'):
-    """Fetch play-by-play for a game"""
-    url = f"{ESPN_API_BASE}/{league}/summary"
-    params = {"event": game_id}
-
-    try:
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"    Error fetching PBP for {game_id}: {e}")
-        return {}
-
-def calculate_elapsed_time(period_num, clock_display):
-    """Calculate total elapsed time from start of game"""
-    # Each half is 20 minutes (1200 seconds)
-    # Clock counts down, so remaining time in current period
-    remaining_seconds = convert_clock_to_seconds(clock_display)
-
-    # Calculate elapsed time
-    if period_num == 1:
-        elapsed = 1200 - remaining_seconds
-    elif period_num == 2:
-        elapsed = 1200 + (1200 - remaining_seconds)
-    else:  # Overtime periods (5 min each)
-        elapsed = 2400 + ((period_num - 2) * 300) + (300 - remaining_seconds)
-
-    return elapsed
-
-def detect_r69_event(plays, home_team_id, away_team_id):
-    """Detect R69 event from play-by-play data - tracks first team to reach 69"""
-    home_hit_69 = False
-    away_hit_69 = False
-
-    for play in plays:
-        home_score = play.get('homeScore', 0)
-        away_score = play.get('awayScore', 0)
-
-        # Check if home team hit 69 first (regardless of whether leading)
-        if home_score >= 69 and not home_hit_69 and not away_hit_69:
-            home_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            return {
-                'team_id': home_team_id,
-                'team_is_home': True,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': home_score - away_score,
-                'opponent_score': away_score,
-                'description': play.get('text', '')
-            }
-
-        # Check if away team hit 69 first (regardless of whether leading)
-        if away_score >= 69 and not away_hit_69 and not home_hit_69:
-            away_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            return {
-                'team_id': away_team_id,
-                'team_is_home': False,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': away_score - home_score,
-                'opponent_score': home_score,
-                'description': play.get('text', '')
-            }
-
-    return None
-
-def insert_game(cursor, game_data, season=None):
-    """Insert game into database"""
-    try:
-        # Determine season based on game date if not provided
-        if not season:
-            game_date = datetime.strptime(game_data.get('date', ''), '%Y-%m-%dT%H:%M%SZ').date()
-            year = game_date.year
-            month = game_date.month
-            # Basketball seasons run Nov-Apr, so if month is Jan-Apr, season started last year
-            # Months: 1=Jan, 2=Feb, 3=Mar, 4=Apr, 5=May, ..., 11=Nov, 12=Dec
-            if month <= 4:
-                # Jan-Apr: season started in November of previous year
-                season = f"{year - 1}-{str(year)[2:]}"
-            else:
-                # May-Dec: upcoming season (Nov onwards) or off-season
-                season = f"{year}-{str(year + 1)[2:]}"
-
-        competition = game_data.get('competitions', [{}])[0]
-        competitors = competition.get('competitors', [])
-
-        # Get teams
-        home_team = next((c for c in competitors if c.get('homeAway') == 'home'), {})
-        away_team = next((c for c in competitors if c.get('homeAway') == 'away'), {})
-
-        game_id = game_data.get('id')
-        game_date = datetime.strptime(game_data.get('date', ''), '%Y-%m-%dT%H:%M%SZ').date()
-
-        # Map status
-        status_map = {
-            'STATUS_SCHEDULED': 'scheduled',
-            'STATUS_IN_PROGRESS': 'in_progress',
-            'STATUS_FINAL': 'final',
-            'STATUS_POSTPONED': 'postponed',
-            'STATUS_CANCELED': 'canceled'
-        }
-        status = status_map.get(game_data.get('status', {}).get('type', {}).get('name'), 'scheduled')
-
-        # Extract team logos
-        home_logo = home_team.get('team', {}).get('logo')
-        away_logo = away_team.get('team', {}).get('logo')
-
-        # Insert game
-        cursor.execute("""
-            INSERT INTO games (
-                id, game_id, game_date, season, league,
-                home_team_id, away_team_id, home_team_name, away_team_name,
-                home_conference, away_conference, home_team_logo, away_team_logo,
-                venue, game_type,
-                home_score, away_score, final_margin,
-                game_status, total_periods, overtime_flag,
-                created_at, updated_at
-            ) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            ON CONFLICT (game_id) DO UPDATE SET
-                home_score = EXCLUDED.home_score,
-                away_score = EXCLUDED.away_score,
-                final_margin = EXCLUDED.final_margin,
-                game_status = EXCLUDED.game_status,
-                total_periods = EXCLUDED.total_periods,
-                overtime_flag = EXCLUDED.overtime_flag,
-                home_team_logo = EXCLUDED.home_team_logo,
-                away_team_logo = EXCLUDED.away_team_logo,
-                updated_at = NOW()
-            RETURNING id
-        """, (
-            game_id,
-            game_date,
-            season,
-            'mens',
-            home_team.get('team', {}).get('id', ''),
-            away_team.get('team', {}).get('id', ''),
-            home_team.get('team', {}).get('displayName', 'Home'),
-            away_team.get('team', {}).get('displayName', 'Away'),
-            home_team.get('team', {}).get('conferenceId'),
-            away_team.get('team', {}).get('conferenceId'),
-            home_logo,
-            away_logo,
-            competition.get('venue', {}).get('fullName'),
-            'regular',
-            int(home_team.get('score', 0)),
-            int(away_team.get('score', 0)),
-            int(home_team.get('score', 0)) - int(away_team.get('score', 0)),
-            status,
-            2,
-            False
-        ))
-
-        result = cursor.fetchone()
-        return result[0] if result else None
-
-    except Exception as e:
-        print(f"    Error inserting game: {e}")
-        return None
-
-def fetch_play_by_play(game_id, retries=3):
-    """
-    Fetch play-by-play data for a game with retry logic for network errors
-
-    Args:
-        game_id: ESPN game ID
-        retries: Number of retry attempts for server errors (default: 3)
-
-    Returns:
-        List of play-by-play events, or empty list on failure
-    """
-    url = f"https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/summary?event={game_id}"
-
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract plays from the playByPlay section
-            plays = data.get('plays', [])
-            return plays
-
-        except requests.exceptions.Timeout:
-            if attempt < retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                print(f"      ⏱ Timeout fetching PBP for game {game_id} (attempt {attempt + 1}/{retries}), retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"      ❌ Timeout fetching PBP for game {game_id} after {retries} attempts")
-                return []
-
-        except requests.exceptions.HTTPError as e:
-            # Retry on server errors (502, 503, 504)
-            if e.response.status_code in [502, 503, 504]:
-                if attempt < retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"      ⚠ {e.response.status_code} Server Error for game {game_id} (attempt {attempt + 1}/{retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    print(f"      ❌ {e.response.status_code} Server Error for game {game_id} after {retries} attempts")
-                    return []
-            else:
-                # Don't retry on client errors (404, 400, etc)
-                print(f"      ❌ HTTP {e.response.status_code} error fetching PBP for game {game_id}: {e}")
-                return []
 
-        except requests.exceptions.RequestException as e:
-            print(f"      ❌ Network error fetching PBP for game {game_id}: {e}")
-            return []
+# Default fetch engine settings (override with --concurrency / --rate)
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 5.0  # requests per second
 
-        except Exception as e:
-            print(f"      ❌ Unexpected error fetching PBP for game {game_id}: {e}")
-            return []
-
-    return []
+def load_pbp_batch(cursor, rows, stats, blocks=()):
+    """Bulk load a batch of PBP rows (and/or pre-encoded COPY blocks) and report throughput"""
+    if not rows and not blocks:
+        return
 
-def insert_r69_event(cursor, game_db_id, r69_data, game_final_home_score, game_final_away_score):
-    """Insert R69 event into database"""
     try:
-        # Determine if this was an R69W (won after hitting 69 first)
-        team_is_home = r69_data.get('team_is_home', False)
-        if team_is_home:
-            r69w = game_final_home_score > game_final_away_score
-            final_margin = game_final_home_score - game_final_away_score
-        else:
-            r69w = game_final_away_score > game_final_home_score
-            final_margin = game_final_away_score - game_final_home_score
-
-        cursor.execute("""
-            INSERT INTO r69_events (
-                id, game_id, team_id, team_name,
-                t_to_69, period_at_69, margin_at_69,
-                score_at_69_team, score_at_69_opponent,
-                r69w, final_margin, play_description,
-                created_at
-            ) VALUES (
-                gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            )
-            ON CONFLICT DO NOTHING
-        """, (
-            game_db_id,
-            r69_data['team_id'],
-            r69_data['team_name'],
-            r69_data['t_to_69'],
-            r69_data['period'],
-            r69_data['margin_at_69'],
-            69,
-            r69_data['opponent_score'],
-            r69w,
-            final_margin,
-            r69_data.get('description', '')
-        ))
-        return True
+        inserted, staged, elapsed = bulk_load_pbp_events(cursor, rows, blocks)
     except Exception as e:
-        print(f"      Error inserting R69 event: {e}")
-        return False
+        print(f"  ❌ Error bulk loading PBP events: {e}")
+        stats['errors'] += 1
+        return
 
-def convert_clock_to_seconds(clock_display):
-    """Convert clock display (e.g., '12:34') to seconds"""
-    try:
-        if not clock_display or clock_display == '0:00':
-            return 0
-        parts = clock_display.split(':')
-        if len(parts) == 2:
-            minutes, seconds = parts
-            return int(minutes) * 60 + int(seconds)
-        return 0
-    except:
-        return 0
-
-def insert_pbp_events(cursor, game_db_id, plays):
-    """Insert play-by-play events into database"""
-    try:
-        for idx, play in enumerate(plays):
-            # Convert clock display to seconds
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            clock_seconds = convert_clock_to_seconds(clock_display)
-
-            # Get period number
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-
-            # Calculate elapsed time from start of game
-            elapsed_seconds = calculate_elapsed_time(period_num, clock_display)
-
-            # Get points scored
-            score_value = play.get('scoreValue', 0)
-
-            # Get home and away scores
-            home_score = play.get('homeScore', 0)
-            away_score = play.get('awayScore', 0)
-
-            cursor.execute("""
-                INSERT INTO pbp_events (
-                    id, game_id, sequence_number, period, clock_seconds, elapsed_seconds,
-                    team_id, player_name, event_type, points_scored,
-                    home_score, away_score, description, created_at
-                ) VALUES (
-                    gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-                )
-                ON CONFLICT (game_id, sequence_number) DO NOTHING
-            """, (
-                game_db_id,
-                play.get('sequenceNumber', str(idx)),
-                period_num,
-                clock_seconds,
-                elapsed_seconds,
-                play.get('team', {}).get('id', ''),
-                play.get('participants', [{}])[0].get('athlete', {}).get('displayName', '') if play.get('participants') else '',
-                play.get('type', {}).get('text', ''),
-                score_value,
-                home_score,
-                away_score,
-                play.get('text', '')
-            ))
-        return True
-    except Exception as e:
-        print(f"      Error inserting PBP events: {e}")
-        return False
+    stats['pbp_rows'] += inserted
+    stats['pbp_seconds'] += elapsed
+    rows_per_sec = staged / elapsed if elapsed > 0 else 0
+    print(f"  📥 PBP: {inserted}/{staged} rows loaded in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec)")
 
 def get_basketball_seasons(num_seasons):
     """Generate list of basketball season date ranges (oldest to newest)"""
@@ -452,75 +149,446 @@ def get_specific_season(season_label):
         print(f"Error parsing season: {e}")
         return None
 
-def check_game_exists(cursor, espn_game_id):
-    """Check if a game already exists in the database"""
-    try:
-        cursor.execute("SELECT id FROM games WHERE game_id = %s", (espn_game_id,))
-        result = cursor.fetchone()
-        return result is not None
-    except Exception as e:
-        print(f"Error checking game existence: {e}")
-        return False
+def parse_leagues(raw):
+    """ESPN league paths for a --league value: mens, womens, both, or a comma-separated list"""
+    names = [league.value for league in League] if raw == 'both' else raw.split(',')
+    return [League(name.strip().lower()).path for name in names]
+
+def iter_fetch_dates(date_ranges):
+    """Yield (date, season_label) for every day in the given (start, end, label) ranges"""
+    for start, end, label in date_ranges:
+        current_date = start
+        while current_date <= end:
+            yield current_date, label
+            current_date += timedelta(days=1)
 
-def check_pbp_exists(cursor, game_db_id):
-    """Check if play-by-play data exists for a game"""
-    try:
-        cursor.execute("SELECT COUNT(*) FROM pbp_events WHERE game_id = %s", (game_db_id,))
-        result = cursor.fetchone()
-        return result[0] > 0 if result else False
-    except Exception as e:
-        print(f"Error checking PBP existence: {e}")
-        return False
+def iter_fetch_days(date_ranges, leagues):
+    """Yield (date, season_label, league) for every day, interleaving the leagues day by day"""
+    for current_date, label in iter_fetch_dates(date_ranges):
+        for league in leagues:
+            yield current_date, label, league
 
-def main():
-    """Main execution"""
-    print("\n" + "=" * 80)
-    print("🏀 R69W HISTORICAL DATA FETCHER")
-    print("=" * 80)
-    print("\nFetches NCAA basketball game data from ESPN API")
-    print("=" * 80)
+def ingest_game(cursor, event, plays, season_label, outcome, pbp_rows, replace_r69=False, league=MENS_LEAGUE):
+    """
+    Write one final game: insert game -> queue PBP rows -> detect and insert R69
+    and race-to-N events
 
-    # Get date range from command line or user input
-    use_season_dates = False
-    seasons_to_fetch = []
-    days_back = 7
+    Shared by the live fetch loop and the offline replay (replay_archive.py).
 
-    # Check for command-line arguments
-    if len(sys.argv) > 1:
-        arg = sys.argv[1].lower()
-        if arg in ['--seasons', '-s'] and len(sys.argv) > 2:
-            # Fetch N seasons: python fetch_historical_data.py --seasons 5
-            try:
-                num_seasons = int(sys.argv[2])
-                if num_seasons < 1 or num_seasons > 20:
-                    print("❌ Invalid number of seasons. Using 1 season.")
-                    num_seasons = 1
-                use_season_dates = True
-                seasons_to_fetch = get_basketball_seasons(num_seasons)
-                print(f"\n✅ Fetching {num_seasons} season(s) (from command line)")
-            except ValueError:
-                print("❌ Invalid season count. Using 1 season.")
-                use_season_dates = True
-                seasons_to_fetch = get_basketball_seasons(1)
-        elif arg in ['--days', '-d'] and len(sys.argv) > 2:
-            # Fetch N days: python fetch_historical_data.py --days 30
-            try:
-                days_back = int(sys.argv[2])
-                if days_back < 1 or days_back > 365:
-                    print("❌ Invalid number of days. Using 7 days.")
-                    days_back = 7
-                print(f"\n✅ Fetching last {days_back} day(s) (from command line)")
-            except ValueError:
-                print("❌ Invalid day count. Using 7 days.")
-                days_back = 7
+    Args:
+        cursor: Database cursor
+        event: Scoreboard event for the game
+        plays: ESPN play list from the game's summary
+        season_label: Season label, or None to derive it from the game date
+        outcome: Dict that receives what was written (see write_game)
+        pbp_rows: List that receives this game's pbp_events rows for bulk loading
+        replace_r69: Delete any existing R69 event for the game first (recompute)
+        league: ESPN league path the game belongs to
+
+    Returns:
+        Database game ID, or None if the game could not be inserted
+    """
+    race_events = {}
+    lengths = period_lengths(league)
+    if plays:
+        home_team_id, away_team_id = event_team_ids(event)
+        with METRICS.time('detect'):
+            # One pass finds every threshold, 69 included
+            race_events = detect_race_events(plays, home_team_id, away_team_id, lengths=lengths)
+
+    db_game_id = write_game(cursor, event, race_events.get(R69_TARGET), season_label, outcome, replace_r69, league,
+                            race_events=race_events)
+
+    if db_game_id and plays:
+        # Queue PBP events for the batch bulk load
+        with METRICS.time('parse'):
+            pbp_rows.extend(build_pbp_rows(db_game_id, plays, lengths))
+
+    return db_game_id
+
+def event_team_ids(event):
+    """(home_team_id, away_team_id) for a scoreboard event"""
+    home_team, away_team = event_competitors(event)
+    return home_team.get('team', {}).get('id', ''), away_team.get('team', {}).get('id', '')
+
+def write_game(cursor, event, r69_event, season_label, outcome, replace_r69=False, league=MENS_LEAGUE,
+               race_events=None):
+    """
+    Insert a game and its already-detected R69 event (if any)
+
+    race_events (threshold -> event, see detect_race_events) are upserted
+    into race_events alongside it. The game's name and inserted R69 event
+    are recorded in `outcome`; callers pass it to count_game once the
+    game's savepoint is released, so rolled-back games are never counted.
+
+    Returns:
+        Database game ID, or None if the game could not be inserted
+    """
+    name = event.get('shortName', 'Unknown')
+
+    # Get competition details for final scores
+    home_team, away_team = event_competitors(event)
+
+    home_score = competitor_score(home_team)
+    away_score = competitor_score(away_team)
+    home_team_name = home_team.get('team', {}).get('displayName', 'Home')
+    away_team_name = away_team.get('team', {}).get('displayName', 'Away')
+
+    # Insert game
+    db_game_id = insert_game(cursor, event, season=season_label, league=league_value(league))
+    if not db_game_id:
+        return None
+
+    outcome['name'] = name
+
+    if replace_r69:
+        delete_r69_events(cursor, db_game_id)
+
+    if race_events:
+        upsert_race_events(cursor, race_event_rows(db_game_id, race_events, home_score, away_score))
+
+    if r69_event:
+        # Add team name to r69_event
+        if r69_event.get('team_is_home'):
+            r69_event['team_name'] = home_team_name
         else:
-            # Try to interpret as option number for backward compatibility
-            try:
-                choice = sys.argv[1]
-            except:
-                choice = '1'
-    else:
-        # Interactive mode
+            r69_event['team_name'] = away_team_name
+
+        # Insert R69 event
+        if insert_r69_event(cursor, db_game_id, r69_event, home_score, away_score):
+            is_r69w, _ = r69_outcome(r69_event, home_score, away_score)
+            outcome['r69'] = (r69_event['team_name'], is_r69w, r69_event['margin_at_69'])
+
+    return db_game_id
+
+def count_game(stats, outcome):
+    """Add a committed game's outcome (see write_game) to the run counters and report it"""
+    stats['games'] += 1
+    print(f"    [OK] {outcome.get('name', 'Unknown')}")
+
+    if outcome.get('r69'):
+        team_name, is_r69w, margin = outcome['r69']
+        stats['r69_events'] += 1
+        if is_r69w:
+            stats['r69w'] += 1
+        r69w = "W" if is_r69w else "L"
+        print(f"      🎯 R69{r69w} | {team_name} hit 69 first at {margin:+d}")
+
+def is_final_event(event):
+    """True if a scoreboard event's game is over (status is in competition, not event)"""
+    competition = event.get('competitions', [{}])[0]
+    status = competition.get('status', {}).get('type', {})
+    return status.get('name', 'UNKNOWN') == 'STATUS_FINAL' or status.get('completed', False)
+
+class ScoreboardDay:
+    """One league's scoreboard day whose summary downloads are in flight"""
+
+    __slots__ = ('date', 'league', 'season', 'found', 'notes', 'pending')
+
+    def __init__(self, date, league, season, found):
+        self.date = date
+        self.league = league
+        self.season = season
+        self.found = found
+        self.notes = []    # skip/error lines, printed when the day is written
+        self.pending = []  # (event, summary future)
+
+def scoreboard_events(data, current_date, league, stats):
+    """A scoreboard's events; a failed fetch (None) is logged and counted as an error"""
+    if data is None:
+        stats['errors'] += 1
+        print(f"  ❌ [{current_date.strftime('%Y-%m-%d')}] {league_value(league)}: "
+              f"scoreboard fetch failed, day skipped (rerun to retry it)")
+        return []
+    return data.get('events', [])
+
+def start_day(fetcher, known_games, current_date, events, season_label, stats, league=MENS_LEAGUE):
+    """
+    Filter a scoreboard day to new, final games and submit their summary
+    fetches to the fetch engine straight away
+
+    Returns:
+        ScoreboardDay to hand to finish_day
+    """
+    day = ScoreboardDay(current_date, league, season_label, len(events))
+
+    for event in events:
+        try:
+            game_id = event.get('id')
+            name = event.get('shortName', 'Unknown')
+
+            # Check if game already exists (in-memory set, no DB round trip)
+            if game_id in known_games:
+                day.notes.append(f"    [CACHED] {name} - already exists, skipping...")
+                stats['cached'] += 1
+                continue
+
+            # Only process completed games
+            if not is_final_event(event):
+                status_name = event.get('competitions', [{}])[0].get('status', {}).get('type', {}).get('name', 'UNKNOWN')
+                day.notes.append(f"    [SKIP] {name} - not final ({status_name})")
+                continue
+
+            day.pending.append((event, fetcher.submit(fetch_summary, game_id, league, fetcher=fetcher,
+                                                        selective=True)))
+        except Exception as e:
+            day.notes.append(f"    ❌ Error processing game: {e}")
+            stats['errors'] += 1
+
+    return day
+
+def write_ingested_game(writer, event, summary, season_label, stats, league):
+    """
+    Ingest one game inside its own savepoint of the writer's batch
+
+    Returns:
+        Database game ID, or None if the game was not written (its partial
+        writes are rolled back without touching the rest of the batch)
+    """
+    outcome = {}
+    with writer.game() as pending:
+        db_game_id = ingest_game(writer.cursor, event, extract_plays(summary), season_label, outcome, pending.rows,
+                                 league=league)
+    if db_game_id and not pending.written:
+        print(f"    ❌ Rolled back {event.get('shortName', event.get('id'))} after a write error")
+        stats['errors'] += 1
+        return None
+    if db_game_id:
+        count_game(stats, outcome)
+    return db_game_id
+
+def finish_day(writer, known_games, day, stats, archive=None):
+    """
+    Write a started day's games as their summaries arrive, each in its own
+    savepoint. The writer commits (and bulk loads the batch's PBP rows in
+    one COPY) whenever its batch is due, which may span several days. When
+    an archive is given, each raw summary is also appended to it for
+    offline replay.
+    """
+    print(f"\n[{day.date.strftime('%Y-%m-%d')}] {league_value(day.league)}")
+
+    if not day.found:
+        print("  No games found")
+        return
+
+    print(f"  Found {day.found} games")
+    for note in day.notes:
+        print(note)
+
+    for event, summary_future in day.pending:
+        try:
+            # Summary/play-by-play data (already downloading on the fetch engine)
+            summary = summary_future.result()
+
+            if archive is not None and summary:
+                archive.append(day.league, day.season or season_label_for_event(event), event, summary)
+
+            if write_ingested_game(writer, event, summary, day.season, stats, day.league):
+                known_games.add(event.get('id'))
+
+        except Exception as e:
+            print(f"    ❌ Error processing game: {e}")
+            stats['errors'] += 1
+            continue
+
+        writer.maybe_flush()
+
+def process_day(writer, fetcher, known_games, current_date, events, season_label, stats, archive=None,
+                league=MENS_LEAGUE):
+    """
+    Process one league's scoreboard day
+
+    Summary fetches for every new final game are submitted to the fetch
+    engine up front, so they download concurrently while earlier games on
+    the same day are being written to the database.
+    """
+    day = start_day(fetcher, known_games, current_date, events, season_label, stats, league)
+    finish_day(writer, known_games, day, stats, archive)
+
+def queue_day(queue, known_games, item, events, stats):
+    """Queue the new final games of one scoreboard day (work queue mode)"""
+    games = []
+    for event in events:
+        if event.get('id') in known_games:
+            stats['cached'] += 1
+        elif is_final_event(event):
+            games.append((event.get('id'), item.season, event))
+
+    added = queue.enqueue_games(item.league, games)
+    print(f"[{item.key}] {len(events)} games, {added} queued")
+
+def ingest_queued_games(writer, fetcher, known_games, items, stats, archive=None):
+    """
+    Ingest a batch of claimed game items, each in its own savepoint
+
+    Summaries download concurrently; PBP for the batch is bulk loaded when
+    the caller flushes the writer. Games that turn out to be in the
+    database already (e.g. written by a run that died before marking them
+    done) are skipped.
+
+    Returns:
+        (done, failed) where failed is a list of (item, error)
+    """
+    done, failed = [], []
+
+    todo = []
+    for item in items:
+        if item.key in known_games:
+            stats['cached'] += 1
+            done.append(item)
+        else:
+            todo.append(item)
+
+    summaries = fetcher.imap(lambda item: fetch_summary(item.key, item.league, fetcher=fetcher, selective=True),
+                             todo)
+    for item, summary in summaries:
+        event = item.payload
+        try:
+            if archive is not None and summary:
+                archive.append(item.league, item.season or season_label_for_event(event), event, summary)
+
+            if write_ingested_game(writer, event, summary, item.season, stats, item.league):
+                known_games.add(item.key)
+                done.append(item)
+            else:
+                failed.append((item, "game insert failed"))
+        except Exception as e:
+            print(f"    ❌ Error processing game {item.key}: {e}")
+            stats['errors'] += 1
+            failed.append((item, e))
+
+    return done, failed
+
+def run_queue(writer, fetcher, queue, known_games, date_ranges, stats, archive=None, batch_size=None,
+              leagues=(MENS_LEAGUE,), limit=None, progress=None):
+    """
+    Drain the persistent work queue (resumable, multi-process safe)
+
+    Dates are queued up front for every league (already queued dates keep
+    their status; claims are in date order, so the leagues interleave), then
+    this worker alternates between claiming queued games and claiming
+    scoreboard dates until nothing is left. Items are only marked done after
+    the database commit, so a crash re-does at most the batch in flight.
+    With a limit, the worker stops once that many new games were ingested.
+    """
+    batch_size = batch_size or fetcher.concurrency * 4
+
+    added = sum(queue.enqueue_dates(league, iter_fetch_dates(date_ranges)) for league in leagues)
+    print(f"Work queue: {queue.path} ({added} new dates queued, worker {queue.worker})")
+
+    claimed = []
+    try:
+        while True:
+            # Drain games first so work already discovered finishes before new days are scanned
+            if limit is not None and stats['games'] >= limit:
+                break
+
+            size = batch_size if limit is None else min(batch_size, limit - stats['games'])
+            claimed = queue.claim(KIND_GAME, limit=size)
+            if claimed:
+                done, failed = ingest_queued_games(writer, fetcher, known_games, claimed, stats, archive)
+                writer.flush()
+                queue.complete(done)
+                for item, error in failed:
+                    queue.fail(item, error)
+                if progress:
+                    progress.emit('batch', claimed=len(claimed), done=len(done), failed=len(failed), **stats)
+                continue
+
+            claimed = queue.claim(KIND_DATE, limit=fetcher.concurrency)
+            if not claimed:
+                break
+
+            scoreboards = fetcher.imap(
+                lambda item: fetch_scoreboard(datetime.strptime(item.key, '%Y-%m-%d'), item.league, fetcher=fetcher),
+                claimed
+            )
+            scanned = []
+            for item, data in scoreboards:
+                if data is None:
+                    # Failed fetch, not an empty day: back to pending for a retry
+                    stats['errors'] += 1
+                    queue.fail(item, 'scoreboard fetch failed')
+                    continue
+                queue_day(queue, known_games, item, data.get('events', []), stats)
+                scanned.append(item)
+            queue.complete(scanned)
+            claimed = []
+    except BaseException:
+        # Hand unfinished claims straight back instead of waiting for the lease to expire
+        writer.rollback()
+        queue.release(claimed)
+        raise
+
+    counts = queue.counts()
+    failed = counts.get((KIND_DATE, 'failed'), 0) + counts.get((KIND_GAME, 'failed'), 0)
+    waiting = queue.waiting()
+    if waiting:
+        print(f"\n⚠ {waiting} work items failed and are waiting to be retried (rerun later to pick them up)")
+    if failed:
+        print(f"\n⚠ {failed} work items failed {queue.max_attempts} times (rerun with --retry-failed)")
+
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetch historical NCAA basketball games, play-by-play and R69 events from ESPN"
+    )
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--seasons', '-s', type=int, help="Last N basketball seasons (1-20)")
+    scope.add_argument('--season', action='append', help="Specific season, e.g. 2015-16 (repeatable)")
+    scope.add_argument('--days', '-d', type=int, help="Last N days, off-season included (1-365)")
+    scope.add_argument('--since', type=parse_date, help="Every day from YYYY-MM-DD through today")
+    parser.add_argument('option', nargs='?', choices=[str(i) for i in range(1, 9)],
+                        help="Menu option number (shortcut for the interactive menu)")
+    parser.add_argument('--interactive', '-i', action='store_true',
+                        help="Choose the range from a menu (default when run from a terminal with no range)")
+
+    parser.add_argument('--league', '-l', type=parse_leagues, default=[MENS_LEAGUE],
+                        help="mens, womens, both, or a comma-separated list (default: mens)")
+    parser.add_argument('--limit', type=int, default=None,
+                        help="Stop once N new games are ingested (checked after each day / batch)")
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Concurrent ESPN requests (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--rate', '-r', type=float, default=DEFAULT_RATE,
+                        help=f"Request budget per second (default: {DEFAULT_RATE:g})")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Games claimed per batch in --queue mode (default: 4 x concurrency)")
+    parser.add_argument('--commit-games', type=int, default=DEFAULT_COMMIT_GAMES,
+                        help=f"Commit after this many games (default: {DEFAULT_COMMIT_GAMES})")
+    parser.add_argument('--commit-seconds', type=float, default=DEFAULT_COMMIT_SECONDS,
+                        help=f"...or once the oldest uncommitted game is this old (default: {DEFAULT_COMMIT_SECONDS:g})")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Fetch scoreboards and report new final games without fetching summaries or writing")
+    parser.add_argument('--json-progress', action='store_true',
+                        help="JSON Lines progress on stdout (human-readable output moves to stderr)")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write Prometheus-format stage timings and counters here (every 15s and at exit)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve the same metrics at http://localhost:PORT/metrics")
+    parser.add_argument('--metrics-host', default=METRICS_HOST,
+                        help="Interface for --metrics-port (default: 127.0.0.1; 0.0.0.0 for all)")
+
+    parser.add_argument('--known-games-file', default=None, help="On-disk snapshot of known ESPN game IDs")
+    parser.add_argument('--archive-dir', default=None, help="Append raw summaries here for replay_archive.py")
+    parser.add_argument('--queue', default=None, help="Resumable work queue file (SQLite)")
+    parser.add_argument('--retry-failed', action='store_true', help="Requeue parked work queue failures")
+    return parser.parse_args(argv)
+
+def choose_from_menu(choice=None):
+    """
+    Resolve a menu option, prompting for it (and any follow-up) when needed
+
+    Returns:
+        (seasons, days_back) where exactly one is set
+    """
+    if choice is None:
         print("\nFetch historical data from ESPN API")
         print("\n📅 QUICK OPTIONS:")
         print("  1. Last 7 days (any games)")
@@ -537,301 +605,256 @@ def main():
 
         choice = input("\nSelect option (default: 1): ").strip()
 
-    # Process choice if not already handled by command-line args
-    if not use_season_dates and 'choice' in locals():
-        if choice == '2':
-            days_back = 30
-        elif choice == '3':
-            custom = input("Enter number of days: ").strip()
-            days_back = int(custom) if custom else 7
-        elif choice == '4':
-            use_season_dates = True
-            seasons_to_fetch = get_basketball_seasons(1)
-        elif choice == '5':
-            use_season_dates = True
-            seasons_to_fetch = get_basketball_seasons(2)
-        elif choice == '6':
-            use_season_dates = True
-            seasons_to_fetch = get_basketball_seasons(5)
-        elif choice == '7':
-            use_season_dates = True
-            seasons_to_fetch = get_basketball_seasons(10)
-        elif choice == '8':
-            # Specific season selection
-            print("\nAvailable seasons: 2015-16 through current")
-            print("Examples: 2015-16, 2016-17, 2020-21, 2023-24")
-            season_input = input("Enter season (e.g., 2015-16): ").strip()
-
-            if season_input:
-                season_data = get_specific_season(season_input)
-                if season_data:
-                    use_season_dates = True
-                    seasons_to_fetch = [season_data]
-                    print(f"\n✅ Selected season: {season_data['label']}")
-                else:
-                    print("\n❌ Invalid season format. Using last 7 days instead.")
-                    days_back = 7
-            else:
-                print("\n❌ No season entered. Using last 7 days instead.")
-                days_back = 7
-        else:
+    season_counts = {'4': 1, '5': 2, '6': 5, '7': 10}
+    if choice in season_counts:
+        return get_basketball_seasons(season_counts[choice]), None
+    if choice == '2':
+        return None, 30
+    if choice == '3':
+        custom = input("Enter number of days: ").strip()
+        return None, int(custom) if custom else 7
+    if choice == '8':
+        print("\nAvailable seasons: 2015-16 through current")
+        print("Examples: 2015-16, 2016-17, 2020-21, 2023-24")
+        season_input = input("Enter season (e.g., 2015-16): ").strip()
+
+        season_data = get_specific_season(season_input) if season_input else None
+        if season_data:
+            print(f"\n✅ Selected season: {season_data['label']}")
+            return [season_data], None
+        print("\n❌ Invalid or missing season. Using last 7 days instead.")
+    return None, 7
+
+def resolve_scope(args):
+    """
+    Turn the range options into (start, end, season_label) date ranges
+
+    The menu is only shown with --interactive, or when no range was given
+    and stdin is a terminal; unattended runs default to the last 7 days.
+
+    Returns:
+        (date_ranges, use_season_dates)
+    """
+    seasons = None
+    days_back = None
+
+    if args.seasons is not None:
+        num_seasons = args.seasons
+        if num_seasons < 1 or num_seasons > 20:
+            print("❌ Invalid number of seasons. Using 1 season.")
+            num_seasons = 1
+        seasons = get_basketball_seasons(num_seasons)
+        print(f"\n✅ Fetching {num_seasons} season(s) (from command line)")
+    elif args.season:
+        seasons = [get_specific_season(label) for label in args.season]
+        if not all(seasons):
+            print("❌ Invalid or future season label. Using last 7 days instead.")
+            seasons, days_back = None, 7
+    elif args.days is not None:
+        days_back = args.days
+        if days_back < 1 or days_back > 365:
+            print("❌ Invalid number of days. Using 7 days.")
             days_back = 7
+        print(f"\n✅ Fetching last {days_back} day(s) (from command line)")
+    elif args.since is not None:
+        pass
+    elif args.option or args.interactive or sys.stdin.isatty():
+        seasons, days_back = choose_from_menu(args.option)
+    else:
+        days_back = 7
 
-    if use_season_dates:
-        print(f"\nFetching {len(seasons_to_fetch)} basketball season(s):")
-        for season in seasons_to_fetch:
+    if seasons:
+        print(f"\nFetching {len(seasons)} basketball season(s):")
+        for season in seasons:
             print(f"  {season['label']}: {season['start'].strftime('%Y-%m-%d')} to {season['end'].strftime('%Y-%m-%d')}")
-    else:
-        start_date = datetime.now() - timedelta(days=days_back)
-        end_date = datetime.now()
-        print(f"\nFetching data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-        print(f"Total days: {days_back}")
+        # Each basketball season, chronologically: oldest to newest
+        return [(season['start'], season['end'], season['label']) for season in seasons], True
+
+    # Continuous date range (season derived from each game's date)
+    start_date = args.since if args.since is not None else datetime.now() - timedelta(days=days_back)
+    end_date = datetime.now()
+    print(f"\nFetching data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    print(f"Total days: {(end_date - start_date).days}")
+    return [(start_date, end_date, None)], False
+
+def dry_run(fetcher, known_games, date_ranges, leagues, stats, progress):
+    """Scan scoreboards and count the new final games a real run would ingest"""
+    scoreboards = fetcher.imap(
+        lambda item: fetch_scoreboard(item[0], item[2], fetcher=fetcher),
+        iter_fetch_days(date_ranges, leagues)
+    )
+    for (current_date, _, league), data in scoreboards:
+        events = scoreboard_events(data, current_date, league, stats)
+        new = [event for event in events if event.get('id') not in known_games and is_final_event(event)]
+        stats['cached'] += sum(1 for event in events if event.get('id') in known_games)
+        stats['games'] += len(new)
+        print(f"[{current_date.strftime('%Y-%m-%d')}] {league_value(league)}: "
+              f"{len(events)} games, {len(new)} new final")
+        progress.emit('day', date=current_date.strftime('%Y-%m-%d'), league=league_value(league),
+                      found=len(events), new=len(new))
+
+def main():
+    """Main execution"""
+    args = parse_args()
+    progress = ProgressReporter(args.json_progress)
+
+    print("\n" + "=" * 80)
+    print("🏀 R69W HISTORICAL DATA FETCHER")
+    print("=" * 80)
+    print("\nFetches NCAA basketball game data from ESPN API")
+    print("=" * 80)
+
+    date_ranges, use_season_dates = resolve_scope(args)
+    leagues = args.league
 
     # Connect to database
     try:
         conn = psycopg2.connect(DATABASE_URL)
-        cursor = conn.cursor()
         print("\n✅ Connected to database")
     except Exception as e:
         print(f"\n❌ Database connection failed: {e}")
+        progress.emit('error', message=f"database connection failed: {e}")
         return
 
     # Fetch data
-    total_games = 0
-    total_cached_games = 0
-    total_r69_events = 0
-    total_r69w = 0
-    total_errors = 0
+    stats = {'games': 0, 'cached': 0, 'r69_events': 0, 'r69w': 0, 'errors': 0,
+             'pbp_rows': 0, 'pbp_seconds': 0.0}
 
-    print("\n📊 Fetching games...")
+    # Games are written in savepoints and committed in batches (with one PBP COPY per batch)
+    writer = BatchWriter(
+        conn, max_games=args.commit_games, max_seconds=args.commit_seconds,
+        load_pbp=lambda cursor, rows, blocks: load_pbp_batch(cursor, rows, stats, blocks)
+    )
+
+    print("\n📊 Fetching games..." if not args.dry_run else "\n📊 Dry run: scanning scoreboards only...")
     print("─" * 80)
     print("Note: Games already in database will be skipped for optimization")
+    print(f"Fetch engine: {args.concurrency} concurrent requests, {args.rate:g} requests/sec budget")
+    print(f"Leagues: {', '.join(league_value(league) for league in leagues)}")
+    if not args.queue:
+        print(f"Commits: every {args.commit_games} games or {args.commit_seconds:g}s")
+
+    progress.emit('start', leagues=[league_value(league) for league in leagues],
+                  ranges=[(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), label)
+                          for start, end, label in date_ranges],
+                  dry_run=args.dry_run, limit=args.limit)
+
+    # Load every already-ingested game ID for the whole range in one query
+    known_games = KnownGameIds(snapshot_path=args.known_games_file)
+    try:
+        known_count = known_games.load(
+            writer.cursor,
+            min(start for start, _, _ in date_ranges).date(),
+            max(end for _, end, _ in date_ranges).date()
+        )
+        print(f"Known games in range: {known_count}")
+    except Exception as e:
+        print(f"❌ Could not load existing game IDs: {e}")
+        conn.rollback()
+
+    # Optional raw payload archive for offline replay (replay_archive.py)
+    archive = PayloadArchive(args.archive_dir) if args.archive_dir and not args.dry_run else None
+    if archive:
+        print(f"Archiving raw summaries to {archive.root}")
+
+    current_season = None
+    # The archive is closed however the run ends (each record is already a complete gzip member)
+    with (archive or nullcontext()), \
+            MetricsExporter(path=args.metrics_file, port=args.metrics_port, host=args.metrics_host), \
+            ConcurrentFetcher(concurrency=args.concurrency, rate=args.rate) as fetcher:
+        if args.dry_run:
+            dry_run(fetcher, known_games, date_ranges, leagues, stats, progress)
+        elif args.queue:
+            # Resumable mode: progress lives in the work queue file
+            with WorkQueue(args.queue) as queue:
+                if args.retry_failed:
+                    print(f"Retrying {queue.retry_failed()} failed work items")
+                run_queue(writer, fetcher, queue, known_games, date_ranges, stats, archive,
+                          batch_size=args.batch_size, leagues=leagues, limit=args.limit, progress=progress)
+        else:
+            # Scoreboards are pipelined ahead of the day currently being written,
+            # one per league per date, so the leagues share the fetch engine
+            scoreboards = fetcher.imap(
+                lambda item: fetch_scoreboard(item[0], item[2], fetcher=fetcher),
+                iter_fetch_days(date_ranges, leagues)
+            )
 
-    # Determine which date ranges to process
-    if use_season_dates:
-        # Process each basketball season (chronologically: oldest to newest)
-        for season in seasons_to_fetch:
-            print(f"\n{'='*60}")
-            print(f"SEASON: {season['label']}")
-            print(f"{'='*60}")
-
-            current_date = season['start']
-            season_end = season['end']
-
-            while current_date <= season_end:
-                print(f"\n[{current_date.strftime('%Y-%m-%d')}]")
-
-                # Fetch scoreboard
-                data = fetch_scoreboard(current_date)
-                events = data.get('events', [])
-
-                if not events:
-                    print("  No games found")
-                    current_date += timedelta(days=1)
-                    continue
-
-                print(f"  Found {len(events)} games")
-
-                for event in events:
-                    try:
-                        game_id = event.get('id')
-                        name = event.get('shortName', 'Unknown')
-
-                        # Check if game already exists
-                        if check_game_exists(cursor, game_id):
-                            print(f"    [CACHED] {name} - already exists, skipping...")
-                            total_cached_games += 1
-                            continue
-
-                        # Get competition details for final scores
-                        competition = event.get('competitions', [{}])[0]
-                        competitors = competition.get('competitors', [])
-                        home_team = next((c for c in competitors if c.get('homeAway') == 'home'), {})
-                        away_team = next((c for c in competitors if c.get('homeAway') == 'away'), {})
-
-                        home_score = int(home_team.get('score', 0))
-                        away_score = int(away_team.get('score', 0))
-                        home_team_id = home_team.get('team', {}).get('id', '')
-                        away_team_id = away_team.get('team', {}).get('id', '')
-                        home_team_name = home_team.get('team', {}).get('displayName', 'Home')
-                        away_team_name = away_team.get('team', {}).get('displayName', 'Away')
-
-                        # Only process completed games (status is in competition, not event)
-                        status = competition.get('status', {}).get('type', {})
-                        status_name = status.get('name', 'UNKNOWN')
-                        is_completed = status.get('completed', False)
-                        if status_name != 'STATUS_FINAL' and not is_completed:
-                            print(f"    [SKIP] {name} - not final ({status_name})")
-                            continue
-
-                        # Insert game
-                        db_game_id = insert_game(cursor, event, season=season['label'])
-                        if not db_game_id:
-                            continue
-
-                        total_games += 1
-                        print(f"    [OK] {name}")
-
-                        # Fetch play-by-play data
-                        plays = fetch_play_by_play(game_id)
-
-                        if plays:
-                            # Insert PBP events
-                            insert_pbp_events(cursor, db_game_id, plays)
-
-                            # Detect R69 event
-                            r69_event = detect_r69_event(plays, home_team_id, away_team_id)
-
-                            if r69_event:
-                                # Add team name to r69_event
-                                if r69_event.get('team_is_home'):
-                                    r69_event['team_name'] = home_team_name
-                                else:
-                                    r69_event['team_name'] = away_team_name
-
-                                # Insert R69 event
-                                if insert_r69_event(cursor, db_game_id, r69_event, home_score, away_score):
-                                    total_r69_events += 1
-                                    team_name = r69_event['team_name']
-                                    is_r69w = (r69_event.get('team_is_home') and home_score > away_score) or \
-                                              (not r69_event.get('team_is_home') and away_score > home_score)
-                                    if is_r69w:
-                                        total_r69w += 1
-                                    r69w = "W" if is_r69w else "L"
-                                    print(f"      🎯 R69{r69w} | {team_name} hit 69 first at {r69_event['margin_at_69']:+d}")
-
-                        # Rate limit
-                        time.sleep(0.5)
-
-                    except Exception as e:
-                        print(f"    ❌ Error processing game: {e}")
-                        total_errors += 1
-                        continue
-
-                conn.commit()
-                current_date += timedelta(days=1)
-
-                # Rate limit between days
-                time.sleep(1)
-    else:
-        # Process continuous date range
-        start_date = datetime.now() - timedelta(days=days_back)
-        end_date = datetime.now()
-        current_date = start_date
-
-        while current_date <= end_date:
-            print(f"\n[{current_date.strftime('%Y-%m-%d')}]")
-
-            # Fetch scoreboard
-            data = fetch_scoreboard(current_date)
-            events = data.get('events', [])
-
-            if not events:
-                print("  No games found")
-                current_date += timedelta(days=1)
-                continue
-
-            print(f"  Found {len(events)} games")
-
-            for event in events:
-                try:
-                    game_id = event.get('id')
-                    name = event.get('shortName', 'Unknown')
-
-                    # Check if game already exists (optimization)
-                    if check_game_exists(cursor, game_id):
-                        print(f"    [CACHED] {name} - already exists, skipping...")
-                        total_cached_games += 1
-                        continue
-
-                    # Get competition details for final scores
-                    competition = event.get('competitions', [{}])[0]
-                    competitors = competition.get('competitors', [])
-                    home_team = next((c for c in competitors if c.get('homeAway') == 'home'), {})
-                    away_team = next((c for c in competitors if c.get('homeAway') == 'away'), {})
-
-                    home_score = int(home_team.get('score', 0))
-                    away_score = int(away_team.get('score', 0))
-                    home_team_id = home_team.get('team', {}).get('id', '')
-                    away_team_id = away_team.get('team', {}).get('id', '')
-                    home_team_name = home_team.get('team', {}).get('displayName', 'Home')
-                    away_team_name = away_team.get('team', {}).get('displayName', 'Away')
-
-                    # Only process completed games (status is in competition, not event)
-                    status = competition.get('status', {}).get('type', {})
-                    status_name = status.get('name', 'UNKNOWN')
-                    is_completed = status.get('completed', False)
-                    if status_name != 'STATUS_FINAL' and not is_completed:
-                        print(f"    [SKIP] {name} - not final ({status_name})")
-                        continue
-
-                    # Insert game
-                    db_game_id = insert_game(cursor, event)
-                    if not db_game_id:
-                        continue
-
-                    total_games += 1
-                    print(f"    [OK] {name}")
-
-                    # Fetch play-by-play data
-                    plays = fetch_play_by_play(game_id)
-
-                    if plays:
-                        # Insert PBP events
-                        insert_pbp_events(cursor, db_game_id, plays)
-
-                        # Detect R69 event
-                        r69_event = detect_r69_event(plays, home_team_id, away_team_id)
-
-                        if r69_event:
-                            # Add team name to r69_event
-                            if r69_event.get('team_is_home'):
-                                r69_event['team_name'] = home_team_name
-                            else:
-                                r69_event['team_name'] = away_team_name
-
-                            # Insert R69 event
-                            if insert_r69_event(cursor, db_game_id, r69_event, home_score, away_score):
-                                total_r69_events += 1
-                                team_name = r69_event['team_name']
-                                is_r69w = (r69_event.get('team_is_home') and home_score > away_score) or \
-                                          (not r69_event.get('team_is_home') and away_score > home_score)
-                                if is_r69w:
-                                    total_r69w += 1
-                                r69w = "W" if is_r69w else "L"
-                                print(f"      🎯 R69{r69w} | {team_name} hit 69 first at {r69_event['margin_at_69']:+d}")
-
-                    # Rate limit
-                    time.sleep(0.5)
-
-                except Exception as e:
-                    print(f"    ❌ Error processing game: {e}")
-                    total_errors += 1
-                    continue
-
-            conn.commit()
-            current_date += timedelta(days=1)
+            def finish(day):
+                finish_day(writer, known_games, day, stats, archive)
+                progress.emit('day', date=day.date.strftime('%Y-%m-%d'), league=league_value(day.league),
+                              found=day.found, **stats)
 
-            # Rate limit between days
-            time.sleep(1)
+            # Each day's summaries start downloading before the previous day
+            # (e.g. the other league's scoreboard for the same date) is written
+            previous = None
+            try:
+                for (current_date, season_label, league), data in scoreboards:
+                    events = scoreboard_events(data, current_date, league, stats)
+                    day = start_day(fetcher, known_games, current_date, events, season_label, stats, league)
+
+                    if previous:
+                        finish(previous)
+                        if args.limit is not None and stats['games'] >= args.limit:
+                            print(f"\n⚠ Reached --limit of {args.limit} new games")
+                            previous = None
+                            break
+
+                    if use_season_dates and season_label != current_season:
+                        current_season = season_label
+                        print(f"\n{'='*60}")
+                        print(f"SEASON: {season_label}")
+                        print(f"{'='*60}")
+
+                    previous = day
+
+                if previous:
+                    finish(previous)
+                writer.flush()
+            except BaseException:
+                # Nothing half-written is committed; the rerun picks the games up again
+                writer.rollback()
+                raise
+
+    if not args.dry_run:
+        known_games.save_snapshot()
+
+    total_games = stats['games']
+    total_cached_games = stats['cached']
+    total_r69_events = stats['r69_events']
+    total_r69w = stats['r69w']
+    total_errors = stats['errors']
 
     # Summary
     print("\n" + "=" * 80)
-    print("📊 SUMMARY")
+    print("📊 SUMMARY" + (" (dry run)" if args.dry_run else ""))
     print("=" * 80)
-    print(f"Total games processed (new): {total_games}")
-    print(f"Total games skipped (cached): {total_cached_games}")
-    print(f"Total games scanned: {total_games + total_cached_games}")
-    print(f"Total R69 events detected: {total_r69_events}")
-    print(f"Total R69W: {total_r69w}")
-    if total_r69_events > 0:
-        print(f"R69W Rate: {(total_r69w / total_r69_events * 100):.1f}%")
-    print(f"Total errors: {total_errors}")
-    print(f"\n⚡ Optimization: Skipped {total_cached_games} existing games")
+    if args.dry_run:
+        print(f"New final games to ingest: {total_games}")
+        print(f"Games already in database: {total_cached_games}")
+    else:
+        print(f"Total games processed (new): {total_games}")
+        print(f"Total games skipped (cached): {total_cached_games}")
+        print(f"Total games scanned: {total_games + total_cached_games}")
+        print(f"Total R69 events detected: {total_r69_events}")
+        print(f"Total R69W: {total_r69w}")
+        if total_r69_events > 0:
+            print(f"R69W Rate: {(total_r69w / total_r69_events * 100):.1f}%")
+        print(f"Total PBP events loaded: {stats['pbp_rows']}")
+        if stats['pbp_seconds'] > 0:
+            print(f"PBP load rate: {stats['pbp_rows'] / stats['pbp_seconds']:,.0f} rows/sec")
+        print(f"Total errors: {total_errors}")
+        print(f"\n⚡ Optimization: Skipped {total_cached_games} existing games")
+
+    timings = METRICS.summary_lines()
+    if timings:
+        print("\n⏱ Stage timings:")
+        for line in timings:
+            print(f"  {line}")
     print("=" * 80)
     print("\n✅ Data ingestion complete!\n")
+    progress.emit('summary', dry_run=args.dry_run, **stats)
 
-    cursor.close()
+    writer.close()
     conn.close()
 
 if __name__ == "__main__":
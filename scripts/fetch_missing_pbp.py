@@ -3,16 +3,44 @@
 """
 Fetch Missing Play-by-Play Data
 Fetches PBP data for games that don't have it yet
+
+Games without PBP are found through the maintained games.pbp_count column
+and its index, a page at a time, so the lookup cost does not grow with
+pbp_events. Run with --recount once after adding the column (or whenever
+the counts may have drifted) to recompute it from pbp_events.
+
+Summaries are fetched concurrently on the shared fetch engine under one
+request budget; games are written in the order they were found, each in its
+own savepoint, and committed in batches (--commit-games / --commit-seconds)
+with one bulk PBP load per batch.
+
+Usage:
+    python fetch_missing_pbp.py                              # menu (terminal) or every game
+    python fetch_missing_pbp.py --limit 200 -c 12 --league womens
+    python fetch_missing_pbp.py --since 2024-11-01 --dry-run
+    python fetch_missing_pbp.py --json-progress > progress.jsonl
+    python fetch_missing_pbp.py --limit 1000 --metrics-file metrics/missing_pbp.prom
 """
 
+import argparse
 import os
 import sys
-import requests
 import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime
 from dotenv import load_dotenv
-import time
+
+from r69w.batch_writer import DEFAULT_COMMIT_GAMES, DEFAULT_COMMIT_SECONDS, BatchWriter
+from r69w.client import League, extract_plays, fetch_summary
+from r69w.clock import period_lengths
+from r69w.fetcher import ConcurrentFetcher
+from r69w.metrics import DEFAULT_HOST as METRICS_HOST, METRICS, MetricsExporter
+from r69w.progress import ProgressReporter
+from r69w.detector import R69_TARGET, detect_race_events
+from r69w.parser import pbp_rows
+from r69w.writer import (
+    bulk_load_pbp_events, competitor_score, insert_r69_event, race_event_rows, refresh_pbp_counts,
+    upsert_race_events
+)
 
 # Fix Windows console encoding for Unicode characters
 if sys.platform == 'win32':
@@ -26,218 +54,235 @@ else:
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-ESPN_API_BASE = "https://site.api.espn.com/apis/site/v2/sports/basketball"
 
-def get_games_without_pbp(conn, limit=None):
-    """Get games that don't have PBP data"""
+# Games fetched per page of the missing-PBP query
+PAGE_SIZE = 500
+
+# Default fetch engine settings (override with --concurrency / --rate)
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 5.0  # requests per second
+
+# Shared WHERE clause for games that still need PBP (optional league / date filters)
+_MISSING_PBP_FILTER = """
+    g.pbp_count = 0
+    AND g.game_status = 'final'
+    AND (%(leagues)s::text[] IS NULL OR g.league::text = ANY(%(leagues)s::text[]))
+    AND (%(since)s::date IS NULL OR g.game_date >= %(since)s::date)
+"""
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch play-by-play (and R69 events) for final games missing it")
+    parser.add_argument('--limit', type=int, default=None, help="Process at most N games (default: all)")
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Concurrent summary requests (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--rate', '-r', type=float, default=DEFAULT_RATE,
+                        help=f"Request budget per second (default: {DEFAULT_RATE:g})")
+    parser.add_argument('--league', choices=[league.value for league in League], action='append',
+                        help="Only this league (repeatable; default: all)")
+    parser.add_argument('--since', type=parse_date, default=None, help="Only games on or after YYYY-MM-DD")
+    parser.add_argument('--batch-size', type=int, default=PAGE_SIZE,
+                        help=f"Games read per page of the missing-PBP query (default: {PAGE_SIZE})")
+    parser.add_argument('--commit-games', type=int, default=DEFAULT_COMMIT_GAMES,
+                        help=f"Commit after this many games (default: {DEFAULT_COMMIT_GAMES})")
+    parser.add_argument('--commit-seconds', type=float, default=DEFAULT_COMMIT_SECONDS,
+                        help=f"...or once the oldest uncommitted game is this old (default: {DEFAULT_COMMIT_SECONDS:g})")
+    parser.add_argument('--dry-run', action='store_true', help="List the games that would be processed and exit")
+    parser.add_argument('--json-progress', action='store_true',
+                        help="JSON Lines progress on stdout (human-readable output moves to stderr)")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write Prometheus-format stage timings and counters here (every 15s and at exit)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve the same metrics at http://localhost:PORT/metrics")
+    parser.add_argument('--metrics-host', default=METRICS_HOST,
+                        help="Interface for --metrics-port (default: 127.0.0.1; 0.0.0.0 for all)")
+    parser.add_argument('--recount', action='store_true',
+                        help="Recompute games.pbp_count from pbp_events first")
+    parser.add_argument('--interactive', '-i', action='store_true',
+                        help="Choose how many games from a menu (default when run from a terminal without --limit)")
+    return parser.parse_args(argv)
+
+def count_games_without_pbp(conn, leagues=None, since=None):
+    """Count final games that don't have PBP data (index-only on games.pbp_count)"""
     cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM games g WHERE {_MISSING_PBP_FILTER}",
+                   {'leagues': leagues, 'since': since})
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
 
-    query = """
-        SELECT g.id, g.game_id, g.home_team_name, g.away_team_name,
-               g.game_date, g.league, g.game_status
-        FROM games g
-        WHERE NOT EXISTS (
-            SELECT 1 FROM pbp_events p WHERE p.game_id = g.id
-        )
-        AND g.game_status = 'final'
-        ORDER BY g.game_date DESC
+def get_games_without_pbp(conn, limit=None, page_size=PAGE_SIZE, leagues=None, since=None):
     """
+    Yield final games that don't have PBP data, newest first
 
-    if limit:
-        query += f" LIMIT {limit}"
+    Pages are keyset queries on (game_date, id) against the
+    (pbp_count, game_status, game_date, id) index, so each page costs the
+    same however far in it is and however large pbp_events is. Each page is
+    its own short statement, so the caller can commit between batches.
 
-    cursor.execute(query)
-    games = cursor.fetchall()
-    cursor.close()
+    Args:
+        leagues: games.league values to include (default: all)
+        since: Only games on or after this date
+    """
+    remaining = limit
+    after = None
+
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT g.id, g.game_id, g.home_team_name, g.away_team_name,
+                   g.game_date, g.league, g.game_status
+            FROM games g
+            WHERE {_MISSING_PBP_FILTER}
+              AND (%(after_date)s::date IS NULL OR (g.game_date, g.id) < (%(after_date)s::date, %(after_id)s))
+            ORDER BY g.game_date DESC, g.id DESC
+            LIMIT %(size)s
+        """, {
+            'leagues': leagues,
+            'since': since,
+            'after_date': after[0] if after else None,
+            'after_id': after[1] if after else None,
+            'size': size
+        })
+        page = cursor.fetchall()
+        cursor.close()
 
-    return games
+        yield from page
 
-def fetch_play_by_play(game_id, league='mens-college-basketball'):
-    """Fetch play-by-play for a game"""
-    url = f"{ESPN_API_BASE}/{league}/summary"
-    params = {"event": game_id}
+        if len(page) < size:
+            return
+        if remaining is not None:
+            remaining -= len(page)
+        after = (page[-1][4], page[-1][0])
 
+def load_pbp(cursor, rows, blocks, totals):
+    """BatchWriter load_pbp callback: bulk load one batch's PBP and report it"""
+    inserted, staged, elapsed = bulk_load_pbp_events(cursor, rows, blocks)
+    totals['pbp_rows'] += inserted
+    rows_per_sec = staged / elapsed if elapsed > 0 else 0
+    print(f"  📥 Committed batch: {inserted}/{staged} PBP rows loaded in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+
+def commit_batch(writer, progress):
+    """Commit the writer's pending games; returns 1 if the batch's PBP load failed, else 0"""
+    games = writer.pending
     try:
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        return response.json()
+        writer.flush()
     except Exception as e:
-        print(f"    Error fetching PBP for {game_id}: {e}")
-        return {}
+        print(f"  ✗ Error loading PBP for the batch (games kept without PBP): {e}")
+        progress.emit('commit', games=games, error=str(e))
+        return 1
+    progress.emit('commit', games=games)
+    return 0
 
-def convert_clock_to_seconds(clock_str):
-    """Convert clock display (MM:SS) to seconds"""
-    try:
-        if ':' in clock_str:
-            parts = clock_str.split(':')
-            minutes = int(parts[0])
-            seconds = int(parts[1])
-            return minutes * 60 + seconds
-        return 0
-    except:
-        return 0
-
-def calculate_elapsed_time(period_num, clock_display):
-    """Calculate total elapsed time from start of game"""
-    # Each half is 20 minutes (1200 seconds)
-    # Clock counts down, so remaining time in current period
-    remaining_seconds = convert_clock_to_seconds(clock_display)
-
-    # Calculate elapsed time
-    if period_num == 1:
-        elapsed = 1200 - remaining_seconds
-    elif period_num == 2:
-        elapsed = 1200 + (1200 - remaining_seconds)
-    else:  # Overtime periods (5 min each)
-        elapsed = 2400 + ((period_num - 2) * 300) + (300 - remaining_seconds)
-
-    return elapsed
-
-def detect_r69_event(plays, home_team_id, away_team_id, home_team_name, away_team_name):
-    """Detect R69 event from play-by-play data - tracks first team to reach 69"""
-    home_hit_69 = False
-    away_hit_69 = False
-    r69_events = []
-
-    for play in plays:
-        home_score = play.get('homeScore', 0)
-        away_score = play.get('awayScore', 0)
-
-        # Check if home team hit 69 first
-        if home_score >= 69 and not home_hit_69 and not away_hit_69:
-            home_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            r69_events.append({
-                'team_id': home_team_id,
-                'team_name': home_team_name,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': home_score - away_score,
-                'opponent_score': away_score,
-                'description': play.get('text', '')
-            })
-
-        # Check if away team hit 69 first
-        if away_score >= 69 and not away_hit_69 and not home_hit_69:
-            away_hit_69 = True
-            period = play.get('period', {})
-            period_num = period.get('number', 1) if isinstance(period, dict) else 1
-            clock_display = play.get('clock', {}).get('displayValue', '0:00')
-            elapsed_time = calculate_elapsed_time(period_num, clock_display)
-
-            r69_events.append({
-                'team_id': away_team_id,
-                'team_name': away_team_name,
-                't_to_69': elapsed_time,
-                'period': period_num,
-                'margin_at_69': away_score - home_score,
-                'opponent_score': home_score,
-                'description': play.get('text', '')
-            })
-
-    return r69_events
-
-def save_pbp_events(conn, db_game_id, plays):
-    """Save play-by-play events to database"""
-    cursor = conn.cursor()
+def summary_teams(summary):
+    """
+    Home/away team IDs, names and final scores from a summary's header
 
-    pbp_data = []
-    for i, play in enumerate(plays):
-        period = play.get('period', {})
-        period_num = period.get('number', 1) if isinstance(period, dict) else 1
-        clock_display = play.get('clock', {}).get('displayValue', '0:00')
-        clock_seconds = convert_clock_to_seconds(clock_display)
-        elapsed_seconds = calculate_elapsed_time(period_num, clock_display)
-
-        # Extract team and player info
-        team_id = play.get('team', {}).get('id', None) if play.get('team') else None
-
-        # Get scoring team for shots
-        scoring_team_id = None
-        points_scored = 0
-        event_type = play.get('type', {}).get('text', 'unknown')
-
-        if play.get('scoringPlay', False):
-            scoring_team_id = team_id
-            # Try to determine points from score value
-            score_value = play.get('scoreValue', 0)
-            points_scored = score_value if score_value else 0
-
-        pbp_data.append((
-            db_game_id,
-            i,  # sequence_number
-            period_num,
-            clock_seconds,
-            elapsed_seconds,
-            team_id,
-            None,  # player_name - not always available
-            event_type,
-            points_scored,
-            play.get('homeScore', 0),
-            play.get('awayScore', 0),
-            play.get('text', '')
-        ))
-
-    if pbp_data:
-        insert_query = """
-            INSERT INTO pbp_events (
-                game_id, sequence_number, period, clock_seconds, elapsed_seconds,
-                team_id, player_name, event_type, points_scored,
-                home_score, away_score, description
-            ) VALUES %s
-            ON CONFLICT (game_id, sequence_number) DO NOTHING
-        """
-        execute_values(cursor, insert_query, pbp_data)
-        conn.commit()
-        cursor.close()
-        return len(pbp_data)
+    Returns:
+        (home_team_id, away_team_id, home_team_name, away_team_name, home_score, away_score)
+    """
+    home_team_id = None
+    away_team_id = None
+    home_team_name = None
+    away_team_name = None
+    home_score = 0
+    away_score = 0
+
+    competitions = summary.get('header', {}).get('competitions', [{}])
+    for comp in (competitions[0].get('competitors', []) if competitions else []):
+        if comp.get('homeAway') == 'home':
+            home_team_id = comp.get('id')
+            home_team_name = comp.get('team', {}).get('displayName', '')
+            home_score = competitor_score(comp)
+        else:
+            away_team_id = comp.get('id')
+            away_team_name = comp.get('team', {}).get('displayName', '')
+            away_score = competitor_score(comp)
+
+    return home_team_id, away_team_id, home_team_name, away_team_name, home_score, away_score
+
+def process_game(writer, db_game_id, pbp_data, league=League.MENS.value):
+    """
+    Stage one game's PBP and write its R69 and race-to-N events in the writer's batch
 
-    cursor.close()
-    return 0
+    The event writes run in the game's savepoint; the PBP rows are loaded
+    with the rest of the batch when it is committed. `league` (games.league)
+    picks the game's period lengths.
 
-def save_r69_events(conn, db_game_id, r69_events, final_home_score, final_away_score):
-    """Save R69 events to database"""
-    cursor = conn.cursor()
+    Returns:
+        (status, pbp_count, r69_team_name) where status is 'ok', 'no_data',
+        'no_plays' or 'rolled_back' (pbp_count is the number of rows staged)
+    """
+    if not pbp_data:
+        return 'no_data', 0, None
+
+    # Extract plays
+    plays = extract_plays(pbp_data)
+    if not plays:
+        return 'no_plays', 0, None
+
+    home_team_id, away_team_id, home_team_name, away_team_name, home_score, away_score = summary_teams(pbp_data)
+    r69_team = None
+    lengths = period_lengths(league)
+
+    with writer.game() as pending:
+        # Stage PBP events for the batch's bulk load
+        with METRICS.time('parse'):
+            pending.rows.extend(pbp_rows(db_game_id, plays, lengths))
+
+        # Detect and save R69 / race events (team info from the summary header)
+        if home_team_id and away_team_id:
+            with METRICS.time('detect'):
+                race_events = detect_race_events(plays, home_team_id, away_team_id, lengths=lengths)
+            upsert_race_events(writer.cursor, race_event_rows(db_game_id, race_events, home_score, away_score))
+
+            r69_event = race_events.get(R69_TARGET)
+            if r69_event:
+                r69_event['team_name'] = home_team_name if r69_event['team_is_home'] else away_team_name
+                insert_r69_event(writer.cursor, db_game_id, r69_event, home_score, away_score)
+                r69_team = r69_event['team_name']
+
+    if not pending.written:
+        return 'rolled_back', 0, None
+
+    return 'ok', len(pending.rows), r69_team
+
+def choose_limit(total_games):
+    """Interactive menu: how many games to process (None to cancel)"""
+    print(f"\nHow many games would you like to process?")
+    print(f"1. Process 10 games (test)")
+    print(f"2. Process 50 games")
+    print(f"3. Process 100 games")
+    print(f"4. Process all {total_games} games")
+    print(f"5. Custom amount")
 
-    for event in r69_events:
-        # Determine if this was an R69W (won after hitting 69 first)
-        # Compare final scores to see if this team won
-        team_id = event['team_id']
-
-        # We need to determine if this team won
-        # This is a simplified check - you might need home/away logic
-        r69w = False  # Default to False, will be updated with actual logic
-        final_margin = 0
-
-        insert_query = """
-            INSERT INTO r69_events (
-                game_id, team_id, team_name, t_to_69, period_at_69,
-                margin_at_69, score_at_69_opponent, r69w, final_margin, play_description
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (game_id, team_id) DO NOTHING
-        """
-
-        cursor.execute(insert_query, (
-            db_game_id,
-            team_id,
-            event['team_name'],
-            event['t_to_69'],
-            event['period'],
-            event['margin_at_69'],
-            event['opponent_score'],
-            r69w,  # Will need to calculate this properly
-            final_margin,
-            event['description']
-        ))
-
-    conn.commit()
-    cursor.close()
+    choice = input("\nEnter choice (1-5): ").strip()
+
+    if choice == '1':
+        return 10
+    elif choice == '2':
+        return 50
+    elif choice == '3':
+        return 100
+    elif choice == '4':
+        return total_games
+    elif choice == '5':
+        return int(input("Enter number of games: "))
+
+    print("Invalid choice")
+    return None
 
 def main():
+    args = parse_args()
+    progress = ProgressReporter(args.json_progress)
+
     print("=" * 60)
     print("R69W Missing PBP Data Fetcher")
     print("=" * 60)
@@ -245,6 +290,7 @@ def main():
 
     if not DATABASE_URL:
         print("ERROR: DATABASE_URL not found in environment")
+        progress.emit('error', message="DATABASE_URL not found in environment")
         sys.exit(1)
 
     # Connect to database
@@ -253,122 +299,117 @@ def main():
         print("✓ Connected to database")
     except Exception as e:
         print(f"ERROR: Could not connect to database: {e}")
+        progress.emit('error', message=f"database connection failed: {e}")
         sys.exit(1)
 
-    # Get games without PBP
+    if args.recount:
+        print("\nRecomputing games.pbp_count from pbp_events...")
+        cursor = conn.cursor()
+        changed = refresh_pbp_counts(cursor)
+        conn.commit()
+        cursor.close()
+        print(f"✓ Updated {changed} games")
+
+    # Count games without PBP
     print("\nFinding games without PBP data...")
-    games_without_pbp = get_games_without_pbp(conn)
-    total_games = len(games_without_pbp)
+    total_games = count_games_without_pbp(conn, args.league, args.since)
 
     print(f"Found {total_games} games without PBP data")
 
     if total_games == 0:
         print("All games have PBP data!")
+        progress.emit('summary', total=0, processed=0, errors=0, pbp_rows=0, r69_events=0)
         conn.close()
         return
 
-    # Ask user how many to process
-    print(f"\nHow many games would you like to process?")
-    print(f"1. Process 10 games (test)")
-    print(f"2. Process 50 games")
-    print(f"3. Process 100 games")
-    print(f"4. Process all {total_games} games")
-    print(f"5. Custom amount")
-
-    choice = input("\nEnter choice (1-5): ").strip()
-
-    if choice == '1':
-        limit = 10
-    elif choice == '2':
-        limit = 50
-    elif choice == '3':
-        limit = 100
-    elif choice == '4':
-        limit = total_games
-    elif choice == '5':
-        limit = int(input("Enter number of games: "))
-    else:
-        print("Invalid choice")
+    limit = args.limit
+    if limit is None and (args.interactive or (sys.stdin.isatty() and not args.dry_run)):
+        limit = choose_limit(total_games)
+        if limit is None:
+            conn.close()
+            return
+
+    limit = total_games if limit is None else min(limit, total_games)
+    games_to_process = get_games_without_pbp(conn, limit, args.batch_size, args.league, args.since)
+    progress.emit('start', total=limit, dry_run=args.dry_run, leagues=args.league, since=args.since)
+
+    if args.dry_run:
+        print(f"\nDry run: {limit} games would be processed")
+        print()
+        for idx, game in enumerate(games_to_process, 1):
+            db_game_id, espn_game_id, home_team, away_team, game_date, league, status = game
+            print(f"[{idx}/{limit}] {game_date} {league} {home_team} vs {away_team} (ESPN ID: {espn_game_id})")
+            progress.emit('game', index=idx, game_id=espn_game_id, league=league, date=game_date, status='pending')
+        progress.emit('summary', total=limit, dry_run=True)
         conn.close()
         return
 
-    games_to_process = games_without_pbp[:limit]
-
-    print(f"\nProcessing {len(games_to_process)} games...")
+    print(f"\nProcessing {limit} games ({args.concurrency} concurrent, {args.rate:g} requests/sec)...")
     print()
 
     success_count = 0
     error_count = 0
+    totals = {'pbp_rows': 0}  # rows actually loaded by committed batches
+    r69_total = 0
+
+    writer = BatchWriter(
+        conn, max_games=args.commit_games, max_seconds=args.commit_seconds,
+        load_pbp=lambda cursor, rows, blocks: load_pbp(cursor, rows, blocks, totals)
+    )
+
+    with MetricsExporter(path=args.metrics_file, port=args.metrics_port, host=args.metrics_host), \
+            ConcurrentFetcher(concurrency=args.concurrency, rate=args.rate) as fetcher:
+        # Summaries download ahead on the fetch engine; the DB writes stay on this thread.
+        # The league is the games.league value (e.g. 'mens'); the client maps it to ESPN's path.
+        summaries = fetcher.imap(
+            lambda game: fetch_summary(game[1], game[5], fetcher=fetcher, selective=True),
+            games_to_process,
+            window=args.concurrency * 2
+        )
 
-    for idx, game in enumerate(games_to_process, 1):
-        db_game_id, espn_game_id, home_team, away_team, game_date, league, status = game
-
-        print(f"[{idx}/{len(games_to_process)}] {home_team} vs {away_team}")
-        print(f"  Date: {game_date}, ESPN ID: {espn_game_id}")
-
-        # Determine league string for API
-        league_str = 'mens-college-basketball' if league == 'mens' else 'womens-college-basketball'
-
-        # Fetch PBP data
-        pbp_data = fetch_play_by_play(espn_game_id, league_str)
-
-        if not pbp_data:
-            print(f"  ✗ No PBP data available")
-            error_count += 1
-            time.sleep(0.5)  # Rate limiting
-            continue
-
-        # Extract plays
-        plays = []
-        if 'plays' in pbp_data:
-            for play_group in pbp_data['plays']:
-                if isinstance(play_group, dict) and 'items' in play_group:
-                    plays.extend(play_group['items'])
-
-        if not plays:
-            print(f"  ✗ No plays found in response")
-            error_count += 1
-            time.sleep(0.5)
-            continue
-
-        # Save PBP events
-        pbp_count = save_pbp_events(conn, db_game_id, plays)
-        print(f"  ✓ Saved {pbp_count} PBP events")
-
-        # Detect and save R69 events
-        # Get team info from header
-        header = pbp_data.get('header', {})
-        competitions = header.get('competitions', [{}])
-        if competitions:
-            competitors = competitions[0].get('competitors', [])
-            home_team_id = None
-            away_team_id = None
-            home_team_name = None
-            away_team_name = None
-            home_score = 0
-            away_score = 0
-
-            for comp in competitors:
-                if comp.get('homeAway') == 'home':
-                    home_team_id = comp.get('id')
-                    home_team_name = comp.get('team', {}).get('displayName', '')
-                    home_score = int(comp.get('score', 0))
+        try:
+            for idx, (game, pbp_data) in enumerate(summaries, 1):
+                db_game_id, espn_game_id, home_team, away_team, game_date, league, status = game
+
+                print(f"[{idx}/{limit}] {home_team} vs {away_team}")
+                print(f"  Date: {game_date}, ESPN ID: {espn_game_id}")
+
+                try:
+                    result, pbp_count, r69_team = process_game(writer, db_game_id, pbp_data, league)
+                except Exception as e:
+                    print(f"  ✗ Error saving game: {e}")
+                    result, pbp_count, r69_team = 'error', 0, None
+
+                if result == 'no_data':
+                    print(f"  ✗ No PBP data available")
+                elif result == 'no_plays':
+                    print(f"  ✗ No plays found in response")
+                elif result == 'rolled_back':
+                    print(f"  ✗ Game rolled back after a write error")
+                elif result == 'ok':
+                    print(f"  ✓ Staged {pbp_count} PBP events")
+                    if r69_team:
+                        print(f"  ✓ Detected R69 event ({r69_team})")
+
+                if result == 'ok':
+                    success_count += 1
+                    r69_total += 1 if r69_team else 0
                 else:
-                    away_team_id = comp.get('id')
-                    away_team_name = comp.get('team', {}).get('displayName', '')
-                    away_score = int(comp.get('score', 0))
+                    error_count += 1
 
-            if home_team_id and away_team_id:
-                r69_events = detect_r69_event(plays, home_team_id, away_team_id,
-                                              home_team_name, away_team_name)
-                if r69_events:
-                    save_r69_events(conn, db_game_id, r69_events, home_score, away_score)
-                    print(f"  ✓ Detected {len(r69_events)} R69 event(s)")
+                progress.emit('game', index=idx, total=limit, game_id=espn_game_id, league=league, status=result,
+                              pbp_rows=pbp_count, r69=bool(r69_team))
 
-        success_count += 1
+                if writer.due():
+                    error_count += commit_batch(writer, progress)
 
-        # Rate limiting - be nice to ESPN API
-        time.sleep(0.5)
+            error_count += commit_batch(writer, progress)
+        except BaseException:
+            # Interrupted mid-batch: the uncommitted games stay at pbp_count = 0 for the next run
+            writer.rollback()
+            raise
+        finally:
+            writer.close()
 
     conn.close()
 
@@ -376,7 +417,14 @@ def main():
     print("=" * 60)
     print(f"COMPLETE: Processed {success_count} games successfully")
     print(f"Errors: {error_count}")
+    for line in METRICS.summary_lines():
+        print(line)
     print("=" * 60)
+    progress.emit('summary', total=limit, processed=success_count, errors=error_count,
+                  pbp_rows=totals['pbp_rows'], r69_events=r69_total)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
@@ -3,14 +3,26 @@
 """
 Team Logo Fetcher
 Fetches and stores team logos from ESPN API for all teams in the database
+
+Team lookups run concurrently on the fetch engine and go through the local
+response cache, revalidated with ETag / Last-Modified, so re-runs mostly cost
+304s. Logos are applied with one set-based UPDATE per side (home/away), and
+only game rows whose logo actually changes are rewritten.
+
+Usage:
+    python fetch_team_logos.py              # teams with games missing a logo
+    python fetch_team_logos.py --refresh    # re-check every team's logo
 """
 
+import argparse
 import os
 import sys
-import requests
 import psycopg2
 from dotenv import load_dotenv
-import time
+from psycopg2.extras import execute_values
+
+from r69w.client import MENS_LEAGUE, RESPONSE_CACHE, fetch_team
+from r69w.fetcher import ConcurrentFetcher
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -24,15 +36,21 @@ else:
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-ESPN_API_BASE = "https://site.api.espn.com/apis/site/v2/sports/basketball"
 
-def fetch_team_logo(team_id, league='mens-college-basketball'):
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch team logos from ESPN and store them on games")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Re-check every team, not just teams with games missing a logo")
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help="Concurrent team requests (default: 8)")
+    parser.add_argument('--rate', '-r', type=float, default=5.0, help="Request budget per second (default: 5)")
+    return parser.parse_args()
+
+def fetch_team_logo(team_id, league=MENS_LEAGUE, fetcher=None, cache=RESPONSE_CACHE):
     """Fetch team logo URL from ESPN API"""
     try:
-        url = f"{ESPN_API_BASE}/{league}/teams/{team_id}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_team(team_id, league, fetcher=fetcher, cache=cache)
+        if not data:
+            return None
 
         team = data.get('team', {})
         logos = team.get('logos', [])
@@ -48,47 +66,73 @@ def fetch_team_logo(team_id, league='mens-college-basketball'):
         return None
 
 def get_unique_teams(cursor):
-    """Get all unique teams from games"""
+    """Get all unique teams from games (one row per distinct stored logo)"""
     cursor.execute("""
         SELECT DISTINCT
             home_team_id as team_id,
             home_team_name as team_name,
-            home_team_logo as current_logo
+            home_team_logo as current_logo,
+            league
         FROM games
         WHERE home_team_id IS NOT NULL AND home_team_id != ''
         UNION
         SELECT DISTINCT
             away_team_id as team_id,
             away_team_name as team_name,
-            away_team_logo as current_logo
+            away_team_logo as current_logo,
+            league
         FROM games
         WHERE away_team_id IS NOT NULL AND away_team_id != ''
         ORDER BY team_name
     """)
     return cursor.fetchall()
 
-def update_team_logos(cursor, team_id, logo_url):
-    """Update logo for all games with this team"""
-    cursor.execute("""
-        UPDATE games
-        SET home_team_logo = %s, updated_at = NOW()
-        WHERE home_team_id = %s
-    """, (logo_url, team_id))
+def group_teams(rows):
+    """
+    Collapse get_unique_teams rows into one entry per team
 
-    home_updated = cursor.rowcount
+    Returns:
+        Dict of team_id -> {'name', 'league', 'logos'} where logos is the set
+        of distinct stored logos ('' for games without one)
+    """
+    teams = {}
+    for team_id, team_name, current_logo, league in rows:
+        team = teams.setdefault(team_id, {'name': team_name, 'league': league, 'logos': set()})
+        team['logos'].add((current_logo or '').strip())
+    return teams
 
-    cursor.execute("""
-        UPDATE games
-        SET away_team_logo = %s, updated_at = NOW()
-        WHERE away_team_id = %s
-    """, (logo_url, team_id))
+def update_team_logos(cursor, logos):
+    """
+    Apply logos to every game of each team, one UPDATE per side
 
-    away_updated = cursor.rowcount
+    Rows that already have the logo are not touched.
 
-    return home_updated + away_updated
+    Args:
+        logos: List of (team_id, logo_url)
+
+    Returns:
+        Number of game rows updated
+    """
+    if not logos:
+        return 0
+
+    updated = 0
+    for side in ('home', 'away'):
+        execute_values(cursor, f"""
+            UPDATE games g
+            SET {side}_team_logo = v.logo, updated_at = NOW()
+            FROM (VALUES %s) AS v(team_id, logo)
+            WHERE g.{side}_team_id = v.team_id
+              AND g.{side}_team_logo IS DISTINCT FROM v.logo
+        """, logos, page_size=len(logos))
+        updated += cursor.rowcount
+
+    return updated
 
 def main():
     """Main execution"""
+    args = parse_args()
+
     print("\n" + "=" * 80)
     print("🏀 TEAM LOGO FETCHER")
     print("=" * 80)
@@ -106,55 +150,53 @@ def main():
 
     # Get all unique teams
     print("\n📊 Fetching teams from database...")
-    teams = get_unique_teams(cursor)
+    teams = group_teams(get_unique_teams(cursor))
     print(f"Found {len(teams)} unique teams")
 
+    # Unless refreshing, only teams with at least one game missing a logo
+    if args.refresh:
+        to_fetch = list(teams)
+    else:
+        to_fetch = [team_id for team_id, team in teams.items() if '' in team['logos']]
+
     # Stats
     total_teams = len(teams)
-    updated = 0
-    already_had_logo = 0
+    already_had_logo = total_teams - len(to_fetch)
+    unchanged = 0
     failed = 0
+    changed = []
 
-    print("\n🔄 Fetching logos...")
+    print(f"\n🔄 Fetching logos for {len(to_fetch)} teams ({args.concurrency} concurrent)...")
     print("─" * 80)
 
-    for team_id, team_name, current_logo in teams:
-        print(f"\n[{updated + already_had_logo + failed + 1}/{total_teams}] {team_name}")
-        print(f"  Team ID: {team_id}")
-
-        # Check if already has logo
-        if current_logo and current_logo.strip():
-            print(f"  ✓ Already has logo: {current_logo[:60]}...")
-            already_had_logo += 1
-            continue
-
-        # Fetch logo
-        print(f"  Fetching logo from ESPN...")
-        logo_url = fetch_team_logo(team_id)
-
-        if logo_url:
-            print(f"  ✓ Found: {logo_url[:60]}...")
+    def fetch(team_id):
+        return fetch_team_logo(team_id, teams[team_id]['league'], fetcher=fetcher)
 
-            # Update database
-            games_updated = update_team_logos(cursor, team_id, logo_url)
-            conn.commit()
+    with ConcurrentFetcher(concurrency=args.concurrency, rate=args.rate) as fetcher:
+        for i, (team_id, logo_url) in enumerate(fetcher.imap(fetch, to_fetch), 1):
+            team = teams[team_id]
 
-            print(f"  ✓ Updated {games_updated} games")
-            updated += 1
-        else:
-            print(f"  ✗ No logo found")
-            failed += 1
+            if not logo_url:
+                print(f"[{i}/{len(to_fetch)}] ✗ {team['name']} ({team_id}): no logo found")
+                failed += 1
+            elif team['logos'] == {logo_url}:
+                unchanged += 1
+            else:
+                print(f"[{i}/{len(to_fetch)}] ✓ {team['name']} ({team_id}): {logo_url[:60]}...")
+                changed.append((team_id, logo_url))
 
-        # Rate limiting
-        time.sleep(0.5)
+    # Update database
+    games_updated = update_team_logos(cursor, changed)
+    conn.commit()
 
     # Summary
     print("\n" + "=" * 80)
     print("📊 SUMMARY")
     print("=" * 80)
     print(f"Total teams: {total_teams}")
-    print(f"Already had logos: {already_had_logo}")
-    print(f"Newly fetched: {updated}")
+    print(f"Already had logos (not fetched): {already_had_logo}")
+    print(f"Fetched, unchanged: {unchanged}")
+    print(f"Fetched, updated: {len(changed)} ({games_updated} game rows)")
     print(f"Failed to fetch: {failed}")
     print("=" * 80)
     print("\n✅ Logo fetching complete!\n")
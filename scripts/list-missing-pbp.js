@@ -11,9 +11,7 @@ async function listMissingPBP() {
     // Get games without PBP
     const gamesWithoutPBP = await prisma.game.findMany({
       where: {
-        pbpEvents: {
-          none: {}
-        },
+        pbpCount: 0,
         gameStatus: 'FINAL'
       },
       orderBy: {
@@ -33,9 +31,7 @@ async function listMissingPBP() {
 
     const totalCount = await prisma.game.count({
       where: {
-        pbpEvents: {
-          none: {}
-        }
+        pbpCount: 0
       }
     })
 
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+R69W Live Poller
+Long-running daemon that keeps in-progress games, their play-by-play and R69
+events fresh in the database (what /api/stats/live reads)
+
+Scoreboards for each league are polled on a fixed interval. Every game that
+is in progress gets its own summary poll schedule, adapted to the game state:
+
+    near 69 (a team at 60+, no R69 yet)       every 10s
+    last 5 minutes of regulation / OT         every 15s
+    otherwise live                            every 30s
+    halftime / end of period                  every 120s
+    final                                     one last poll, then dropped
+
+Only changed rows are written: a game row is upserted when its score,
+status or period changes, only new plays are bulk loaded, and the R69
+event is inserted once (and settled with r69w/final_margin when the game
+goes final). Each game's writes run in their own savepoint and are
+committed before the game's in-memory state moves on; a poll whose writes
+fail is re-read in full on the next poll, so no plays or R69 events are
+lost.
+
+Usage:
+    python live_poller.py
+    python live_poller.py --league mens --scoreboard-interval 30
+    python live_poller.py --once    # single pass (cron / testing)
+    python live_poller.py --metrics-port 9469    # Prometheus scrape target
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+
+from data_ingestion import GameProcessor
+from r69w.batch_writer import BatchWriter
+from r69w.cache import ResponseCache
+from r69w.client import RESPONSE_CACHE, ESPNAPIClient, League
+from r69w.clock import HALVES, convert_clock_to_seconds
+from r69w.fetcher import ConcurrentFetcher
+from r69w.metrics import DEFAULT_HOST as METRICS_HOST, METRICS, MetricsExporter
+from r69w.writer import (
+    bulk_load_pbp_events, competitor_score, event_competitors, finalize_r69_events,
+    game_row_from_event, insert_r69_event, upsert_game
+)
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+# Summary poll intervals (seconds)
+INTERVAL_NEAR_69 = 10
+INTERVAL_CLUTCH = 15
+INTERVAL_LIVE = 30
+INTERVAL_BREAK = 120
+
+NEAR_69_SCORE = 60
+CLUTCH_SECONDS = 300  # last 5 minutes of the final regulation period or any overtime
+
+DEFAULT_SCOREBOARD_INTERVAL = 60
+
+# Settled games are remembered this many days past the day they finished:
+# the scoreboard only covers today, so older ones cannot show up again
+FINISHED_RETENTION_DAYS = 1
+
+BREAK_STATUSES = {'STATUS_HALFTIME', 'STATUS_END_PERIOD'}
+ENDED_STATUSES = {'STATUS_FINAL', 'STATUS_POSTPONED', 'STATUS_CANCELED'}
+
+
+@dataclass(order=True)
+class LiveGame:
+    """Poll schedule and last written state for one tracked game"""
+    next_poll: float
+    game_id: str = field(compare=False)
+    league: League = field(compare=False)
+    event: Dict = field(compare=False, default_factory=dict)
+    db_game_id: Optional[str] = field(compare=False, default=None)
+    fingerprint: Optional[tuple] = field(compare=False, default=None)
+    r69_recorded: bool = field(compare=False, default=False)
+    final: bool = field(compare=False, default=False)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Poll live games into the database")
+    parser.add_argument('--league', choices=['mens', 'womens'], action='append',
+                        help="League to poll (repeatable, default: both)")
+    parser.add_argument('--scoreboard-interval', type=float, default=DEFAULT_SCOREBOARD_INTERVAL,
+                        help=f"Seconds between scoreboard polls (default: {DEFAULT_SCOREBOARD_INTERVAL})")
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help="Concurrent summary requests (default: 8)")
+    parser.add_argument('--rate', '-r', type=float, default=5.0, help="Request budget per second (default: 5)")
+    parser.add_argument('--once', action='store_true', help="Poll every live game once and exit")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Write Prometheus-format stage timings and counters here (every 15s and at exit)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Serve the same metrics at http://localhost:PORT/metrics")
+    parser.add_argument('--metrics-host', default=METRICS_HOST,
+                        help="Interface for --metrics-port (default: 127.0.0.1; 0.0.0.0 for all)")
+    return parser.parse_args()
+
+
+def event_status(event):
+    """(status_name, period, seconds_remaining) from a scoreboard event"""
+    competition = event.get('competitions', [{}])[0]
+    status = competition.get('status') or event.get('status') or {}
+    clock = status.get('displayClock')
+    remaining = convert_clock_to_seconds(clock) if clock else int(status.get('clock') or 0)
+    return status.get('type', {}).get('name', 'STATUS_SCHEDULED'), status.get('period', 0), remaining
+
+
+def next_poll_interval(status_name, period, remaining, max_score, r69_triggered, lengths=HALVES):
+    """
+    Seconds until the next summary poll for a game, or None once it has ended
+
+    Args:
+        status_name: ESPN status name (STATUS_IN_PROGRESS, STATUS_HALFTIME, ...)
+        period: Current period (halves or quarters, then overtimes)
+        remaining: Seconds remaining in the period
+        max_score: Higher of the two current scores
+        r69_triggered: Whether a team has already reached 69
+        lengths: The league's PeriodLengths (GameProcessor.lengths)
+    """
+    if status_name in ENDED_STATUSES:
+        return None
+    if status_name in BREAK_STATUSES:
+        return INTERVAL_BREAK
+    if not r69_triggered and max_score >= NEAR_69_SCORE:
+        return INTERVAL_NEAR_69
+    if period >= lengths.periods and remaining <= CLUTCH_SECONDS:
+        return INTERVAL_CLUTCH
+    return INTERVAL_LIVE
+
+
+def game_fingerprint(event):
+    """The parts of a scoreboard event that change the games row"""
+    home_team, away_team = event_competitors(event)
+    status_name, period, _ = event_status(event)
+    return competitor_score(home_team), competitor_score(away_team), status_name, period
+
+
+class LivePoller:
+    """Scoreboard + per-game summary scheduler writing changed rows only"""
+
+    def __init__(self, conn, leagues, fetcher, scoreboard_interval=DEFAULT_SCOREBOARD_INTERVAL):
+        self.conn = conn
+        # Savepoint per game row / poll; committed right away (flush) rather than batched
+        self.writer = BatchWriter(conn, max_games=None, max_seconds=None)
+        self.scoreboard_interval = scoreboard_interval
+
+        # Final payloads stay cached forever; live payloads are never served from cache
+        cache = ResponseCache(root=RESPONSE_CACHE.root, live_ttl=0) if RESPONSE_CACHE else None
+        self.processors = {
+            league: GameProcessor(ESPNAPIClient(league, cache=cache, fetcher=fetcher, selective=True))
+            for league in leagues
+        }
+        self.fetcher = fetcher
+
+        self.games: Dict[str, LiveGame] = {}
+        self.schedule = []  # heap of LiveGame by next_poll
+        self.finished: Dict[str, date] = {}  # settled game_id -> day it was settled
+        self.next_scoreboard = 0.0
+        self.stats = {'scoreboards': 0, 'polls': 0, 'game_updates': 0, 'pbp_rows': 0, 'r69_events': 0, 'errors': 0}
+
+    def poll_scoreboards(self, now):
+        """Refresh every league's scoreboard and (re)schedule live games"""
+        self.prune_finished(date.today())
+        for league, processor in self.processors.items():
+            scoreboard = processor.api_client.get_scoreboard()
+            if scoreboard is None:
+                # Tracked games keep polling; the next scoreboard refresh picks up new ones
+                self.stats['errors'] += 1
+                continue
+            events = scoreboard.get('events', [])
+            self.stats['scoreboards'] += 1
+
+            for event in events:
+                game_id = event.get('id')
+                if not game_id or game_id in self.finished:
+                    continue
+
+                status_name, _, _ = event_status(event)
+                game = self.games.get(game_id)
+
+                if game is None:
+                    # Only track games once they tip off (finished ones belong to the historical fetcher)
+                    if status_name == 'STATUS_SCHEDULED' or status_name in ENDED_STATUSES:
+                        continue
+                    game = LiveGame(next_poll=now, game_id=game_id, league=league)
+                    self.games[game_id] = game
+                    heapq.heappush(self.schedule, game)
+                    print(f"  ▶ Tracking {event.get('shortName', game_id)} ({league.value})")
+
+                game.event = event
+                self.write_game_row(game)
+
+                if status_name in ENDED_STATUSES and not game.final:
+                    # Pull the final plays right away
+                    game.final = True
+                    self.reschedule(game, now)
+
+        self.next_scoreboard = now + self.scoreboard_interval
+
+    def prune_finished(self, today):
+        """Forget settled games that can no longer appear on the scoreboard"""
+        cutoff = today - timedelta(days=FINISHED_RETENTION_DAYS)
+        for game_id in [game_id for game_id, day in self.finished.items() if day < cutoff]:
+            del self.finished[game_id]
+
+    def write_game_row(self, game):
+        """Upsert the games row only if the score, status or period changed"""
+        fingerprint = game_fingerprint(game.event)
+        if fingerprint == game.fingerprint and game.db_game_id:
+            return
+
+        _, period, _ = event_status(game.event)
+        regulation = self.processors[game.league].lengths.periods
+        cursor = self.writer.cursor
+        r69_recorded = game.r69_recorded
+        try:
+            row = game_row_from_event(game.event, league=game.league.value)
+            row['total_periods'] = max(regulation, period or regulation)
+            row['overtime_flag'] = (period or 0) > regulation
+
+            with self.writer.game() as pending:
+                db_game_id = upsert_game(cursor, row)
+                if db_game_id and game.db_game_id is None:
+                    # After a restart the R69 event may already be in the database
+                    cursor.execute("SELECT 1 FROM r69_events WHERE game_id = %s LIMIT 1", (db_game_id,))
+                    r69_recorded = cursor.fetchone() is not None
+        except Exception as e:
+            print(f"  ❌ Error writing game {game.game_id}: {e}")
+            db_game_id = None
+
+        if not db_game_id or not pending.written:
+            # Rolled back on its own; the rest of the tick is still committed
+            self.stats['errors'] += 1
+            return
+
+        game.db_game_id = db_game_id
+        game.fingerprint = fingerprint
+        game.r69_recorded = r69_recorded
+        self.stats['game_updates'] += 1
+
+    def reschedule(self, game, next_poll):
+        game.next_poll = next_poll
+        heapq.heapify(self.schedule)
+
+    def due_games(self, now):
+        """Pop every game whose summary poll is due"""
+        due = []
+        while self.schedule and self.schedule[0].next_poll <= now:
+            due.append(heapq.heappop(self.schedule))
+        return due
+
+    def poll_game(self, game):
+        """
+        Worker: fetch only new plays for a game (runs on the fetch pool)
+
+        Returns:
+            (plays, error): error is the exception if the poll failed; it is
+            reported and counted by run_once on the main thread
+        """
+        processor = self.processors[game.league]
+        try:
+            plays, _ = processor.process_live_play_by_play(game.game_id)
+            return plays, None
+        except Exception as e:
+            return [], e
+
+    def write_poll(self, game, plays):
+        """
+        Write a polled game's new plays, its R69 event (until one is stored)
+        and, once the game has ended, its settled R69 outcome; then commit
+
+        Everything runs in one savepoint and the game's state (stats,
+        r69_recorded, schedule) only moves on after the commit.
+
+        Raises:
+            RuntimeError: the game's writes were rolled back
+        """
+        processor = self.processors[game.league]
+        detector = processor.live_detectors.get(game.game_id)
+
+        interval = None
+        if not game.final:
+            status_name, period, remaining = event_status(game.event)
+            max_score = max(detector.home_score, detector.away_score) if detector else 0
+            interval = next_poll_interval(status_name, period, remaining, max_score,
+                                          bool(detector and detector.triggered), processor.lengths)
+
+        r69_data = None
+        if detector and detector.event and not game.r69_recorded:
+            home_team, away_team = event_competitors(game.event)
+            team = home_team if detector.event['team_is_home'] else away_team
+            r69_data = dict(detector.event, team_name=team.get('team', {}).get('displayName', ''))
+
+        cursor = self.writer.cursor
+        inserted = 0
+        r69_inserted = False
+        with self.writer.game() as pending:
+            if plays:
+                inserted, _, _ = bulk_load_pbp_events(cursor, [p.row(game.db_game_id) for p in plays])
+            if r69_data:
+                home_score, away_score, _, _ = game_fingerprint(game.event)
+                r69_inserted = insert_r69_event(cursor, game.db_game_id, r69_data, home_score, away_score)
+            if interval is None:
+                finalize_r69_events(cursor, game.db_game_id)
+        if not pending.written:
+            raise RuntimeError("writes rolled back")
+        self.writer.flush()
+
+        self.stats['pbp_rows'] += inserted
+        if r69_data:
+            # Inserted now, or already stored (ON CONFLICT): either way it is recorded
+            game.r69_recorded = True
+            if r69_inserted:
+                self.stats['r69_events'] += 1
+                print(f"  🎯 R69 | {r69_data['team_name']} hit 69 first at {r69_data['margin_at_69']:+d} "
+                      f"({game.event.get('shortName', game.game_id)})")
+
+        if interval is None:
+            self.settle(game)
+        else:
+            game.next_poll = time.monotonic() + interval
+            heapq.heappush(self.schedule, game)
+
+    def retry(self, game):
+        """
+        Poll a game again after a failed poll or write
+
+        Its detector may have consumed the lost plays, so it is dropped:
+        the next poll starts a fresh one over the full play list (PBP rows
+        already stored are skipped by the bulk load).
+        """
+        self.stats['errors'] += 1
+        self.processors[game.league].finish_live_game(game.game_id)
+        game.next_poll = time.monotonic() + INTERVAL_LIVE
+        heapq.heappush(self.schedule, game)
+
+    def settle(self, game):
+        """Final poll committed: stop tracking the game"""
+        self.processors[game.league].finish_live_game(game.game_id)
+        self.games.pop(game.game_id, None)
+        self.finished[game.game_id] = date.today()
+        print(f"  ■ Final: {game.event.get('shortName', game.game_id)}")
+
+    def run_once(self, now):
+        """One scheduler tick: scoreboards if due, then every due summary poll"""
+        if now >= self.next_scoreboard:
+            self.poll_scoreboards(now)
+            self.writer.flush()
+
+        due = []
+        for game in self.due_games(now):
+            if game.db_game_id is None:
+                # Games row not written yet; don't consume plays we can't store
+                game.next_poll = now + INTERVAL_LIVE
+                heapq.heappush(self.schedule, game)
+            else:
+                due.append(game)
+
+        for game, (plays, error) in self.fetcher.imap(self.poll_game, due):
+            self.stats['polls'] += 1
+            if error is not None:
+                print(f"  ❌ Error polling {game.game_id}: {error}")
+                self.retry(game)
+                continue
+            try:
+                self.write_poll(game, plays)
+            except Exception as e:
+                print(f"  ❌ Error writing {game.game_id}: {e}")
+                self.writer.rollback()
+                self.retry(game)
+
+    def seconds_until_next(self, now):
+        """Sleep time until the next scoreboard or summary poll is due"""
+        upcoming = self.next_scoreboard
+        if self.schedule:
+            upcoming = min(upcoming, self.schedule[0].next_poll)
+        return max(0.5, upcoming - now)
+
+
+def main():
+    args = parse_args()
+    leagues = [League(value) for value in (args.league or ['mens', 'womens'])]
+
+    print("\n" + "=" * 80)
+    print("🏀 R69W LIVE POLLER")
+    print("=" * 80)
+    print(f"Leagues: {', '.join(league.value for league in leagues)}")
+    print(f"Scoreboard every {args.scoreboard_interval:g}s; summaries every "
+          f"{INTERVAL_NEAR_69}-{INTERVAL_BREAK}s depending on game state")
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        print("✅ Connected to database")
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return
+
+    with MetricsExporter(path=args.metrics_file, port=args.metrics_port, host=args.metrics_host), \
+            ConcurrentFetcher(concurrency=args.concurrency, rate=args.rate) as fetcher:
+        poller = LivePoller(conn, leagues, fetcher, args.scoreboard_interval)
+        try:
+            while True:
+                now = time.monotonic()
+                poller.run_once(now)
+
+                if args.once:
+                    break
+
+                time.sleep(poller.seconds_until_next(time.monotonic()))
+        finally:
+            conn.close()
+            stats = poller.stats
+            print("\n" + "=" * 80)
+            print(f"Scoreboards: {stats['scoreboards']} | Summary polls: {stats['polls']} | "
+                  f"Game updates: {stats['game_updates']} | PBP rows: {stats['pbp_rows']} | "
+                  f"R69 events: {stats['r69_events']} | Errors: {stats['errors']}")
+            for line in METRICS.summary_lines():
+                print(f"  {line}")
+            print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Poller stopped by user")
@@ -0,0 +1,4 @@
+"""
+R69W shared ingestion helpers
+Building blocks used by the data fetcher scripts in this directory
+"""
@@ -0,0 +1,188 @@
+"""
+Team aggregates
+Maintains the per-(team, season) teams table (games played, R69 wins/losses,
+average time to 69 and margin at 69) from games and r69_events
+
+Ingestion applies deltas as games go final and R69 events are inserted or
+removed, so leaderboard reads are index lookups. rebuild_team_aggregates
+recomputes everything in one GROUP BY pass and is the source of truth if the
+incremental values ever drift (e.g. a final score corrected after the fact).
+
+Only final games count. An R69 event is a win when its team won the game,
+judged from the stored final score.
+"""
+
+# One row per (game, team) for the selected games, with the margin from that team's side
+_SIDES_SQL = """
+    SELECT g.id AS game_id, g.season, g.league, g.game_date,
+           g.home_team_id AS team_id, g.home_team_name AS team_name, g.home_conference AS conference,
+           g.home_score - g.away_score AS margin
+    FROM games g
+    WHERE {where}
+    UNION ALL
+    SELECT g.id, g.season, g.league, g.game_date,
+           g.away_team_id, g.away_team_name, g.away_conference,
+           g.away_score - g.home_score
+    FROM games g
+    WHERE {where}
+"""
+
+# Aggregate sides (joined to their R69 events) into teams-shaped rows.
+# Counts are multiplied by %(games)s / %(sign)s so the same query yields deltas.
+_AGGREGATE_SQL = """
+    SELECT s.team_id, s.season,
+           (array_agg(s.team_name ORDER BY s.game_date DESC))[1] AS team_name,
+           (array_agg(s.conference ORDER BY s.game_date DESC))[1] AS conference,
+           (array_agg(s.league ORDER BY s.game_date DESC))[1] AS league,
+           COUNT(DISTINCT s.game_id) * %(games)s AS games_played,
+           COUNT(e.id) FILTER (WHERE s.margin > 0) * %(sign)s AS r69_wins,
+           COUNT(e.id) FILTER (WHERE s.margin <= 0) * %(sign)s AS r69_losses,
+           ROUND(AVG(e.t_to_69), 2) AS avg_t_to_69,
+           ROUND(AVG(e.margin_at_69), 2) AS avg_margin_at_69
+    FROM ({sides}) s
+    LEFT JOIN r69_events e ON e.game_id = s.game_id AND e.team_id = s.team_id {event_filter}
+    GROUP BY s.team_id, s.season
+    HAVING %(games)s <> 0 OR COUNT(e.id) > 0
+"""
+
+_INSERT_COLUMNS = """
+    id, team_id, team_name, conference, league, season,
+    games_played, r69_wins, r69_losses, avg_t_to_69, avg_margin_at_69,
+    created_at, updated_at
+"""
+
+_INSERT_SELECT = """
+    SELECT gen_random_uuid(), d.team_id, d.team_name, d.conference, d.league, d.season,
+           d.games_played, d.r69_wins, d.r69_losses, d.avg_t_to_69, d.avg_margin_at_69,
+           NOW(), NOW()
+    FROM delta d
+"""
+
+
+def _running_average(column, t, d):
+    """
+    SQL for merging a delta's average into a stored average
+
+    The delta's R69 count is signed, so AVG * count is the signed sum being
+    added or removed.
+    """
+    n_old = f"({t}.r69_wins + {t}.r69_losses)"
+    n_delta = f"({d}.r69_wins + {d}.r69_losses)"
+    return f"""CASE
+        WHEN {n_old} + {n_delta} <= 0 THEN NULL
+        WHEN {n_delta} = 0 THEN {t}.{column}
+        ELSE ROUND((COALESCE({t}.{column}, 0) * {n_old} + {d}.{column} * {n_delta}) / ({n_old} + {n_delta}), 2)
+    END"""
+
+
+def _merge_assignments(t, d):
+    """SET clause adding delta row `d` to teams row `t`"""
+    return f"""
+        team_name = COALESCE({d}.team_name, {t}.team_name),
+        conference = COALESCE({d}.conference, {t}.conference),
+        games_played = GREATEST({t}.games_played + {d}.games_played, 0),
+        avg_t_to_69 = {_running_average('avg_t_to_69', t, d)},
+        avg_margin_at_69 = {_running_average('avg_margin_at_69', t, d)},
+        r69_wins = GREATEST({t}.r69_wins + {d}.r69_wins, 0),
+        r69_losses = GREATEST({t}.r69_losses + {d}.r69_losses, 0),
+        updated_at = NOW()
+    """
+
+
+def _apply_delta(cursor, params, event_filter='', sign=1):
+    """
+    Add (sign=1) or subtract (sign=-1) the aggregate of one final game
+
+    `params` must hold `game` (games.id) and `games` (the games_played
+    multiplier); `event_filter` narrows which of its R69 events count.
+    """
+    sides = _SIDES_SQL.format(where="g.id = %(game)s AND g.game_status = 'final'")
+    delta = _AGGREGATE_SQL.format(sides=sides, event_filter=event_filter)
+    params = dict(params, sign=sign)
+
+    if sign > 0:
+        cursor.execute(f"""
+            WITH delta AS ({delta})
+            INSERT INTO teams ({_INSERT_COLUMNS})
+            {_INSERT_SELECT}
+            ON CONFLICT (team_id, season) DO UPDATE SET {_merge_assignments('teams', 'EXCLUDED')}
+        """, params)
+    else:
+        # Retractions only touch existing rows; never create negative ones
+        cursor.execute(f"""
+            WITH delta AS ({delta})
+            UPDATE teams t SET {_merge_assignments('t', 'd')}
+            FROM delta d
+            WHERE t.team_id = d.team_id AND t.season = d.season
+        """, params)
+    return cursor.rowcount
+
+
+def apply_final_game(cursor, game_db_id):
+    """
+    Count a game that just went final: games played for both teams, plus any
+    R69 event already stored for it (e.g. inserted while the game was live)
+    """
+    return _apply_delta(cursor, {'game': game_db_id, 'games': 1})
+
+
+def apply_r69_event(cursor, game_db_id, r69_event_id, sign=1):
+    """
+    Add (or with sign=-1, remove) one R69 event's contribution
+
+    No-op unless its game is final; events of live games are counted by
+    apply_final_game when the game finishes.
+    """
+    return _apply_delta(cursor, {'game': game_db_id, 'games': 0, 'event': r69_event_id},
+                        event_filter="AND e.id = %(event)s", sign=sign)
+
+
+def retract_r69_events(cursor, game_db_id):
+    """Remove the contribution of all of a game's R69 events (before deleting them)"""
+    return _apply_delta(cursor, {'game': game_db_id, 'games': 0}, sign=-1)
+
+
+def rebuild_team_aggregates(cursor, seasons=None):
+    """
+    Recompute teams aggregates from games and r69_events in one GROUP BY pass
+
+    Args:
+        cursor: psycopg2 cursor (caller owns the transaction)
+        seasons: Season labels to rebuild (default: all)
+
+    Returns:
+        Number of teams rows written
+    """
+    where = "g.game_status = 'final'"
+    scope = ""
+    params = {'games': 1, 'sign': 1}
+    if seasons:
+        where += " AND g.season = ANY(%(seasons)s)"
+        scope = "WHERE season = ANY(%(seasons)s)"
+        params['seasons'] = list(seasons)
+
+    # Teams with no final games left in scope drop back to zero
+    cursor.execute(f"""
+        UPDATE teams
+        SET games_played = 0, r69_wins = 0, r69_losses = 0,
+            avg_t_to_69 = NULL, avg_margin_at_69 = NULL, updated_at = NOW()
+        {scope}
+    """, params)
+
+    delta = _AGGREGATE_SQL.format(sides=_SIDES_SQL.format(where=where), event_filter='')
+    cursor.execute(f"""
+        WITH delta AS ({delta})
+        INSERT INTO teams ({_INSERT_COLUMNS})
+        {_INSERT_SELECT}
+        ON CONFLICT (team_id, season) DO UPDATE SET
+            team_name = EXCLUDED.team_name,
+            conference = EXCLUDED.conference,
+            league = EXCLUDED.league,
+            games_played = EXCLUDED.games_played,
+            r69_wins = EXCLUDED.r69_wins,
+            r69_losses = EXCLUDED.r69_losses,
+            avg_t_to_69 = EXCLUDED.avg_t_to_69,
+            avg_margin_at_69 = EXCLUDED.avg_margin_at_69,
+            updated_at = NOW()
+    """, params)
+    return cursor.rowcount
@@ -0,0 +1,164 @@
+"""
+R69 analytics
+Vectorized (NumPy) computation of the r69_analytics metrics for a batch of
+games, mirroring calculateR69Analytics in lib/analytics.ts
+
+Play-by-play for a whole batch is held as flat arrays ordered by game then
+sequence number, with `game_index` mapping each row to its game. Per-game
+results come from segment reductions (bincount / minimum.at) instead of a
+Python loop over plays.
+"""
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from r69w.detector import R69_TARGET
+
+# Column order for r69_analytics rows produced by compute_analytics
+ANALYTICS_COLUMNS = (
+    'game_id', 'r69_pace_index', 'r69_lead_duration', 'r69_swing_margin', 'comeback_69l',
+    'nice_score', 'double_nice', 'home_possessions', 'away_possessions', 'pace_rating'
+)
+
+# calculateR69PaceIndex default: average seconds to reach 69
+AVG_T_TO_69 = 1800
+# Game time assumed when a game has no timed plays
+DEFAULT_GAME_SECONDS = 2400
+
+NICE_SCORES = (69, 96)
+
+# possession_side values
+SIDE_NONE = 0
+SIDE_HOME = 1
+SIDE_AWAY = 2
+
+# Upper bounds of the Decimal(5, 4) / Decimal(5, 2) columns
+_MAX_PACE_INDEX = 10
+_MAX_PACE_RATING = 1000
+
+
+def _decimal_or_none(value, digits, upper):
+    """Rounded float for a NUMERIC column, or None if it would not fit"""
+    if not np.isfinite(value) or abs(value) >= upper:
+        return None
+    return round(float(value), digits)
+
+
+def compute_analytics(games, game_index, elapsed, home_score, away_score, possession_side):
+    """
+    Compute r69_analytics rows for a batch of games
+
+    Args:
+        games: Sequence of game dicts with game_id, home_score, away_score,
+            final_margin (home perspective) and r69 (None, or a dict with
+            t_to_69, is_home, margin_at_69, r69w)
+        game_index: Row -> index into `games` (non-decreasing)
+        elapsed: elapsed_seconds per row
+        home_score, away_score: Score state per row
+        possession_side: SIDE_HOME / SIDE_AWAY for shot and turnover plays
+            by that team, SIDE_NONE otherwise (calculatePossessions)
+
+    Returns:
+        List of row tuples in ANALYTICS_COLUMNS order, one per game
+    """
+    n_games = len(games)
+    game_index = np.asarray(game_index, dtype=np.int64)
+    elapsed = np.asarray(elapsed, dtype=np.int64)
+    margin = np.asarray(home_score, dtype=np.int64) - np.asarray(away_score, dtype=np.int64)
+    possession_side = np.asarray(possession_side, dtype=np.int8)
+
+    has_r69 = np.array([g['r69'] is not None for g in games], dtype=bool)
+    t_to_69 = np.array([g['r69']['t_to_69'] if g['r69'] else 0 for g in games], dtype=np.int64)
+    # +1 when the R69 team is home, -1 when away: sign * margin > 0 means it leads
+    sign = np.array([(1 if g['r69']['is_home'] else -1) if g['r69'] else 0 for g in games], dtype=np.int64)
+
+    # Plays after the R69 moment (calculateLeadDuration / detectComeback69L)
+    after = np.flatnonzero(has_r69[game_index] & (elapsed > t_to_69[game_index]))
+    g_after = game_index[after]
+    e_after = elapsed[after]
+    leading = sign[g_after] * margin[after] > 0
+
+    # Time since the previous post-69 play of the same game (or since the 69 itself)
+    previous = t_to_69[g_after]
+    if len(after) > 1:
+        same_game = g_after[1:] == g_after[:-1]
+        previous[1:] = np.where(same_game, e_after[:-1], previous[1:])
+    lead_duration = np.bincount(g_after, weights=(e_after - previous) * leading, minlength=n_games)
+
+    # Comeback: a leading play after the first play where the R69 team did not lead
+    position = np.arange(len(after))
+    first_lost = np.full(n_games, len(after), dtype=np.int64)
+    np.minimum.at(first_lost, g_after[~leading], position[~leading])
+    comeback = np.bincount(g_after, weights=leading & (position > first_lost[g_after]), minlength=n_games) > 0
+
+    home_possessions = np.bincount(game_index, weights=possession_side == SIDE_HOME, minlength=n_games)
+    away_possessions = np.bincount(game_index, weights=possession_side == SIDE_AWAY, minlength=n_games)
+
+    # Game time is the last play's elapsed seconds (falling back like `|| 2400`)
+    game_seconds = np.zeros(n_games, dtype=np.int64)
+    if len(game_index):
+        last = np.flatnonzero(np.append(game_index[1:] != game_index[:-1], True))
+        game_seconds[game_index[last]] = elapsed[last]
+    game_seconds[game_seconds == 0] = DEFAULT_GAME_SECONDS
+
+    total_points = np.array([g['home_score'] + g['away_score'] for g in games], dtype=np.float64)
+    pace_rating = total_points / (game_seconds / 60) * 40
+
+    rows = []
+    for i, game in enumerate(games):
+        home, away = game['home_score'], game['away_score']
+        nice_score = home in NICE_SCORES or away in NICE_SCORES
+        double_nice = home >= R69_TARGET and away >= R69_TARGET
+        r69 = game['r69']
+
+        if r69 is None:
+            rows.append((game['game_id'], None, None, None, False, nice_score, double_nice, None, None, None))
+            continue
+
+        t = r69['t_to_69']
+        pace_index = AVG_T_TO_69 / t if t else 0.0
+        final_margin = game.get('final_margin') or 0
+        if r69['r69w']:
+            swing_margin = final_margin - r69['margin_at_69']
+        else:
+            swing_margin = -(final_margin + r69['margin_at_69'])
+
+        rows.append((
+            game['game_id'],
+            _decimal_or_none(pace_index, 4, _MAX_PACE_INDEX),
+            int(lead_duration[i]),
+            swing_margin,
+            bool(comeback[i]),
+            nice_score,
+            double_nice,
+            int(home_possessions[i]),
+            int(away_possessions[i]),
+            _decimal_or_none(pace_rating[i], 2, _MAX_PACE_RATING),
+        ))
+
+    return rows
+
+
+def upsert_analytics(cursor, rows):
+    """
+    Bulk upsert r69_analytics rows (one statement per call)
+
+    Args:
+        cursor: psycopg2 cursor (caller owns the transaction)
+        rows: Row tuples in ANALYTICS_COLUMNS order
+
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+
+    columns = ', '.join(ANALYTICS_COLUMNS)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in ANALYTICS_COLUMNS[1:])
+    execute_values(cursor, f"""
+        INSERT INTO r69_analytics (id, {columns}, created_at)
+        VALUES %s
+        ON CONFLICT (game_id) DO UPDATE SET {updates}
+    """, rows, template=f"(gen_random_uuid(), {', '.join(['%s'] * len(ANALYTICS_COLUMNS))}, NOW())",
+                   page_size=max(len(rows), 1))
+    return len(rows)
@@ -0,0 +1,137 @@
+"""
+Raw ESPN payload archive
+One gzip-compressed JSONL file per league and season, used for offline replay
+
+Each line holds the scoreboard event and the summary payload for one game
+(the selective form, header and plays, when fetched by the backfills; see
+r69w.summary), which is everything the insert_game -> PBP -> detect_r69_event path
+needs without touching the network.
+
+Every record is written as its own complete gzip member in a single write,
+so a run that is killed can leave at most one partial member at the end of
+a file. Readers stop at such a truncated tail instead of failing the whole
+season.
+"""
+
+import gzip
+import json
+import os
+import threading
+import zlib
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.archive')
+
+
+_GAME_ID_PREFIX = '{"game_id":'
+_decoder = json.JSONDecoder()
+
+
+def _line_game_id(line):
+    """Read the leading game_id of an archive line without decoding the payload"""
+    if not line.startswith(_GAME_ID_PREFIX):
+        return None
+    try:
+        game_id, _ = _decoder.raw_decode(line, len(_GAME_ID_PREFIX))
+    except ValueError:
+        return None
+    return game_id
+
+
+def _read_lines(path, warn=True):
+    """Complete lines of an archive file, stopping quietly at a truncated final member"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    yield line
+    except (EOFError, zlib.error, gzip.BadGzipFile, UnicodeDecodeError) as e:
+        # Interrupted writer: everything before the partial member is intact
+        if warn:
+            print(f"  ⚠ {path}: truncated at the end ({e}); replaying the complete records before it")
+
+
+class PayloadArchive:
+    """Append-only season archive of (scoreboard event, summary) records"""
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or DEFAULT_ARCHIVE_DIR)
+        self._handles = {}
+        self._lock = threading.Lock()
+
+    def path(self, league, season):
+        return os.path.join(self.root, league, f"{season}.jsonl.gz")
+
+    def append(self, league, season, event, summary):
+        """Append one game record (opens the season file lazily)"""
+        line = json.dumps({
+            'game_id': event.get('id'),
+            'league': league,
+            'season': season,
+            'event': event,
+            'summary': summary
+        }, separators=(',', ':'))
+        # One self-contained gzip member per game; readers see one stream
+        member = gzip.compress((line + '\n').encode('utf-8'), compresslevel=6)
+
+        with self._lock:
+            handle = self._handles.get((league, season))
+            if handle is None:
+                path = self.path(league, season)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handle = open(path, 'ab')
+                self._handles[(league, season)] = handle
+            handle.write(member)
+            handle.flush()
+
+    def seasons(self, league):
+        """List archived season labels for a league (oldest first)"""
+        league_dir = os.path.join(self.root, league)
+        if not os.path.isdir(league_dir):
+            return []
+        return sorted(name[:-len('.jsonl.gz')] for name in os.listdir(league_dir) if name.endswith('.jsonl.gz'))
+
+    def iter_lines(self, league, season):
+        """
+        Yield raw JSON lines for a season, one per game
+
+        If a game was archived more than once, only its latest line is kept.
+        Lines are not decoded here so that JSON parsing can happen in parser
+        worker processes (see replay_archive.py --workers).
+        """
+        path = self.path(league, season)
+        if not os.path.exists(path):
+            return
+
+        # Pass 1: find each game's latest line from the leading game_id only
+        latest = {}
+        for line_no, line in enumerate(_read_lines(path)):
+            game_id = _line_game_id(line)
+            if game_id is not None:
+                latest[game_id] = line_no
+
+        keep = set(latest.values())
+        for line_no, line in enumerate(_read_lines(path, warn=False)):
+            if line_no in keep:
+                yield line
+
+    def iter_records(self, league, season):
+        """Yield decoded archive records for a season, one per game"""
+        for line in self.iter_lines(league, season):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Damaged line (truncated tails are already dropped by _read_lines)
+                continue
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
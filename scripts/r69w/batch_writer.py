@@ -0,0 +1,159 @@
+"""
+Batched database writes for ingestion
+Groups many games into one transaction (commit every N games or T seconds)
+with a savepoint per game, so one bad game is rolled back on its own instead
+of aborting everything written before it in the batch
+
+Each game's PBP rows are held until the batch is flushed and then bulk
+loaded together, so a commit costs one COPY and one fsync for the whole
+batch. Work that must only happen once the data is durable (e.g. marking
+queue items done) belongs after flush() returns.
+"""
+
+import time
+from contextlib import contextmanager
+
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+
+from r69w.metrics import METRICS
+
+DEFAULT_COMMIT_GAMES = 100
+DEFAULT_COMMIT_SECONDS = 10.0
+
+_SAVEPOINT = 'r69w_game'
+
+
+class PendingGame:
+    """PBP rows (and/or pre-encoded COPY blocks) one game adds to the batch"""
+
+    __slots__ = ('rows', 'blocks', 'written')
+
+    def __init__(self):
+        self.rows = []
+        self.blocks = []
+        self.written = False  # set once the game's savepoint is released
+
+
+class BatchWriter:
+    """One connection's write transaction, committed in batches"""
+
+    def __init__(self, conn, max_games=DEFAULT_COMMIT_GAMES, max_seconds=DEFAULT_COMMIT_SECONDS, load_pbp=None):
+        """
+        Args:
+            conn: psycopg2 connection owned by this writer
+            max_games: Commit once this many games are pending (None: only on flush())
+            max_seconds: Commit once the oldest pending game is this old (None: no time limit)
+            load_pbp: Callable (cursor, rows, blocks) that bulk loads a batch's
+                PBP; default r69w.writer.bulk_load_pbp_events
+        """
+        if load_pbp is None:
+            from r69w.writer import bulk_load_pbp_events
+            load_pbp = bulk_load_pbp_events
+
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.max_games = max_games
+        self.max_seconds = max_seconds
+        self.load_pbp = load_pbp
+
+        self.pending = 0
+        self.failed = 0
+        self.commits = 0
+        self._rows = []
+        self._blocks = []
+        self._started = None
+
+    def _aborted(self):
+        return self.conn.get_transaction_status() == TRANSACTION_STATUS_INERROR
+
+    @contextmanager
+    def game(self):
+        """
+        Write one game inside a savepoint
+
+        Yields a PendingGame whose rows/blocks join the batch only if the
+        block finishes without leaving the transaction aborted. On an
+        exception the game's writes are rolled back and the exception is
+        re-raised; a failure that a writer function caught and printed
+        (leaving the transaction aborted) is rolled back the same way.
+        """
+        self.cursor.execute(f"SAVEPOINT {_SAVEPOINT}")
+        pending = PendingGame()
+        try:
+            yield pending
+        except BaseException:
+            self._rollback_game()
+            raise
+
+        if self._aborted():
+            self._rollback_game()
+            return
+
+        self.cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+        pending.written = True
+        self._rows.extend(pending.rows)
+        self._blocks.extend(pending.blocks)
+        self.pending += 1
+        if self._started is None:
+            self._started = time.monotonic()
+
+    def _rollback_game(self):
+        self.cursor.execute(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+        self.cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+        self.failed += 1
+
+    def due(self):
+        """True once the pending batch has reached max_games or max_seconds"""
+        if not self.pending:
+            return False
+        if self.max_games is not None and self.pending >= self.max_games:
+            return True
+        return self.max_seconds is not None and time.monotonic() - self._started >= self.max_seconds
+
+    def maybe_flush(self):
+        """Flush if the batch is due; returns True if it committed"""
+        if self.due():
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """
+        Bulk load the batch's PBP and commit
+
+        A failed PBP load is rolled back on its own (the games stay) and
+        re-raised after the commit so the caller can report it.
+        """
+        load_error = None
+        if self._rows or self._blocks:
+            self.cursor.execute(f"SAVEPOINT {_SAVEPOINT}")
+            try:
+                self.load_pbp(self.cursor, self._rows, self._blocks)
+            except Exception as e:
+                load_error = e
+            if load_error is not None or self._aborted():
+                self.cursor.execute(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+            self.cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+
+        with METRICS.time('commit'):
+            self.conn.commit()
+        self.commits += 1
+
+        self._reset()
+
+        if load_error is not None:
+            raise load_error
+
+    def rollback(self):
+        """Discard the pending batch"""
+        self.conn.rollback()
+        self._reset()
+
+    def _reset(self):
+        self.pending = 0
+        self._rows = []
+        self._blocks = []
+        self._started = None
+
+    def close(self):
+        self.cursor.close()
@@ -0,0 +1,228 @@
+"""
+Local on-disk cache for ESPN API responses
+Gzip-compressed JSON files addressed by a hash of (league, endpoint, params)
+
+TTL policy:
+    - Final games (and scoreboards whose games are all final) are kept forever
+    - Anything else (in progress, scheduled, today's scoreboard) expires after
+      `live_ttl` seconds so live data is re-fetched quickly
+
+Entries stored with HTTP validators (ETag / Last-Modified) can be revalidated
+once expired: get_stale() and validators() feed a conditional request, and a
+304 only refreshes the entry's timestamp.
+
+Entries are stored as the response body bytes. get_bytes() and put_raw()
+skip the decode / re-encode for callers that select from the body
+themselves (see r69w.summary).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from r69w.summary import dumps, loads
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'espn')
+DEFAULT_LIVE_TTL = 30  # seconds
+
+# Statuses that will never change again
+_SETTLED_STATUSES = {'STATUS_FINAL', 'STATUS_POSTPONED', 'STATUS_CANCELED'}
+
+
+def _status_is_settled(status):
+    status_type = (status or {}).get('type', {})
+    return bool(status_type.get('completed')) or status_type.get('name') in _SETTLED_STATUSES
+
+
+def is_final_payload(endpoint, params, payload):
+    """Return True if a response can never change (safe to cache forever)"""
+    if endpoint == 'summary':
+        competitions = payload.get('header', {}).get('competitions', [])
+        return bool(competitions) and _status_is_settled(competitions[0].get('status'))
+
+    if endpoint == 'scoreboard':
+        events = payload.get('events', [])
+        for event in events:
+            competition = event.get('competitions', [{}])[0]
+            if not _status_is_settled(competition.get('status') or event.get('status')):
+                return False
+        if events:
+            return True
+
+        # An empty scoreboard is only final once the date is safely in the past
+        date_str = str((params or {}).get('dates', ''))
+        try:
+            return datetime.strptime(date_str, '%Y%m%d') < datetime.now() - timedelta(days=2)
+        except ValueError:
+            return False
+
+    return False
+
+
+class ResponseCache:
+    """Content-addressed, compressed response cache"""
+
+    def __init__(self, root=None, live_ttl=DEFAULT_LIVE_TTL):
+        self.root = os.path.abspath(root or DEFAULT_CACHE_DIR)
+        self.live_ttl = live_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache configured by the environment
+
+        R69W_CACHE_DIR overrides the cache directory; R69W_CACHE=0 disables
+        caching (returns None).
+        """
+        if os.getenv('R69W_CACHE', '1').lower() in ('0', 'false', 'off', 'no'):
+            return None
+        return cls(root=os.getenv('R69W_CACHE_DIR') or None)
+
+    @staticmethod
+    def key(league, endpoint, params=None):
+        """Stable hash of the request identity"""
+        query = '&'.join(f"{k}={v}" for k, v in sorted((params or {}).items()) if k != 'limit')
+        return hashlib.sha256(f"{league}|{endpoint}|{query}".encode('utf-8')).hexdigest()
+
+    def _path(self, league, endpoint, key, final):
+        suffix = 'final' if final else 'live'
+        return os.path.join(self.root, league, endpoint, key[:2], f"{key}.{suffix}.json.gz")
+
+    def _meta_path(self, league, endpoint, key):
+        return os.path.join(self.root, league, endpoint, key[:2], f"{key}.meta.json")
+
+    def get(self, league, endpoint, params=None):
+        """Return the cached payload, or None if missing/expired"""
+        return self._get(league, endpoint, params, loads)
+
+    def get_bytes(self, league, endpoint, params=None):
+        """Return the cached JSON body undecoded, or None if missing/expired"""
+        return self._get(league, endpoint, params, None)
+
+    def _get(self, league, endpoint, params, decode):
+        key = self.key(league, endpoint, params)
+
+        candidates = [self._path(league, endpoint, key, True)]
+        live_path = self._path(league, endpoint, key, False)
+        try:
+            if time.time() - os.path.getmtime(live_path) <= self.live_ttl:
+                candidates.append(live_path)
+        except OSError:
+            pass
+
+        for path in candidates:
+            try:
+                with gzip.open(path, 'rb') as f:
+                    body = f.read()
+                payload = decode(body) if decode else body
+                self.hits += 1
+                return payload
+            except (OSError, ValueError):
+                continue
+
+        self.misses += 1
+        return None
+
+    def get_stale(self, league, endpoint, params=None):
+        """Return the cached payload regardless of age, or None if missing"""
+        key = self.key(league, endpoint, params)
+        for final in (True, False):
+            try:
+                with gzip.open(self._path(league, endpoint, key, final), 'rb') as f:
+                    return loads(f.read())
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def validators(self, league, endpoint, params=None):
+        """
+        Conditional request headers for a cached entry
+
+        Returns:
+            Dict with If-None-Match / If-Modified-Since (empty if none stored)
+        """
+        key = self.key(league, endpoint, params)
+        try:
+            with open(self._meta_path(league, endpoint, key), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def touch(self, league, endpoint, params=None):
+        """Mark a live entry as fresh again (after a 304 Not Modified)"""
+        key = self.key(league, endpoint, params)
+        try:
+            os.utime(self._path(league, endpoint, key, False))
+        except OSError:
+            pass
+
+    def put(self, league, endpoint, params, payload, etag=None, last_modified=None):
+        """Store a successful response payload (and its validators, if any)"""
+        if not payload:
+            return
+        self.put_raw(league, endpoint, params, dumps(payload), payload, etag=etag, last_modified=last_modified)
+
+    def put_raw(self, league, endpoint, params, body, payload, etag=None, last_modified=None):
+        """
+        Store a response body as received
+
+        `payload` is only used to decide whether the entry is final, so a
+        selective decode of the body (r69w.summary) is enough.
+        """
+        if not body or not payload:
+            return
+
+        key = self.key(league, endpoint, params)
+        final = is_final_payload(endpoint, params, payload)
+        path = self._path(league, endpoint, key, final)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+        if etag or last_modified:
+            meta_path = self._meta_path(league, endpoint, key)
+            tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'etag': etag, 'last_modified': last_modified}, f)
+            os.replace(tmp_path, meta_path)
+
+        if final:
+            # A game that just went final no longer needs its live copy
+            try:
+                os.remove(self._path(league, endpoint, key, False))
+            except OSError:
+                pass
+
+    def get_or_fetch(self, league, endpoint, params, fetch):
+        """Return the cached payload or call fetch() and cache a non-empty result"""
+        payload = self.get(league, endpoint, params)
+        if payload is not None:
+            return payload
+
+        payload = fetch()
+        if payload:
+            self.put(league, endpoint, params, payload)
+        return payload
+
+
+def cached_fetch(cache, league, endpoint, params, fetch):
+    """cache.get_or_fetch() that tolerates a disabled (None) cache"""
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch(league, endpoint, params, fetch)
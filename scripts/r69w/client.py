@@ -0,0 +1,409 @@
+"""
+ESPN API client
+Scoreboard, summary (play-by-play), team and team schedule fetches shared by
+every ingestion script, served from the local response cache when possible
+
+Requests go over a pooled keep-alive session (see r69w.session) and share one
+retry policy: exponential backoff with jitter, honoring Retry-After.
+
+Summaries can be fetched in selective form (fetch_summary(selective=True)):
+only the header competitions and trimmed plays are kept (see r69w.summary).
+"""
+
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+import requests
+
+from r69w.cache import ResponseCache, cached_fetch
+from r69w.metrics import METRICS
+from r69w.summary import decode_summary, flat_plays, loads
+from r69w.session import DEFAULT_POOL_SIZE, DEFAULT_RETRY, RetryPolicy, create_session, default_session
+
+ESPN_API_BASE = "https://site.api.espn.com/apis/site/v2/sports/basketball"
+
+MENS_LEAGUE = 'mens-college-basketball'
+WOMENS_LEAGUE = 'womens-college-basketball'
+
+DEFAULT_TIMEOUT = 15  # seconds
+
+# Local ESPN response cache (R69W_CACHE=0 to disable)
+RESPONSE_CACHE = ResponseCache.from_env()
+
+
+class League(Enum):
+    MENS = "mens"
+    WOMENS = "womens"
+
+    @property
+    def path(self) -> str:
+        """ESPN league path segment"""
+        return MENS_LEAGUE if self is League.MENS else WOMENS_LEAGUE
+
+
+def league_path(league) -> str:
+    """ESPN league path for a League, a DB league value ('mens'/'womens') or a path"""
+    if isinstance(league, League):
+        return league.path
+    if league == League.WOMENS.value:
+        return WOMENS_LEAGUE
+    if league == League.MENS.value or not league:
+        return MENS_LEAGUE
+    return league
+
+
+def league_value(league) -> str:
+    """games.league value ('mens'/'womens') for a League, an ESPN league path or a DB value"""
+    return League.WOMENS.value if league_path(league) == WOMENS_LEAGUE else League.MENS.value
+
+
+def get_with_retries(url, params=None, retries=None, fetcher=None, timeout=DEFAULT_TIMEOUT,
+                     label='request', retry=DEFAULT_RETRY, headers=None):
+    """
+    GET a URL under the shared retry policy
+
+    Timeouts, connection errors and 429/5xx responses are retried with
+    jittered exponential backoff (or the server's Retry-After); other HTTP
+    errors fail immediately.
+
+    Args:
+        url: Request URL
+        params: Query parameters
+        retries: Total attempts (default: the policy's attempt count)
+        fetcher: Pooled session or ConcurrentFetcher (default: shared session)
+        timeout: Per-request timeout in seconds
+        label: What is being fetched, for log messages
+        retry: RetryPolicy
+        headers: Extra request headers (e.g. conditional request validators)
+
+    Returns:
+        Successful (< 400) response, or None on failure
+    """
+    http = fetcher or default_session()
+    policy = retry.with_attempts(retries) if retries is not None else retry
+    attempts = policy.attempts
+    extra = {'headers': headers} if headers else {}
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+
+        try:
+            with METRICS.time('fetch'):
+                response = http.get(url, params=params, timeout=timeout, **extra)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            timed_out = isinstance(e, requests.exceptions.Timeout)
+            METRICS.count_http('timeout' if timed_out else 'connection_error')
+            kind = "Timeout" if timed_out else "Connection error"
+            if last_attempt:
+                print(f"      ❌ {kind} fetching {label} after {attempts} attempts")
+                return None
+            wait_time = policy.delay(attempt)
+            print(f"      ⏱ {kind} fetching {label} (attempt {attempt + 1}/{attempts}), retrying in {wait_time:.1f}s...")
+            time.sleep(wait_time)
+            continue
+        except requests.exceptions.RequestException as e:
+            METRICS.count_http('error')
+            print(f"      ❌ Network error fetching {label}: {e}")
+            return None
+
+        status = response.status_code
+        METRICS.count_http(status)
+        if status >= 400:
+            if not policy.is_retryable_status(status):
+                # Don't retry on client errors (404, 400, etc)
+                print(f"      ❌ HTTP {status} error fetching {label}")
+                return None
+            if last_attempt:
+                print(f"      ❌ {status} error for {label} after {attempts} attempts")
+                return None
+            wait_time = policy.delay(attempt, response)
+            print(f"      ⚠ {status} error for {label} (attempt {attempt + 1}/{attempts}), retrying in {wait_time:.1f}s...")
+            response.close()
+            time.sleep(wait_time)
+            continue
+
+        return response
+
+    return None
+
+
+def _decode_json(response, label):
+    try:
+        with METRICS.time('decode'):
+            return loads(response.content)
+    except ValueError as e:
+        print(f"      ❌ Invalid JSON fetching {label}: {e}")
+        return None
+
+
+def get_json_with_retries(url, params=None, retries=None, fetcher=None, timeout=DEFAULT_TIMEOUT,
+                          label='request', retry=DEFAULT_RETRY):
+    """
+    GET a JSON payload under the shared retry policy (see get_with_retries)
+
+    Returns:
+        Decoded JSON, or None on failure
+    """
+    response = get_with_retries(url, params, retries=retries, fetcher=fetcher, timeout=timeout,
+                                label=label, retry=retry)
+    if response is None:
+        return None
+    return _decode_json(response, label)
+
+
+def get_json_revalidated(cache, league, endpoint, params, url, fetcher=None, label='request',
+                         retry=DEFAULT_RETRY):
+    """
+    GET a JSON payload through the cache, revalidating expired entries
+
+    A fresh entry is returned without a request. An expired one is sent back
+    with its ETag / Last-Modified; a 304 keeps the cached payload (no body is
+    transferred) and a 200 replaces it. If the request fails, the expired
+    payload is returned rather than nothing.
+
+    Returns:
+        Decoded JSON, or None if neither the server nor the cache has it
+    """
+    if cache is None:
+        return get_json_with_retries(url, params, fetcher=fetcher, label=label, retry=retry)
+
+    cached = cache.get(league, endpoint, params)
+    if cached is not None:
+        return cached
+
+    stale = cache.get_stale(league, endpoint, params)
+    headers = cache.validators(league, endpoint, params) if stale is not None else None
+    response = get_with_retries(url, params, fetcher=fetcher, label=label, retry=retry, headers=headers)
+    if response is None:
+        return stale
+
+    if response.status_code == 304 and stale is not None:
+        cache.touch(league, endpoint, params)
+        return stale
+
+    data = _decode_json(response, label)
+    if data:
+        cache.put(league, endpoint, params, data,
+                  etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+    return data
+
+
+def fetch_scoreboard(date, league=MENS_LEAGUE, fetcher=None, cache=RESPONSE_CACHE, retry=DEFAULT_RETRY):
+    """
+    Fetch scoreboard for a specific date
+
+    Returns:
+        Scoreboard JSON, or None if the fetch failed (a day with no games
+        is {"events": []}, so callers can tell the two apart and retry)
+    """
+    league = league_path(league)
+    date_str = date.strftime("%Y%m%d")
+    params = {"dates": date_str, "limit": 100}
+
+    cached = cache.get(league, 'scoreboard', params) if cache else None
+    if cached is not None:
+        return cached
+
+    data = get_json_with_retries(f"{ESPN_API_BASE}/{league}/scoreboard", params,
+                                 fetcher=fetcher, label=f"scoreboard {date_str}", retry=retry)
+    if not data:
+        return None
+    if cache:
+        cache.put(league, 'scoreboard', params, data)
+    return data
+
+
+def fetch_summary(game_id, league=MENS_LEAGUE, retries=None, fetcher=None, cache=RESPONSE_CACHE,
+                  retry=DEFAULT_RETRY, selective=False):
+    """
+    Fetch the full summary payload for a game with retry logic for network errors
+
+    Args:
+        game_id: ESPN game ID
+        league: ESPN league path or League
+        retries: Total attempts (default: the retry policy's, 3)
+        fetcher: Pooled session or ConcurrentFetcher (default: shared session)
+        cache: Response cache (None to bypass)
+        retry: RetryPolicy
+        selective: Return only the header competitions and trimmed plays
+            (r69w.summary.select_summary); the cache still stores the full body
+
+    Returns:
+        Summary JSON (header, plays, ...), or empty dict on failure
+    """
+    league = league_path(league)
+    params = {"event": game_id}
+
+    if selective:
+        return _fetch_selective_summary(game_id, league, params, retries, fetcher, cache, retry)
+
+    cached = cache.get(league, 'summary', params) if cache else None
+    if cached is not None:
+        return cached
+
+    data = get_json_with_retries(f"{ESPN_API_BASE}/{league}/summary", params, retries=retries,
+                                 fetcher=fetcher, label=f"PBP for game {game_id}", retry=retry)
+    if not data:
+        return {}
+    if cache:
+        cache.put(league, 'summary', params, data)
+    return data
+
+
+def _fetch_selective_summary(game_id, league, params, retries, fetcher, cache, retry):
+    label = f"PBP for game {game_id}"
+
+    body = cache.get_bytes(league, 'summary', params) if cache else None
+    if body is not None:
+        try:
+            return decode_summary(body)
+        except ValueError:
+            pass  # unreadable entry: fetch it again
+
+    response = get_with_retries(f"{ESPN_API_BASE}/{league}/summary", params, retries=retries,
+                                fetcher=fetcher, label=label, retry=retry)
+    if response is None:
+        return {}
+    try:
+        data = decode_summary(response.content)
+    except ValueError as e:
+        print(f"      ❌ Invalid JSON fetching {label}: {e}")
+        return {}
+    if cache:
+        cache.put_raw(league, 'summary', params, response.content, data)
+    return data
+
+
+def extract_plays(summary):
+    """
+    Play list from a summary payload
+
+    Accepts both the flat `plays` list and the grouped form where each entry
+    wraps its plays in `items`.
+    """
+    return flat_plays((summary or {}).get('plays'))
+
+
+def fetch_play_by_play(game_id, league=MENS_LEAGUE, retries=None, fetcher=None, cache=RESPONSE_CACHE,
+                       retry=DEFAULT_RETRY):
+    """
+    Fetch play-by-play data for a game with retry logic for network errors
+
+    Returns:
+        List of play-by-play events, or empty list on failure
+    """
+    return extract_plays(fetch_summary(game_id, league, retries=retries, fetcher=fetcher, cache=cache, retry=retry))
+
+
+def fetch_team(team_id, league=MENS_LEAGUE, fetcher=None, retry=DEFAULT_RETRY, cache=None):
+    """
+    Fetch a team's details (logos, colors, ...)
+
+    With a cache, expired entries are revalidated with ETag / Last-Modified
+    (see get_json_revalidated).
+
+    Returns:
+        Team JSON, or None on failure
+    """
+    league = league_path(league)
+    endpoint = f"teams/{team_id}"
+    return get_json_revalidated(cache, league, endpoint, None, f"{ESPN_API_BASE}/{league}/{endpoint}",
+                                fetcher=fetcher, label=f"team {team_id}", retry=retry)
+
+
+def fetch_team_schedule(team_id, season_year, league=MENS_LEAGUE, fetcher=None, cache=RESPONSE_CACHE,
+                        retry=DEFAULT_RETRY):
+    """
+    Fetch a team's schedule for the season starting in `season_year`
+
+    Returns:
+        Schedule JSON, or None on failure
+    """
+    league = league_path(league)
+    endpoint = f"teams/{team_id}/schedule"
+    params = {"season": season_year}
+
+    def download():
+        return get_json_with_retries(f"{ESPN_API_BASE}/{league}/{endpoint}", params,
+                                     fetcher=fetcher, label=f"schedule for {season_year}", retry=retry)
+
+    return cached_fetch(cache, league, endpoint, params, download)
+
+
+class ESPNAPIClient:
+    """
+    Client for fetching data from ESPN's hidden API
+
+    Owns a pooled keep-alive session sized to `concurrency` (unless a shared
+    session or ConcurrentFetcher is passed as `fetcher`) and applies one
+    retry policy to every request. With `selective`, get_play_by_play
+    returns the selective summary form (see fetch_summary).
+    """
+
+    BASE_URL = ESPN_API_BASE
+
+    def __init__(self, league: League = League.MENS, cache: Optional[ResponseCache] = RESPONSE_CACHE, fetcher=None,
+                 concurrency: int = DEFAULT_POOL_SIZE, retry: Optional[RetryPolicy] = None,
+                 selective: bool = False):
+        self.league = league
+        self.league_path = league.path
+        # Local response cache (defaults to the R69W_CACHE / R69W_CACHE_DIR settings; None disables it)
+        self.cache = cache
+        self.retry = retry or DEFAULT_RETRY
+        self.session = create_session(concurrency) if fetcher is None else None
+        self.fetcher = fetcher or self.session
+        self.selective = selective
+
+    def get_scoreboard(self, date: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Fetch scoreboard for a given date
+
+        Args:
+            date: Date to fetch (defaults to today)
+
+        Returns:
+            JSON response with game data, or None if the fetch failed
+        """
+        if date is None:
+            date = datetime.now()
+        return fetch_scoreboard(date, self.league_path, fetcher=self.fetcher, cache=self.cache, retry=self.retry)
+
+    def get_play_by_play(self, game_id: str) -> Dict:
+        """
+        Fetch play-by-play data for a specific game
+
+        Args:
+            game_id: ESPN game ID
+
+        Returns:
+            JSON response with play-by-play data
+        """
+        return fetch_summary(game_id, self.league_path, fetcher=self.fetcher, cache=self.cache, retry=self.retry,
+                             selective=self.selective)
+
+    def get_plays(self, game_id: str) -> List[Dict]:
+        """Fetch just the play list for a game"""
+        return extract_plays(self.get_play_by_play(game_id))
+
+    def get_team(self, team_id: str) -> Optional[Dict]:
+        """Fetch a team's details"""
+        return fetch_team(team_id, self.league_path, fetcher=self.fetcher, retry=self.retry, cache=self.cache)
+
+    def get_team_schedule(self, team_id: str, season_year: int) -> Optional[Dict]:
+        """Fetch a team's schedule for the season starting in `season_year`"""
+        return fetch_team_schedule(team_id, season_year, self.league_path, fetcher=self.fetcher,
+                                   cache=self.cache, retry=self.retry)
+
+    def close(self):
+        """Release the client's pooled connections"""
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,135 @@
+"""
+Game clock helpers
+Converts ESPN clock displays into seconds remaining and seconds elapsed, plus
+accessors for the clock/period/sequence fields of a play
+
+Clock displays come in a few thousand distinct values ("MM:SS", and "SS.s"
+in the last minute), so convert_clock_to_seconds is a lookup in a table
+built at import; anything else is parsed once and remembered. Elapsed time
+uses per-period end offsets from a PeriodLengths: HALVES for men's games,
+QUARTERS (four 10 minute quarters) for women's (see period_lengths).
+"""
+
+REGULATION_PERIOD_SECONDS = 1200  # 20 minute halves
+OVERTIME_PERIOD_SECONDS = 300     # 5 minute overtimes
+
+MAX_CLOCK_MINUTES = 20        # longest period the table covers
+CLOCK_TABLE_LIMIT = 50000     # cap on remembered off-table displays
+
+
+class PeriodLengths:
+    """
+    Regulation period count and lengths for one game format
+
+    Period end offsets (seconds from tip-off) are computed once per period
+    number and reused for every play.
+    """
+
+    __slots__ = ('periods', 'period_seconds', 'overtime_seconds', '_ends')
+
+    def __init__(self, periods, period_seconds, overtime_seconds=OVERTIME_PERIOD_SECONDS):
+        self.periods = periods
+        self.period_seconds = period_seconds
+        self.overtime_seconds = overtime_seconds
+        self._ends = {}
+
+    @property
+    def regulation_seconds(self):
+        return self.periods * self.period_seconds
+
+    def period_end(self, period_num):
+        """Seconds from tip-off at the end of a period"""
+        end = self._ends.get(period_num)
+        if end is None:
+            if 1 <= period_num <= self.periods:
+                end = period_num * self.period_seconds
+            else:
+                # Overtime offsets as the detectors have always stored them
+                end = self.regulation_seconds + (period_num - self.periods + 1) * self.overtime_seconds
+            self._ends[period_num] = end
+        return end
+
+
+HALVES = PeriodLengths(2, REGULATION_PERIOD_SECONDS)
+QUARTERS = PeriodLengths(4, 600)
+
+
+def period_lengths(league):
+    """
+    PeriodLengths of a league's games
+
+    Args:
+        league: League (r69w.client), games.league value ('mens'/'womens') or
+            ESPN league path; women's college basketball plays quarters
+    """
+    league = getattr(league, 'value', league) or ''
+    return QUARTERS if league.startswith('womens') else HALVES
+
+
+def _build_clock_table(max_minutes=MAX_CLOCK_MINUTES):
+    table = {}
+    for minutes in range(max_minutes + 1):
+        for seconds in range(60):
+            remaining = minutes * 60 + seconds
+            table[f"{minutes}:{seconds:02d}"] = remaining
+            table[f"{minutes:02d}:{seconds:02d}"] = remaining
+    # Sub-minute displays carry tenths; remaining time is kept in whole seconds
+    for seconds in range(60):
+        for tenths in range(10):
+            for display in (f"{seconds}.{tenths}", f"{seconds:02d}.{tenths}", f"0:{seconds:02d}.{tenths}"):
+                table[display] = seconds
+    return table
+
+
+_CLOCK_TABLE = _build_clock_table()
+
+
+def _parse_clock(clock_display):
+    """Slow path of convert_clock_to_seconds for displays not in the table"""
+    if not isinstance(clock_display, str):
+        return 0
+    minutes, sep, seconds = clock_display.strip().rpartition(':')
+    try:
+        remaining = int(minutes) * 60 if sep else 0
+        return remaining + int(float(seconds))
+    except ValueError:
+        return 0
+
+
+def convert_clock_to_seconds(clock_display):
+    """Convert clock display (e.g., '12:34' or '45.3') to seconds remaining (0 if unparseable)"""
+    remaining = _CLOCK_TABLE.get(clock_display)
+    if remaining is None:
+        remaining = _parse_clock(clock_display)
+        if isinstance(clock_display, str) and len(_CLOCK_TABLE) < CLOCK_TABLE_LIMIT:
+            _CLOCK_TABLE[clock_display] = remaining
+    return remaining
+
+
+def elapsed_from_remaining(period_num, remaining_seconds, lengths=HALVES):
+    """Total elapsed seconds from tip-off given the period and seconds remaining in it"""
+    return lengths.period_end(period_num) - remaining_seconds
+
+
+def calculate_elapsed_time(period_num, clock_display, lengths=HALVES):
+    """Calculate total elapsed time from start of game"""
+    return lengths.period_end(period_num) - convert_clock_to_seconds(clock_display)
+
+
+def play_period(play):
+    """Period number of an ESPN play (defaults to 1)"""
+    period = play.get('period', {})
+    return period.get('number', 1) if isinstance(period, dict) else 1
+
+
+def play_clock(play):
+    """Clock display of an ESPN play (defaults to '0:00')"""
+    return (play.get('clock') or {}).get('displayValue', '0:00')
+
+
+def play_sequence(play, default):
+    """Integer sequenceNumber of a play (ESPN sends it as a string), or `default`"""
+    try:
+        return int(play.get('sequenceNumber'))
+    except (TypeError, ValueError):
+        return default
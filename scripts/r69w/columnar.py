@@ -0,0 +1,152 @@
+"""
+Columnar R69 detection
+Vectorized (NumPy) first-to-69 detection for many games at once, used to
+recompute R69 from stored pbp_events
+
+Plays are flat arrays ordered by game then sequence number. `offsets` marks
+where each game's rows start: rows offsets[i]:offsets[i + 1] belong to game
+i. Results match detect_r69_event play for play: the first row where either
+score reaches 69 wins, and the home team wins a row where both do. Any other
+race-to-N threshold works the same way (detect_race_columnar).
+"""
+
+import numpy as np
+
+from r69w.clock import HALVES
+from r69w.detector import R69_TARGET, RACE_THRESHOLDS
+
+NO_EVENT = -1
+
+
+def offsets_from_index(game_index, n_games):
+    """Segment offsets (length n_games + 1) from a non-decreasing row -> game index"""
+    game_index = np.asarray(game_index, dtype=np.int64)
+    return np.searchsorted(game_index, np.arange(n_games + 1), side='left')
+
+
+def elapsed_from_remaining(period, remaining, lengths=HALVES):
+    """Vectorized r69w.clock.elapsed_from_remaining over period / seconds-remaining arrays"""
+    period = np.asarray(period, dtype=np.int64)
+    remaining = np.asarray(remaining, dtype=np.int64)
+
+    if period.size == 0:
+        return period - remaining
+
+    # Period end offsets as a lookup table over the (small) range of period numbers
+    low, high = int(period.min()), int(period.max())
+    ends = np.array([lengths.period_end(n) for n in range(low, high + 1)], dtype=np.int64)
+    return ends[period - low] - remaining
+
+
+def elapsed_by_game(period, remaining, offsets, lengths):
+    """
+    elapsed_from_remaining with each game's own PeriodLengths
+
+    Args:
+        offsets: Segment offsets, length n_games + 1 (see offsets_from_index)
+        lengths: PeriodLengths per game (see r69w.clock.period_lengths)
+    """
+    formats = list({id(game_lengths): game_lengths for game_lengths in lengths}.values())
+    if len(formats) <= 1:
+        return elapsed_from_remaining(period, remaining, formats[0] if formats else HALVES)
+
+    period = np.asarray(period, dtype=np.int64)
+    remaining = np.asarray(remaining, dtype=np.int64)
+    rows_per_game = np.diff(offsets)
+    elapsed = np.empty(len(period), dtype=np.int64)
+    for game_format in formats:
+        rows = np.repeat([game_lengths is game_format for game_lengths in lengths], rows_per_game)
+        elapsed[rows] = elapsed_from_remaining(period[rows], remaining[rows], game_format)
+    return elapsed
+
+
+def detect_r69_columnar(offsets, home_score, away_score, elapsed, period, target=R69_TARGET):
+    """
+    First-to-69 (or first-to-`target`) for every game in a batch
+
+    Args:
+        offsets: Segment offsets, length n_games + 1 (see offsets_from_index)
+        home_score, away_score: Score state per row
+        elapsed: Seconds from tip-off per row (see elapsed_from_remaining)
+        period: Period number per row
+
+    Returns:
+        Dict of per-game arrays (length n_games): row (index of the play
+        reaching the target, NO_EVENT if nobody did), team_is_home, t_to_69,
+        period, margin_at_69 and opponent_score (from the point of view of
+        the team that got there first, 0 where row is NO_EVENT)
+    """
+    return detect_race_columnar(offsets, home_score, away_score, elapsed, period, (target,))[target]
+
+
+def detect_race_columnar(offsets, home_score, away_score, elapsed, period, thresholds=RACE_THRESHOLDS):
+    """
+    detect_r69_columnar for a set of thresholds
+
+    The arrays are converted and the leading score per row is computed once;
+    each threshold then costs one mask over it.
+
+    Returns:
+        Dict of threshold -> per-game columns (see detect_r69_columnar)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    home_score = np.asarray(home_score, dtype=np.int64)
+    away_score = np.asarray(away_score, dtype=np.int64)
+    elapsed = np.asarray(elapsed, dtype=np.int64)
+    period = np.asarray(period, dtype=np.int64)
+    top = np.maximum(home_score, away_score)
+
+    return {
+        target: _first_to(offsets, home_score, away_score, top, elapsed, period, target)
+        for target in sorted(set(thresholds))
+    }
+
+
+def _first_to(offsets, home_score, away_score, top, elapsed, period, target):
+    n_games = len(offsets) - 1
+
+    # Rows at or past the target; the first one of each game decides the race
+    hits = np.flatnonzero(top >= target)
+    hit_game = np.searchsorted(offsets, hits, side='right') - 1
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = hit_game[1:] != hit_game[:-1]
+
+    row = np.full(n_games, NO_EVENT, dtype=np.int64)
+    row[hit_game[first]] = hits[first]
+
+    found = row != NO_EVENT
+    at = row[found]
+    home_at, away_at = home_score[at], away_score[at]
+    home_first = home_at >= target
+
+    columns = {'row': row, 'team_is_home': np.zeros(n_games, dtype=bool)}
+    for name in ('t_to_69', 'period', 'margin_at_69', 'opponent_score'):
+        columns[name] = np.zeros(n_games, dtype=np.int64)
+
+    columns['team_is_home'][found] = home_first
+    columns['t_to_69'][found] = elapsed[at]
+    columns['period'][found] = period[at]
+    columns['margin_at_69'][found] = np.where(home_first, home_at - away_at, away_at - home_at)
+    columns['opponent_score'][found] = np.where(home_first, away_at, home_at)
+    return columns
+
+
+def r69_event_at(columns, i, home_team_id, away_team_id, description=''):
+    """
+    Game i's result from detect_r69_columnar as a detect_r69_event dict
+
+    Returns:
+        Event dict, or None if nobody reached the target
+    """
+    if columns['row'][i] == NO_EVENT:
+        return None
+    team_is_home = bool(columns['team_is_home'][i])
+    return {
+        'team_id': home_team_id if team_is_home else away_team_id,
+        'team_is_home': team_is_home,
+        't_to_69': int(columns['t_to_69'][i]),
+        'period': int(columns['period'][i]),
+        'margin_at_69': int(columns['margin_at_69'][i]),
+        'opponent_score': int(columns['opponent_score'][i]),
+        'description': description or ''
+    }
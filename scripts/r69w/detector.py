@@ -0,0 +1,209 @@
+"""
+R69 detection
+Finds the first team to reach 69 points, regardless of whether it was leading
+(see docs/R69_ALGORITHM_FIX.md), and more generally the first team to reach
+each of a set of "race to N" thresholds
+"""
+
+from r69w.clock import HALVES, calculate_elapsed_time, play_clock, play_period, play_sequence
+
+R69_TARGET = 69
+
+# Thresholds recorded in race_events (always includes R69_TARGET)
+RACE_THRESHOLDS = (20, 40, 50, 60, 69, 80, 100)
+
+
+def _r69_event(play, team_id, team_is_home, team_score, opponent_score, lengths=HALVES):
+    period_num = play_period(play)
+    return {
+        'team_id': team_id,
+        'team_is_home': team_is_home,
+        't_to_69': calculate_elapsed_time(period_num, play_clock(play), lengths),
+        'period': period_num,
+        'margin_at_69': team_score - opponent_score,
+        'opponent_score': opponent_score,
+        'description': play.get('text', '')
+    }
+
+
+def detect_r69_event(plays, home_team_id, away_team_id, lengths=HALVES):
+    """
+    Detect R69 event from play-by-play data - tracks first team to reach 69
+
+    Args:
+        plays: ESPN plays in game order
+        home_team_id: Home team ESPN ID
+        away_team_id: Away team ESPN ID
+        lengths: Game's PeriodLengths (see r69w.clock.period_lengths)
+
+    Returns:
+        Dict with team_id, team_is_home, t_to_69, period, margin_at_69,
+        opponent_score and description, or None if nobody reached 69
+    """
+    for play in plays:
+        home_score = play.get('homeScore', 0)
+        away_score = play.get('awayScore', 0)
+
+        # Home team hit 69 first (regardless of whether leading)
+        if home_score >= R69_TARGET:
+            return _r69_event(play, home_team_id, True, home_score, away_score, lengths)
+
+        # Away team hit 69 first (regardless of whether leading)
+        if away_score >= R69_TARGET:
+            return _r69_event(play, away_team_id, False, away_score, home_score, lengths)
+
+    return None
+
+
+def detect_race_events(plays, home_team_id, away_team_id, thresholds=RACE_THRESHOLDS, lengths=HALVES):
+    """
+    First team to reach each threshold, in one pass over the plays
+
+    The first play where either score reaches N decides race N (home first
+    when both do), exactly as detect_r69_event does for 69. Thresholds are
+    walked in ascending order, so each play costs one comparison until the
+    next threshold is crossed. `lengths` is the game's PeriodLengths.
+
+    Returns:
+        Dict of threshold -> event dict (detect_r69_event's shape plus
+        'threshold') for every threshold that was reached
+    """
+    targets = sorted(set(thresholds))
+    events = {}
+    k = 0
+
+    for play in plays:
+        if k == len(targets):
+            break
+        home_score = play.get('homeScore', 0)
+        away_score = play.get('awayScore', 0)
+
+        while k < len(targets) and max(home_score, away_score) >= targets[k]:
+            target = targets[k]
+            if home_score >= target:
+                event = _r69_event(play, home_team_id, True, home_score, away_score, lengths)
+            else:
+                event = _r69_event(play, away_team_id, False, away_score, home_score, lengths)
+            event['threshold'] = target
+            events[target] = event
+            k += 1
+
+    return events
+
+
+def r69_outcome(r69_data, final_home_score, final_away_score):
+    """
+    Outcome for the team that hit 69 first
+
+    Returns:
+        Tuple of (r69w, final_margin) from that team's point of view
+    """
+    if r69_data.get('team_is_home', False):
+        return final_home_score > final_away_score, final_home_score - final_away_score
+    return final_away_score > final_home_score, final_away_score - final_home_score
+
+
+class IncrementalR69Detector:
+    """
+    Streaming first-to-69 detector for one live game
+
+    Feed it the game's plays as often as they arrive: plays at or below the
+    last seen sequenceNumber are skipped without being re-scanned, and only
+    running totals are kept (scores, leader, lead changes, largest leads),
+    so memory per game is constant regardless of game length. The R69 event
+    is returned by the feed() call that contains the play reaching 69, and
+    `event` holds it afterwards. `lengths` is the game's PeriodLengths.
+    """
+
+    __slots__ = (
+        'home_team_id', 'away_team_id', 'lengths', 'last_sequence', 'plays_seen',
+        'home_score', 'away_score', 'period', 'clock',
+        'leader', 'lead_changes', 'home_max_lead', 'away_max_lead', 'event'
+    )
+
+    def __init__(self, home_team_id, away_team_id, lengths=HALVES):
+        self.home_team_id = home_team_id
+        self.away_team_id = away_team_id
+        self.lengths = lengths
+        self.last_sequence = -1
+        self.plays_seen = 0
+        self.home_score = 0
+        self.away_score = 0
+        self.period = 1
+        self.clock = None
+        self.leader = None  # 'home' or 'away' (None until the first lead)
+        self.lead_changes = 0
+        self.home_max_lead = 0
+        self.away_max_lead = 0
+        self.event = None
+
+    @property
+    def triggered(self):
+        """True once a team has reached 69"""
+        return self.event is not None
+
+    def new_plays(self, plays):
+        """
+        The plays after the last seen sequenceNumber, in order
+
+        `plays` may be the full play list (as returned by every summary poll)
+        or just the tail; the list is walked backwards, so only new plays are
+        touched. Plays without a sequenceNumber fall back to their 1-based
+        position in the list.
+        """
+        start = len(plays)
+        while start > 0 and play_sequence(plays[start - 1], start) > self.last_sequence:
+            start -= 1
+        return plays[start:]
+
+    def feed(self, plays):
+        """
+        Consume plays (see new_plays) and update the running state
+
+        Returns:
+            The R69 event dict (same shape as detect_r69_event) if it happened
+            in this batch, otherwise None
+        """
+        fresh = self.new_plays(plays)
+        offset = len(plays) - len(fresh)
+        detected = None
+
+        for position, play in enumerate(fresh, offset + 1):
+            self.last_sequence = play_sequence(play, position)
+            self.plays_seen += 1
+
+            home_score = play.get('homeScore', self.home_score)
+            away_score = play.get('awayScore', self.away_score)
+            self.home_score = home_score
+            self.away_score = away_score
+            self.period = play_period(play)
+            self.clock = play_clock(play)
+
+            self._track_lead(home_score - away_score)
+
+            if self.event is None:
+                if home_score >= R69_TARGET:
+                    self.event = detected = _r69_event(
+                        play, self.home_team_id, True, home_score, away_score, self.lengths)
+                elif away_score >= R69_TARGET:
+                    self.event = detected = _r69_event(
+                        play, self.away_team_id, False, away_score, home_score, self.lengths)
+
+        return detected
+
+    def _track_lead(self, margin):
+        if margin > 0:
+            leader = 'home'
+            if margin > self.home_max_lead:
+                self.home_max_lead = margin
+        elif margin < 0:
+            leader = 'away'
+            if -margin > self.away_max_lead:
+                self.away_max_lead = -margin
+        else:
+            # A tie does not end the previous lead for lead-change counting
+            return
+
+        if self.leader is not None and leader != self.leader:
+            self.lead_changes += 1
+        self.leader = leader
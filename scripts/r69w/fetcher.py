@@ -0,0 +1,114 @@
+"""
+Concurrent ESPN fetch engine
+Bounded thread pool over a shared requests.Session with a token-bucket rate limiter
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from r69w.metrics import METRICS
+from r69w.session import create_session
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate: Tokens added per second (requests/sec budget)
+            capacity: Maximum burst size (defaults to one second of budget)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait_time = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class ConcurrentFetcher:
+    """
+    Runs HTTP fetches on a bounded worker pool
+
+    All requests share one pooled session and one rate limiter, so throughput
+    is bounded by the request budget instead of per-request latency.
+    """
+
+    def __init__(self, concurrency=8, rate=5.0, burst=None, timeout=15, limiter=None):
+        """
+        Args:
+            concurrency: Maximum number of in-flight requests
+            rate: Request budget in requests per second
+            burst: Token bucket capacity (defaults to `concurrency`)
+            timeout: Per-request timeout in seconds
+            limiter: Rate limiter with acquire() to use instead of a local
+                TokenBucket (e.g. r69w.shards.GlobalRateLimiter)
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.limiter = limiter or TokenBucket(rate, burst if burst is not None else self.concurrency)
+
+        # One pooled keep-alive connection per worker
+        self.session = create_session(self.concurrency)
+
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        """Rate-limited GET on the shared session (same call shape as requests.get)"""
+        with METRICS.time('rate_wait'):
+            self.limiter.acquire()
+        return self.session.get(url, params=params, timeout=timeout or self.timeout, headers=headers)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) on the worker pool"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def imap(self, fn, items, window=None):
+        """
+        Ordered, pipelined map over the worker pool
+
+        Keeps up to `window` calls in flight ahead of the consumer and yields
+        (item, result) pairs in input order.
+        """
+        window = window or self.concurrency
+        pending = deque()
+
+        for item in items:
+            pending.append((item, self._pool.submit(fn, item)))
+            if len(pending) >= window:
+                head_item, head_future = pending.popleft()
+                yield head_item, head_future.result()
+
+        while pending:
+            head_item, head_future = pending.popleft()
+            yield head_item, head_future.result()
+
+    def close(self):
+        """Shut down the worker pool and release pooled connections"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
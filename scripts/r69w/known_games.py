@@ -0,0 +1,62 @@
+"""
+In-memory set of ESPN game IDs already stored in the games table
+Loaded with one query per run instead of one SELECT per scoreboard event
+"""
+
+import os
+from datetime import timedelta
+
+
+class KnownGameIds:
+    """Set of known ESPN game IDs with an optional on-disk snapshot"""
+
+    def __init__(self, snapshot_path=None):
+        """
+        Args:
+            snapshot_path: Optional file with one ESPN game ID per line. It is
+                merged in on load and rewritten by save_snapshot(). Delete it
+                after removing games from the database (e.g. remove_old_seasons.py).
+        """
+        self.snapshot_path = snapshot_path
+        self._ids = set()
+
+    def load(self, cursor, start_date, end_date):
+        """
+        Load every game_id with a game_date inside [start_date, end_date]
+
+        The range is widened by a day on each side because games.game_date is
+        the UTC date while scoreboards are requested by local date.
+
+        Returns:
+            Number of IDs known after loading
+        """
+        cursor.execute(
+            "SELECT game_id FROM games WHERE game_date BETWEEN %s AND %s",
+            (start_date - timedelta(days=1), end_date + timedelta(days=1))
+        )
+        self._ids.update(row[0] for row in cursor.fetchall())
+
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                self._ids.update(line.strip() for line in f if line.strip())
+
+        return len(self._ids)
+
+    def save_snapshot(self):
+        """Write the current ID set to the snapshot file (if configured)"""
+        if not self.snapshot_path:
+            return
+
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{game_id}\n" for game_id in sorted(self._ids))
+        os.replace(tmp_path, self.snapshot_path)
+
+    def add(self, game_id):
+        self._ids.add(game_id)
+
+    def __contains__(self, game_id):
+        return game_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
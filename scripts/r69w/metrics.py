@@ -0,0 +1,308 @@
+"""
+Ingestion metrics
+Per-stage timings, latency histograms, throughput and HTTP status counters,
+exported in the Prometheus text format
+
+Stages timed across the ingestion path:
+
+    fetch      HTTP GET as the caller sees it (includes any rate_wait)
+    rate_wait  waiting for the fetch engine's request budget
+    decode     JSON decoding of a response body
+    parse      ESPN plays -> pbp_events rows
+    detect     R69 detection
+    db_write   game / R69 / PBP statements
+    commit     transaction commits
+
+Everything is recorded into the process-wide METRICS registry. A script
+exposes it with MetricsExporter: a text file rewritten on an interval (for
+node_exporter's textfile collector, or just `cat`) and/or an HTTP endpoint
+serving /metrics.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = ('fetch', 'rate_wait', 'decode', 'parse', 'detect', 'db_write', 'commit')
+
+# Histogram bucket upper bounds (seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_WRITE_INTERVAL = 15.0  # seconds between metrics file rewrites
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_HOST = '127.0.0.1'  # metrics server interface unless exposed explicitly
+
+# HELP text per throughput counter (anything else: "<Name> written")
+COUNTER_HELP = {
+    'summary_bytes_decoded': 'Summary JSON bytes decoded',
+    'summary_bytes_kept': 'Summary JSON bytes kept after selection (r69w.summary)',
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (not thread-safe; Metrics holds the lock)"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf past the last bucket)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms and counters"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._http = {}
+        self._counters = {'games': 0, 'plays': 0}
+
+    def observe(self, stage, seconds):
+        """Record one timing for a stage"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """Time a block as one observation of `stage` (recorded even if it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Decorator form of time()"""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1):
+        """Add to a throughput counter ('games', 'plays')"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def count_http(self, status):
+        """Count one HTTP outcome: a status code, or 'timeout' / 'connection_error' / 'error'"""
+        status = str(status)
+        with self._lock:
+            self._http[status] = self._http.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._stages = {}
+            self._http = {}
+            self._counters = {'games': 0, 'plays': 0}
+
+    def _snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._stages.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.count = histogram.count
+                copy.sum = histogram.sum
+                stages[stage] = copy
+            return stages, dict(self._http), dict(self._counters), time.time() - self.started
+
+    def render(self):
+        """Prometheus text exposition of everything recorded so far"""
+        stages, http, counters, elapsed = self._snapshot()
+        lines = [
+            '# HELP r69w_stage_seconds Time spent per ingestion stage',
+            '# TYPE r69w_stage_seconds histogram',
+        ]
+        for stage in _ordered(stages):
+            histogram = stages[stage]
+            cumulative = 0
+            for bound, n in zip(histogram.buckets, histogram.counts):
+                cumulative += n
+                lines.append(f'r69w_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'r69w_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'r69w_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'r69w_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines += [
+            '# HELP r69w_http_responses_total HTTP responses by status (or transport failure)',
+            '# TYPE r69w_http_responses_total counter',
+        ]
+        lines += [f'r69w_http_responses_total{{status="{status}"}} {n}' for status, n in sorted(http.items())]
+
+        for name, n in sorted(counters.items()):
+            rate = n / elapsed if elapsed > 0 else 0.0
+            help_text = COUNTER_HELP.get(name, f'{name.capitalize()} written')
+            lines += [
+                f'# HELP r69w_{name}_total {help_text}',
+                f'# TYPE r69w_{name}_total counter',
+                f'r69w_{name}_total {n}',
+                f'# HELP r69w_{name}_per_second {help_text} per second over the run',
+                f'# TYPE r69w_{name}_per_second gauge',
+                f'r69w_{name}_per_second {rate:.3f}',
+            ]
+
+        lines += [
+            '# HELP r69w_run_seconds Seconds since the run started',
+            '# TYPE r69w_run_seconds gauge',
+            f'r69w_run_seconds {elapsed:.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Atomically (re)write the metrics file (readers never see a partial file)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def summary_lines(self):
+        """Human-readable stage table plus throughput and HTTP counts for end-of-run output"""
+        stages, http, counters, elapsed = self._snapshot()
+        if not stages and not http:
+            return []
+
+        lines = [f"{'Stage':<10} {'Count':>8} {'Total s':>9} {'Mean ms':>9} {'p95 ms':>9}"]
+        for stage in _ordered(stages):
+            histogram = stages[stage]
+            mean_ms = histogram.sum / histogram.count * 1000
+            p95 = histogram.quantile(0.95)
+            p95_text = f"<={p95 * 1000:g}" if p95 != float('inf') else f">{histogram.buckets[-1]:g}s"
+            lines.append(f"{stage:<10} {histogram.count:>8} {histogram.sum:>9.2f} {mean_ms:>9.1f} {p95_text:>9}")
+
+        if elapsed > 0:
+            lines.append(f"Throughput: {counters.get('games', 0) / elapsed:.2f} games/sec, "
+                         f"{counters.get('plays', 0) / elapsed:,.0f} plays/sec")
+        decoded = counters.get('summary_bytes_decoded', 0)
+        if decoded:
+            kept = counters.get('summary_bytes_kept', 0)
+            lines.append(f"Summary JSON: {decoded / 1e6:,.1f} MB decoded, {kept / 1e6:,.1f} MB kept "
+                         f"({kept / decoded * 100:.1f}%)")
+        if http:
+            lines.append("HTTP: " + ", ".join(f"{status}={n}" for status, n in sorted(http.items())))
+        return lines
+
+
+def _ordered(stages):
+    """Known stages in pipeline order, then any others by name"""
+    return [s for s in STAGES if s in stages] + sorted(s for s in stages if s not in STAGES)
+
+
+# Process-wide registry every r69w module records into
+METRICS = Metrics()
+
+
+class MetricsExporter:
+    """
+    Exposes a Metrics registry while a run is going
+
+    Args:
+        metrics: Registry to export
+        path: Metrics file rewritten every `interval` seconds and on close
+        port: Serve GET /metrics on this port (0 or None: no server)
+        host: Interface for the HTTP server (default: loopback only; '0.0.0.0'
+            exposes it on all interfaces)
+    """
+
+    def __init__(self, metrics=METRICS, path=None, port=None, host=DEFAULT_HOST, interval=DEFAULT_WRITE_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._writer = None
+        self._server = None
+
+        if port:
+            self._server = ThreadingHTTPServer((host, port), _handler(metrics))
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name='r69w-metrics-http', daemon=True).start()
+
+        if path:
+            self._writer = threading.Thread(target=self._write_loop, name='r69w-metrics-file', daemon=True)
+            self._writer.start()
+
+    @property
+    def port(self):
+        """Port the HTTP server is bound to (None without a server)"""
+        return self._server.server_address[1] if self._server else None
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.write(self.path)
+            except OSError as e:
+                print(f"  ⚠ Could not write metrics file {self.path}: {e}")
+
+    def close(self):
+        """Stop exporting; the metrics file is written one last time"""
+        self._stop.set()
+        if self.path:
+            try:
+                self.metrics.write(self.path)
+            except OSError as e:
+                print(f"  ⚠ Could not write metrics file {self.path}: {e}")
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrape requests out of the run's output
+
+    return MetricsHandler
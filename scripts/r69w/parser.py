@@ -0,0 +1,137 @@
+"""
+Play-by-play parsing stage
+Turns ESPN summary plays into compact pbp_events rows, optionally across a process pool
+
+The per-play work is done once per play: the clock dict is read once and the
+remaining seconds are reused for both clock_seconds and elapsed_seconds.
+parse_plays is the one row builder for every ingestion path (backfill,
+replay, fetch_missing_pbp and GameProcessor's Play records), so the same
+ESPN play always becomes the same pbp_events row.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from r69w.clock import HALVES, convert_clock_to_seconds, elapsed_from_remaining, play_sequence
+from r69w.writer import encode_copy_rows
+
+
+def parse_plays(plays, lengths=HALVES, start=0):
+    """
+    Convert ESPN plays into pbp_events rows without the game_id column
+
+    Args:
+        plays: ESPN plays in game order
+        lengths: Game's PeriodLengths (see r69w.clock.period_lengths)
+        start: Position of plays[0] in the game's full play list; a play
+            without a sequenceNumber falls back to its 1-based position, as in
+            r69w.detector.IncrementalR69Detector
+
+    Returns:
+        List of tuples in PBP_COLUMNS order minus the leading game_id
+    """
+    rows = []
+    append = rows.append
+
+    for position, play in enumerate(plays, start + 1):
+        get = play.get
+
+        clock = get('clock') or {}
+        remaining = convert_clock_to_seconds(clock.get('displayValue', '0:00'))
+
+        period = get('period', {})
+        period_num = period.get('number', 1) if isinstance(period, dict) else 1
+
+        participants = get('participants')
+        player_name = participants[0].get('athlete', {}).get('displayName', '') if participants else ''
+
+        append((
+            play_sequence(play, position),
+            period_num,
+            remaining,
+            elapsed_from_remaining(period_num, remaining, lengths),
+            (get('team') or {}).get('id', ''),
+            player_name,
+            (get('type') or {}).get('text', ''),
+            get('scoreValue', 0),
+            get('homeScore', 0),
+            get('awayScore', 0),
+            get('text', '')
+        ))
+
+    return rows
+
+
+def pbp_rows(game_db_id, plays, lengths=HALVES):
+    """pbp_events row tuples (PBP_COLUMNS order) for one game"""
+    return [(game_db_id,) + row for row in parse_plays(plays, lengths)]
+
+
+def parse_plays_to_copy_block(plays, lengths=HALVES):
+    """
+    Parse plays straight into a COPY text block without the game_id column
+
+    This is the compact form handed from parser workers to the DB writer;
+    see r69w.writer.bulk_load_pbp_events(blocks=...).
+
+    Returns:
+        Tuple of (copy_block, row_count)
+    """
+    rows = parse_plays(plays, lengths)
+    return encode_copy_rows(rows), len(rows)
+
+
+def _apply_chunk(fn, chunk):
+    return [fn(item) for item in chunk]
+
+
+class ParallelParser:
+    """
+    Ordered, bounded map of a parse function over a process pool
+
+    `workers <= 1` runs inline in the current process, which keeps small runs
+    and debugging simple. The function must be a module-level (picklable)
+    callable.
+    """
+
+    def __init__(self, workers=None, chunk_size=16):
+        self.workers = (os.cpu_count() or 1) if workers is None else max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self._pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+    def imap(self, fn, items):
+        """Yield fn(item) for each item, in input order"""
+        if self._pool is None:
+            for item in items:
+                yield fn(item)
+            return
+
+        window = self.workers * 2
+        pending = deque()
+        chunk = []
+
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                pending.append(self._pool.submit(_apply_chunk, fn, chunk))
+                chunk = []
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+
+        if chunk:
+            pending.append(self._pool.submit(_apply_chunk, fn, chunk))
+
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,35 @@
+"""
+Machine-readable progress output
+JSON Lines events for unattended runs (cron, containers, parallel workers)
+
+With --json-progress a script writes one JSON object per line to stdout and
+its human-readable output moves to stderr, so stdout can be piped straight
+into a log collector or jq.
+"""
+
+import json
+import sys
+import time
+
+
+class ProgressReporter:
+    """Emits JSON progress events when enabled; a no-op otherwise"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self.stream = None
+        if enabled:
+            # Keep stdout for events; everything print()ed goes to stderr from here on
+            self.stream = sys.stdout
+            sys.stdout = sys.stderr
+
+    def emit(self, event, **fields):
+        """Write one event: {"event", "ts", "elapsed", **fields}"""
+        if not self.enabled:
+            return
+        now = time.time()
+        record = {'event': event, 'ts': round(now, 3), 'elapsed': round(now - self.started, 3)}
+        record.update(fields)
+        self.stream.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+        self.stream.flush()
@@ -0,0 +1,127 @@
+"""
+Pooled HTTP session and retry policy for ESPN requests
+Keep-alive connection pooling sized to the concurrency level, plus one shared
+backoff policy (exponential with jitter, honoring Retry-After)
+"""
+
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 8
+USER_AGENT = "r69w-ingest/1.0"
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Build a keep-alive session with a connection pool of `pool_size`
+
+    One pooled connection per concurrent worker means each worker reuses its
+    TCP+TLS connection instead of handshaking on every request.
+    """
+    pool_size = max(1, int(pool_size))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'User-Agent': USER_AGENT,
+    })
+    return session
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def default_session():
+    """Process-wide pooled session used when a caller does not supply one"""
+    global _default_session
+    if _default_session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = create_session()
+    return _default_session
+
+
+def parse_retry_after(value, now=None):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+
+    Returns:
+        Non-negative float, or None if the header is missing or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for transient ESPN failures
+
+    Timeouts, connection errors and the `retry_statuses` responses are
+    retried; other client errors (404, 400, ...) are not. A Retry-After
+    header on a 429/5xx response takes precedence over the computed backoff.
+    """
+
+    def __init__(self, attempts=3, backoff=1.0, max_backoff=30.0,
+                 retry_statuses=(429, 500, 502, 503, 504), max_retry_after=120.0):
+        """
+        Args:
+            attempts: Total attempts per request (1 = no retries)
+            backoff: Base delay in seconds (doubles every attempt)
+            max_backoff: Upper bound on the computed delay
+            retry_statuses: HTTP statuses that are retried
+            max_retry_after: Upper bound on a server-supplied Retry-After
+        """
+        self.attempts = max(1, int(attempts))
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = float(max_retry_after)
+
+    def with_attempts(self, attempts):
+        """Copy of this policy with a different attempt count"""
+        return RetryPolicy(attempts, self.backoff, self.max_backoff, self.retry_statuses, self.max_retry_after)
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.retry_statuses
+
+    def delay(self, attempt, response=None):
+        """
+        Seconds to sleep before retry number `attempt` (0-based)
+
+        Uses "equal jitter": half of the exponential step is fixed and half is
+        random, so concurrent workers that failed together spread out instead
+        of retrying in lockstep.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+
+        step = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return step / 2 + random.uniform(0, step / 2)
+
+
+DEFAULT_RETRY = RetryPolicy()
@@ -0,0 +1,277 @@
+"""
+Distributed backfill coordination in Postgres
+Date-range shards leased with SELECT ... FOR UPDATE SKIP LOCKED, plus a shared
+token bucket so every worker draws from one ESPN request budget
+
+Tables (prisma/schema.prisma): backfill_shards, rate_budgets.
+
+A coordinator splits a backfill into shards of a few days each. Any number of
+workers, on any machine that can reach the database, lease one shard at a
+time. A lease expires if its worker stops renewing it, so a crashed worker's
+shard is picked up again by someone else. Coordination statements run on
+their own autocommit connection, separate from the ingestion transaction.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_SHARD_DAYS = 7
+DEFAULT_LEASE_SECONDS = 900
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Bucket refill expression (clock_timestamp: wall time at this statement, not transaction start).
+# refilled_at is timestamptz, so the difference does not depend on each session's TimeZone.
+_AVAILABLE = "LEAST(capacity, tokens + EXTRACT(EPOCH FROM (clock_timestamp() - refilled_at)) * rate)"
+
+
+def plan_shards(date_ranges, shard_days=DEFAULT_SHARD_DAYS):
+    """
+    Split (start, end, season_label) ranges into shards of `shard_days` days
+
+    Returns:
+        List of (start_date, end_date, season_label), inclusive dates
+    """
+    shard_days = max(1, int(shard_days))
+    shards = []
+    for start, end, label in date_ranges:
+        # Season ranges are datetimes; shards are stored as dates
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        current = start
+        while current <= end:
+            shard_end = min(end, current + timedelta(days=shard_days - 1))
+            shards.append((current, shard_end, label))
+            current = shard_end + timedelta(days=1)
+    return shards
+
+
+class Shard:
+    """One leased date-range shard"""
+
+    __slots__ = ('id', 'league', 'start_date', 'end_date', 'season', 'attempts')
+
+    def __init__(self, id, league, start_date, end_date, season, attempts):
+        self.id = id
+        self.league = league
+        self.start_date = start_date
+        self.end_date = end_date
+        self.season = season
+        self.attempts = attempts
+
+    def dates(self):
+        """Every date in the shard"""
+        current = self.start_date
+        while current <= self.end_date:
+            yield current
+            current += timedelta(days=1)
+
+    def __str__(self):
+        return f"{self.league} {self.start_date}..{self.end_date}"
+
+
+class ShardQueue:
+    """Lease/complete/fail operations on backfill_shards for one job"""
+
+    def __init__(self, conn, job, worker, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            conn: Dedicated psycopg2 connection (switched to autocommit)
+            job: Backfill job name
+            worker: Name recorded on leases (e.g. host:pid)
+            lease_seconds: Lease length; renew() extends it
+            max_attempts: Failures after which a shard is parked as 'failed'
+        """
+        conn.autocommit = True
+        self.conn = conn
+        self.job = job
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def add(self, league, shards):
+        """
+        Create shards for the job (existing ones keep their state)
+
+        Args:
+            league: ESPN league path
+            shards: (start_date, end_date, season_label) tuples (see plan_shards)
+
+        Returns:
+            Number of shards created
+        """
+        created = 0
+        with self.conn.cursor() as cursor:
+            for start, end, season in shards:
+                cursor.execute("""
+                    INSERT INTO backfill_shards (id, job, league, season, start_date, end_date, created_at, updated_at)
+                    VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT (job, league, start_date) DO NOTHING
+                """, (self.job, league, season, start, end))
+                created += cursor.rowcount
+        return created
+
+    def lease(self):
+        """
+        Lease the oldest available shard (pending, or with an expired lease)
+
+        SKIP LOCKED lets concurrent workers pass over a row another worker is
+        leasing at the same instant instead of queueing behind it.
+
+        Returns:
+            Shard, or None when nothing is available
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards s
+                SET status = 'leased', leased_by = %(worker)s,
+                    lease_expires_at = NOW() + make_interval(secs => %(lease)s),
+                    updated_at = NOW()
+                WHERE s.id = (
+                    SELECT id FROM backfill_shards
+                    WHERE job = %(job)s
+                      AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW()))
+                    ORDER BY start_date, league
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING s.id, s.league, s.start_date, s.end_date, s.season, s.attempts
+            """, {'worker': self.worker, 'lease': self.lease_seconds, 'job': self.job})
+            row = cursor.fetchone()
+        return Shard(*row) if row else None
+
+    def renew(self, shard):
+        """
+        Extend a held lease
+
+        Returns:
+            False if the lease was lost (expired and taken by another worker)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards
+                SET lease_expires_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+                WHERE id = %s AND leased_by = %s AND status = 'leased'
+            """, (self.lease_seconds, shard.id, self.worker))
+            return cursor.rowcount == 1
+
+    def complete(self, shard, games_ingested=0):
+        """Mark a leased shard done"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards
+                SET status = 'done', games_ingested = %s, last_error = NULL,
+                    lease_expires_at = NULL, updated_at = NOW()
+                WHERE id = %s AND leased_by = %s
+            """, (games_ingested, shard.id, self.worker))
+
+    def fail(self, shard, error):
+        """Release a shard after an error (parked as 'failed' after max_attempts)"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards
+                SET attempts = attempts + 1,
+                    status = CASE WHEN attempts + 1 >= %s THEN 'failed' ELSE 'pending' END,
+                    last_error = %s, leased_by = NULL, lease_expires_at = NULL, updated_at = NOW()
+                WHERE id = %s AND leased_by = %s
+            """, (self.max_attempts, str(error)[:1000], shard.id, self.worker))
+
+    def release(self, shard):
+        """Hand a shard back without counting an attempt (e.g. on Ctrl-C)"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards
+                SET status = 'pending', leased_by = NULL, lease_expires_at = NULL, updated_at = NOW()
+                WHERE id = %s AND leased_by = %s AND status = 'leased'
+            """, (shard.id, self.worker))
+
+    def retry_failed(self):
+        """Move the job's parked failures back to pending"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE backfill_shards SET status = 'pending', attempts = 0, updated_at = NOW()
+                WHERE job = %s AND status = 'failed'
+            """, (self.job,))
+            return cursor.rowcount
+
+    def status(self):
+        """
+        Per-status shard counts for the job
+
+        Returns:
+            Dict of status -> (shards, games_ingested)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT status, COUNT(*), COALESCE(SUM(games_ingested), 0)
+                FROM backfill_shards WHERE job = %s GROUP BY status
+            """, (self.job,))
+            return {status: (count, games) for status, count, games in cursor.fetchall()}
+
+
+def set_rate_budget(conn, name, rate, capacity=None):
+    """Create or retune a shared request budget (tokens per second)"""
+    capacity = capacity if capacity is not None else max(1.0, rate)
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO rate_budgets (name, rate, capacity, tokens, refilled_at)
+            VALUES (%s, %s, %s, %s, clock_timestamp())
+            ON CONFLICT (name) DO UPDATE SET rate = EXCLUDED.rate, capacity = EXCLUDED.capacity
+        """, (name, rate, capacity, capacity))
+
+
+class GlobalRateLimiter:
+    """
+    Token bucket stored in rate_budgets, shared by every worker process
+
+    Drop-in for r69w.fetcher.TokenBucket (acquire()). Tokens are taken from
+    the shared row `chunk` at a time and spent locally, so the database sees
+    one round trip per chunk rather than per request.
+    """
+
+    def __init__(self, conn, name, chunk=2):
+        """
+        Args:
+            conn: Dedicated psycopg2 connection (switched to autocommit)
+            name: rate_budgets.name (see set_rate_budget)
+            chunk: Tokens reserved per round trip
+        """
+        conn.autocommit = True
+        self.conn = conn
+        self.name = name
+        self.chunk = max(1, int(chunk))
+        self._local = 0
+        self._lock = threading.Lock()
+
+    def _take(self, tokens):
+        """Try to take tokens from the shared bucket; returns seconds to wait (0 on success)"""
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE rate_budgets
+                SET tokens = {_AVAILABLE} - %(take)s, refilled_at = clock_timestamp()
+                WHERE name = %(name)s AND {_AVAILABLE} >= %(take)s
+                RETURNING tokens
+            """, {'name': self.name, 'take': tokens})
+            if cursor.fetchone():
+                return 0.0
+
+            cursor.execute(f"SELECT {_AVAILABLE}, rate FROM rate_budgets WHERE name = %s", (self.name,))
+            row = cursor.fetchone()
+            if not row:
+                raise RuntimeError(f"rate budget '{self.name}' does not exist (run the coordinator's plan step)")
+            available, rate = row
+            return max(0.05, (tokens - float(available)) / float(rate))
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` requests are allowed under the global budget"""
+        with self._lock:
+            while self._local < tokens:
+                wait_time = self._take(self.chunk)
+                if wait_time:
+                    time.sleep(wait_time)
+                else:
+                    self._local += self.chunk
+            self._local -= tokens
+
+    def close(self):
+        self.conn.close()
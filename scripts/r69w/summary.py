@@ -0,0 +1,205 @@
+"""
+Selective decoding of ESPN summary payloads
+Keeps only what ingestion reads from a summary: header.competitions and a
+trimmed play list
+
+A summary body carries the boxscore, leaders, news, odds, win probability
+and more next to the plays. decode_summary walks the body's top-level
+members one at a time: only `header` is decoded whole, `plays` is decoded
+one play at a time and trimmed as it goes, and every other member is
+decoded and dropped on its own. Peak memory is therefore the selective form
+plus the largest single member, not the whole document. Bytes received
+vs. the size of the kept members are counted in METRICS
+(summary_bytes_decoded / summary_bytes_kept).
+
+orjson (optional, see requirements.txt) speeds up the whole-payload
+loads()/dumps() used by the response cache; the stdlib json module is used
+without it.
+"""
+
+import json
+import re
+from json.decoder import scanstring
+
+from r69w.metrics import METRICS
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib decoder
+    orjson = None
+
+# Fields kept per play: everything the parser and the detectors read
+# (see r69w.parser.parse_plays)
+PLAY_FIELDS = (
+    'id', 'sequenceNumber', 'type', 'text', 'awayScore', 'homeScore', 'period', 'clock',
+    'scoringPlay', 'scoreValue', 'shootingPlay', 'team', 'participants'
+)
+
+COMPETITION_FIELDS = ('id', 'date', 'neutralSite', 'conferenceCompetition', 'status', 'competitors')
+COMPETITOR_FIELDS = ('id', 'homeAway', 'winner', 'score', 'team')
+TEAM_FIELDS = ('id', 'displayName', 'shortDisplayName', 'abbreviation', 'location', 'name')
+
+
+if orjson is not None:
+    loads = orjson.loads
+    dumps = orjson.dumps
+else:
+    def loads(body):
+        return json.loads(body)
+
+    def dumps(payload):
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def flat_plays(plays):
+    """Flatten the grouped play form (entries wrapping their plays in `items`)"""
+    plays = plays or []
+    if plays and isinstance(plays[0], dict) and 'items' in plays[0]:
+        return [play for group in plays for play in group.get('items', [])]
+    return plays
+
+
+_PLAY_FIELD_SET = frozenset(PLAY_FIELDS)
+
+_scan_value = json.JSONDecoder().scan_once
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _pick(source, fields):
+    return {field: source[field] for field in fields if field in source}
+
+
+def _play(play):
+    # The nested period / clock / team / type objects are a few keys each and
+    # kept as they are; the participant list is cut to the first entry, the
+    # only one ever read
+    kept = {key: value for key, value in play.items() if key in _PLAY_FIELD_SET}
+
+    participants = kept.get('participants')
+    if participants:
+        athlete = (participants[0] or {}).get('athlete') or {}
+        kept['participants'] = [{'athlete': {'displayName': athlete.get('displayName', '')}}]
+    return kept
+
+
+def _competitor(competitor):
+    kept = _pick(competitor, COMPETITOR_FIELDS)
+    if isinstance(kept.get('team'), dict):
+        kept['team'] = _pick(kept['team'], TEAM_FIELDS)
+    return kept
+
+
+def _competition(competition):
+    kept = _pick(competition, COMPETITION_FIELDS)
+    kept['competitors'] = [_competitor(c) for c in kept.get('competitors') or []]
+    return kept
+
+
+def select_summary(summary):
+    """
+    Selective form of a decoded summary payload
+
+    Returns:
+        {'header': {'id', 'competitions'}, 'plays': [...]} with plays flattened
+        and trimmed to PLAY_FIELDS (works on an already-selective summary too)
+    """
+    header = summary.get('header') or {}
+    selected_header = {'competitions': [_competition(c) for c in header.get('competitions') or []]}
+    if 'id' in header:
+        selected_header['id'] = header['id']
+    return {
+        'header': selected_header,
+        'plays': [_play(play) for play in flat_plays(summary.get('plays'))],
+    }
+
+
+def _skip_ws(text, idx):
+    return _WHITESPACE.match(text, idx).end()
+
+
+def _value(text, idx):
+    try:
+        return _scan_value(text, idx)
+    except StopIteration as e:
+        raise json.JSONDecodeError("Expecting value", text, e.value) from None
+
+
+def _expect(text, idx, chars):
+    if text[idx:idx + 1] not in chars:
+        raise json.JSONDecodeError(f"Expecting one of {chars!r}", text, idx)
+    return text[idx]
+
+
+def _select_plays(text, idx, plays):
+    """Append the trimmed plays of the array at idx; returns the index past it"""
+    if text[idx:idx + 1] != '[':
+        value, idx = _value(text, idx)
+        plays.extend(_play(play) for play in flat_plays(value) if isinstance(play, dict))
+        return idx
+
+    idx = _skip_ws(text, idx + 1)
+    if text[idx:idx + 1] == ']':
+        return idx + 1
+    while True:
+        play, idx = _value(text, idx)
+        if isinstance(play, dict):
+            if 'items' in play:  # grouped form
+                plays.extend(_play(item) for item in play.get('items') or [] if isinstance(item, dict))
+            else:
+                plays.append(_play(play))
+        idx = _skip_ws(text, idx)
+        if _expect(text, idx, ',]') == ']':
+            return idx + 1
+        idx = _skip_ws(text, idx + 1)
+
+
+def _select_members(text):
+    """(selective summary, characters of the kept members) for a summary document"""
+    header, plays, kept = {}, [], 0
+
+    idx = _skip_ws(text, 0)
+    _expect(text, idx, '{')
+    idx = _skip_ws(text, idx + 1)
+    if text[idx:idx + 1] == '}':
+        return select_summary({}), 0
+
+    while True:
+        _expect(text, idx, '"')
+        key, idx = scanstring(text, idx + 1)
+        idx = _skip_ws(text, idx)
+        _expect(text, idx, ':')
+        start = idx = _skip_ws(text, idx + 1)
+
+        if key == 'plays':
+            idx = _select_plays(text, idx, plays)
+            kept += idx - start
+        else:
+            value, idx = _value(text, idx)
+            if key == 'header':
+                header = value
+                kept += idx - start
+            del value  # anything else is dropped before the next member is decoded
+
+        idx = _skip_ws(text, idx)
+        if _expect(text, idx, ',}') == '}':
+            break
+        idx = _skip_ws(text, idx + 1)
+
+    summary = select_summary({'header': header})
+    summary['plays'] = plays
+    return summary, kept
+
+
+def decode_summary(body):
+    """
+    Decode a summary response body straight into its selective form
+
+    Raises:
+        ValueError: body is not valid JSON
+    """
+    with METRICS.time('decode'):
+        text = body.decode('utf-8') if isinstance(body, (bytes, bytearray)) else body
+        summary, kept = _select_members(text)
+    METRICS.count('summary_bytes_decoded', len(body))
+    METRICS.count('summary_bytes_kept', kept)
+    return summary
@@ -0,0 +1,253 @@
+"""
+Persistent work queue for resumable backfills
+SQLite file of (league, date) scoreboard items and (league, game_id, stage)
+game items, each with a status, attempt count and last error
+
+Items are claimed atomically (BEGIN IMMEDIATE), so several worker processes
+can drain the same queue file without doing the same item twice. A claim is
+a lease: if its worker dies, the item becomes claimable again once the lease
+expires. Enqueueing is idempotent, so re-running a backfill only adds the
+items that are not already queued and picks up where it stopped.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.queue', 'backfill.sqlite3')
+
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 60  # seconds, multiplied by the attempt count
+
+KIND_DATE = 'date'
+KIND_GAME = 'game'
+
+STAGE_SCOREBOARD = 'scoreboard'
+STAGE_INGEST = 'ingest'
+
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    league TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    season TEXT,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    claimed_by TEXT,
+    claimed_at REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, league, item_key, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_claim ON work_items (kind, status, item_key);
+"""
+
+
+def worker_name():
+    """Identifier recorded on claimed items (host:pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkItem:
+    """One claimed queue item"""
+
+    __slots__ = ('id', 'kind', 'league', 'key', 'stage', 'season', 'payload', 'attempts')
+
+    def __init__(self, id, kind, league, key, stage, season, payload, attempts):
+        self.id = id
+        self.kind = kind
+        self.league = league
+        self.key = key
+        self.stage = stage
+        self.season = season
+        self.payload = json.loads(payload) if payload else None
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """SQLite-backed work queue shared by backfill worker processes"""
+
+    def __init__(self, path=None, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 retry_delay=DEFAULT_RETRY_DELAY, worker=None):
+        """
+        Args:
+            path: SQLite file (created if missing)
+            lease_seconds: How long a claim is held before another worker may take it
+            max_attempts: Failures after which an item is parked as 'failed'
+            retry_delay: Seconds a failed item waits before it can be claimed
+                again, times its attempt count
+            worker: Name recorded on claims (default: host:pid)
+        """
+        self.path = os.path.abspath(path or DEFAULT_QUEUE_PATH)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.worker = worker or worker_name()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly where needed
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(_SCHEMA)
+
+    def _enqueue(self, rows):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.executemany("""
+                INSERT OR IGNORE INTO work_items (kind, league, item_key, stage, season, payload, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, ((kind, league, key, stage, season, payload, now) for kind, league, key, stage, season, payload in rows))
+            added = cursor.rowcount
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def enqueue_dates(self, league, dates):
+        """
+        Queue scoreboard dates
+
+        Args:
+            league: ESPN league path
+            dates: Iterable of (date, season_label)
+
+        Returns:
+            Number of items added (already queued dates are left as they are)
+        """
+        return self._enqueue(
+            (KIND_DATE, league, date.strftime('%Y-%m-%d'), STAGE_SCOREBOARD, season, None)
+            for date, season in dates
+        )
+
+    def enqueue_games(self, league, games, stage=STAGE_INGEST):
+        """
+        Queue games for a stage
+
+        Args:
+            league: ESPN league path
+            games: Iterable of (game_id, season_label, payload) where payload
+                is any JSON-serializable value (e.g. the scoreboard event)
+            stage: Pipeline stage name
+
+        Returns:
+            Number of items added
+        """
+        return self._enqueue(
+            (KIND_GAME, league, str(game_id), stage, season, json.dumps(payload, separators=(',', ':')))
+            for game_id, season, payload in games
+        )
+
+    def claim(self, kind, limit=1, stage=None):
+        """
+        Atomically claim up to `limit` pending (or lease-expired) items
+
+        Items are handed out in key order (dates chronologically). Failed
+        items waiting out their retry delay are not claimable yet.
+
+        Returns:
+            List of WorkItem
+        """
+        now = time.time()
+        stage_filter = "AND stage = ?" if stage else ""
+        params = [kind, now, now - self.lease_seconds] + ([stage] if stage else []) + [limit]
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(f"""
+                SELECT id, kind, league, item_key, stage, season, payload, attempts
+                FROM work_items
+                WHERE kind = ?
+                  AND ((status = 'pending' AND available_at <= ?) OR (status = 'claimed' AND claimed_at < ?))
+                  {stage_filter}
+                ORDER BY item_key
+                LIMIT ?
+            """, params).fetchall()
+            self.conn.executemany(
+                "UPDATE work_items SET status = 'claimed', claimed_by = ?, claimed_at = ?, updated_at = ? WHERE id = ?",
+                ((self.worker, now, now, row[0]) for row in rows)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [WorkItem(*row) for row in rows]
+
+    def complete(self, items):
+        """Mark claimed items done"""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE work_items SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?",
+            ((now, item.id, self.worker) for item in items)
+        )
+
+    def fail(self, item, error):
+        """
+        Record a failed attempt
+
+        The item goes back to pending, claimable again after retry_delay x
+        attempts seconds, until it has failed max_attempts times; then it is
+        parked as 'failed'.
+        """
+        now = time.time()
+        attempts = item.attempts + 1
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        self.conn.execute("""
+            UPDATE work_items
+            SET status = ?, attempts = ?, last_error = ?, claimed_by = NULL, claimed_at = NULL,
+                available_at = ?, updated_at = ?
+            WHERE id = ? AND claimed_by = ?
+        """, (status, attempts, str(error)[:1000], now + self.retry_delay * attempts, now, item.id, self.worker))
+
+    def release(self, items):
+        """Return claimed items to pending without counting an attempt (e.g. on Ctrl-C)"""
+        self.conn.executemany(
+            "UPDATE work_items SET status = 'pending', claimed_by = NULL, claimed_at = NULL, updated_at = ? "
+            "WHERE id = ? AND claimed_by = ? AND status = 'claimed'",
+            ((time.time(), item.id, self.worker) for item in items)
+        )
+
+    def retry_failed(self):
+        """Move parked failures back to pending with a fresh attempt budget"""
+        cursor = self.conn.execute(
+            "UPDATE work_items SET status = 'pending', attempts = 0, available_at = 0, updated_at = ? "
+            "WHERE status = 'failed'",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def waiting(self):
+        """Pending items still inside their retry delay"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM work_items WHERE status = 'pending' AND available_at > ?", (time.time(),)
+        ).fetchone()
+        return row[0]
+
+    def counts(self):
+        """{(kind, status): count} over the whole queue"""
+        rows = self.conn.execute("SELECT kind, status, COUNT(*) FROM work_items GROUP BY kind, status")
+        return {(kind, status): count for kind, status, count in rows}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
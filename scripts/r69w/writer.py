@@ -0,0 +1,479 @@
+"""
+Database writers for ingestion
+Game, R69 event and race-to-N event upserts, plus bulk COPY-based loading of
+play-by-play rows into pbp_events
+
+Game and R69 event writes keep the teams aggregates current (see
+r69w.aggregates), and PBP loads keep games.pbp_count current so games still
+missing play-by-play are found with an index lookup.
+"""
+
+import io
+import time
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from r69w.aggregates import apply_final_game, apply_r69_event, retract_r69_events
+from r69w.clock import period_lengths
+from r69w.detector import r69_outcome
+from r69w.metrics import METRICS
+
+# Column order for pbp_events rows produced by the fetchers
+PBP_COLUMNS = (
+    'game_id', 'sequence_number', 'period', 'clock_seconds', 'elapsed_seconds',
+    'team_id', 'player_name', 'event_type', 'points_scored',
+    'home_score', 'away_score', 'description'
+)
+
+_STAGE_TABLE = 'pbp_events_stage'
+
+_COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def _copy_value(value):
+    """Format one value for COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def _ensure_stage_table(cursor):
+    """Create the session-local staging table (no-op if it already exists)"""
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} (
+            game_id TEXT,
+            sequence_number INTEGER,
+            period INTEGER,
+            clock_seconds INTEGER,
+            elapsed_seconds INTEGER,
+            team_id TEXT,
+            player_name TEXT,
+            event_type TEXT,
+            points_scored INTEGER,
+            home_score INTEGER,
+            away_score INTEGER,
+            description TEXT
+        )
+    """)
+
+
+def encode_copy_rows(rows):
+    """Encode row tuples as a COPY text-format block"""
+    return ''.join('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows)
+
+
+def bulk_load_pbp_events(cursor, rows=(), blocks=()):
+    """
+    Stream pbp_events rows through COPY into a staging table and merge them
+
+    Existing (game_id, sequence_number) pairs are left untouched, matching
+    the previous per-row ON CONFLICT DO NOTHING behaviour. Each game's
+    pbp_count is raised by the rows actually inserted for it.
+
+    Args:
+        cursor: psycopg2 cursor (caller owns the transaction)
+        rows: Iterable of pbp_events row tuples in PBP_COLUMNS order
+        blocks: Iterable of (game_db_id, copy_block) pairs, where copy_block
+            is COPY text for that game's rows without the game_id column
+            (see r69w.parser.parse_plays_to_copy_block)
+
+    Returns:
+        Tuple of (rows_inserted, rows_staged, elapsed_seconds)
+    """
+    start = time.perf_counter()
+
+    buffer = io.StringIO()
+    staged = 0
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(v) for v in row))
+        buffer.write('\n')
+        staged += 1
+
+    for game_db_id, block in blocks:
+        # Split on '\n' only: COPY escaping guarantees it is the row terminator
+        prefix = f"{_copy_value(game_db_id)}\t"
+        for line in block.split('\n')[:-1]:
+            buffer.write(prefix)
+            buffer.write(line)
+            buffer.write('\n')
+            staged += 1
+
+    if staged == 0:
+        return 0, 0, 0.0
+
+    buffer.seek(0)
+    columns = ', '.join(PBP_COLUMNS)
+
+    _ensure_stage_table(cursor)
+    cursor.execute(f"TRUNCATE {_STAGE_TABLE}")
+    cursor.copy_expert(f"COPY {_STAGE_TABLE} ({columns}) FROM STDIN", buffer)
+
+    cursor.execute(f"""
+        WITH inserted AS (
+            INSERT INTO pbp_events (id, {columns}, created_at)
+            SELECT gen_random_uuid(), {columns}, NOW()
+            FROM {_STAGE_TABLE}
+            ON CONFLICT (game_id, sequence_number) DO NOTHING
+            RETURNING game_id
+        ),
+        per_game AS (
+            SELECT game_id, COUNT(*) AS n FROM inserted GROUP BY game_id
+        ),
+        marked AS (
+            UPDATE games g SET pbp_count = g.pbp_count + p.n
+            FROM per_game p
+            WHERE g.id = p.game_id
+            RETURNING p.n
+        )
+        SELECT COALESCE(SUM(n), 0)::bigint FROM marked
+    """)
+    inserted = cursor.fetchone()[0]
+    elapsed = time.perf_counter() - start
+
+    METRICS.observe('db_write', elapsed)
+    METRICS.count('plays', inserted)
+    return inserted, staged, elapsed
+
+
+def refresh_pbp_counts(cursor):
+    """
+    Recompute games.pbp_count from pbp_events in one GROUP BY pass
+
+    Seeds the column after it is added and repairs it if rows were ever
+    loaded outside bulk_load_pbp_events.
+
+    Returns:
+        Number of games whose count changed
+    """
+    cursor.execute("""
+        UPDATE games g
+        SET pbp_count = COALESCE(c.n, 0)
+        FROM games g2
+        LEFT JOIN (SELECT game_id, COUNT(*) AS n FROM pbp_events GROUP BY game_id) c ON c.game_id = g2.id
+        WHERE g.id = g2.id AND g.pbp_count IS DISTINCT FROM COALESCE(c.n, 0)
+    """)
+    return cursor.rowcount
+
+
+# ESPN status names -> games.game_status enum values
+GAME_STATUS_MAP = {
+    'STATUS_SCHEDULED': 'scheduled',
+    'STATUS_IN_PROGRESS': 'in_progress',
+    'STATUS_HALFTIME': 'in_progress',
+    'STATUS_END_PERIOD': 'in_progress',
+    'STATUS_FINAL': 'final',
+    'STATUS_POSTPONED': 'postponed',
+    'STATUS_CANCELED': 'canceled'
+}
+
+
+def season_label_for_date(game_date):
+    """Season label (e.g. '2024-25') for a game date"""
+    year = game_date.year
+    # Basketball seasons run Nov-Apr, so if month is Jan-Apr, season started last year
+    if game_date.month <= 4:
+        return f"{year - 1}-{str(year)[2:]}"
+    # May-Dec: upcoming season (Nov onwards) or off-season
+    return f"{year}-{str(year + 1)[2:]}"
+
+
+def event_game_date(event):
+    """Game date of a scoreboard event"""
+    return datetime.strptime(event.get('date', ''), '%Y-%m-%dT%H:%M%SZ').date()
+
+
+def season_label_for_event(event):
+    """Season label (e.g. '2024-25') for a scoreboard event, based on its date"""
+    return season_label_for_date(event_game_date(event))
+
+
+def competitor_score(competitor):
+    """Integer score of a competitor (scoreboards use strings, schedules use {'value': ...})"""
+    score = competitor.get('score', 0)
+    if isinstance(score, dict):
+        score = score.get('value', 0)
+    return int(float(score or 0))
+
+
+def event_competitors(event):
+    """(home, away) competitor dicts for a scoreboard or schedule event"""
+    competitors = event.get('competitions', [{}])[0].get('competitors', [])
+    home_team = next((c for c in competitors if c.get('homeAway') == 'home'), {})
+    away_team = next((c for c in competitors if c.get('homeAway') == 'away'), {})
+    return home_team, away_team
+
+
+def game_row_from_event(event, season=None, league='mens', game_type='regular'):
+    """
+    Build a games row dict from a scoreboard event
+
+    Args:
+        event: ESPN scoreboard event
+        season: Season label, or None to derive it from the game date
+        league: games.league value ('mens' or 'womens')
+        game_type: games.game_type value
+    """
+    competition = event.get('competitions', [{}])[0]
+    home_team, away_team = event_competitors(event)
+    home_info = home_team.get('team', {})
+    away_info = away_team.get('team', {})
+    home_score = competitor_score(home_team)
+    away_score = competitor_score(away_team)
+
+    return {
+        'game_id': event.get('id'),
+        'game_date': event_game_date(event),
+        'season': season or season_label_for_event(event),
+        'league': league,
+        'home_team_id': home_info.get('id', ''),
+        'away_team_id': away_info.get('id', ''),
+        'home_team_name': home_info.get('displayName', 'Home'),
+        'away_team_name': away_info.get('displayName', 'Away'),
+        'home_conference': home_info.get('conferenceId'),
+        'away_conference': away_info.get('conferenceId'),
+        'home_team_logo': home_info.get('logo'),
+        'away_team_logo': away_info.get('logo'),
+        'venue': competition.get('venue', {}).get('fullName'),
+        'game_type': game_type,
+        'home_score': home_score,
+        'away_score': away_score,
+        'final_margin': home_score - away_score,
+        'game_status': GAME_STATUS_MAP.get(event.get('status', {}).get('type', {}).get('name'), 'scheduled'),
+        'total_periods': period_lengths(league).periods,
+        'overtime_flag': False
+    }
+
+
+@METRICS.timed('db_write')
+def upsert_game(cursor, game):
+    """
+    Insert or update a games row
+
+    When the row becomes final (new final game, or a live game finishing),
+    its result is added to the teams aggregates.
+
+    Args:
+        cursor: Database cursor
+        game: Row dict (see game_row_from_event)
+
+    Returns:
+        Database game ID, or None on failure
+    """
+    try:
+        cursor.execute("""
+            WITH previous AS (
+                SELECT game_status FROM games WHERE game_id = %s
+            )
+            INSERT INTO games (
+                id, game_id, game_date, season, league,
+                home_team_id, away_team_id, home_team_name, away_team_name,
+                home_conference, away_conference, home_team_logo, away_team_logo,
+                venue, game_type,
+                home_score, away_score, final_margin,
+                game_status, total_periods, overtime_flag,
+                created_at, updated_at
+            ) VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+            ON CONFLICT (game_id) DO UPDATE SET
+                home_score = EXCLUDED.home_score,
+                away_score = EXCLUDED.away_score,
+                final_margin = EXCLUDED.final_margin,
+                game_status = EXCLUDED.game_status,
+                total_periods = EXCLUDED.total_periods,
+                overtime_flag = EXCLUDED.overtime_flag,
+                home_team_logo = EXCLUDED.home_team_logo,
+                away_team_logo = EXCLUDED.away_team_logo,
+                updated_at = NOW()
+            RETURNING id, (SELECT game_status FROM previous)
+        """, (
+            game['game_id'],
+            game['game_id'],
+            game['game_date'],
+            game['season'],
+            game.get('league', 'mens'),
+            game['home_team_id'],
+            game['away_team_id'],
+            game['home_team_name'],
+            game['away_team_name'],
+            game.get('home_conference'),
+            game.get('away_conference'),
+            game.get('home_team_logo'),
+            game.get('away_team_logo'),
+            game.get('venue'),
+            game.get('game_type', 'regular'),
+            game['home_score'],
+            game['away_score'],
+            game['final_margin'],
+            game['game_status'],
+            game.get('total_periods', 2),
+            game.get('overtime_flag', False)
+        ))
+
+        result = cursor.fetchone()
+        if not result:
+            return None
+
+        game_db_id, previous_status = result
+        if game['game_status'] == 'final' and previous_status != 'final':
+            apply_final_game(cursor, game_db_id)
+        METRICS.count('games')
+        return game_db_id
+
+    except Exception as e:
+        print(f"    Error inserting game: {e}")
+        return None
+
+
+def insert_game(cursor, event, season=None, league='mens'):
+    """Insert a scoreboard event into games (see upsert_game)"""
+    try:
+        game = game_row_from_event(event, season, league)
+    except Exception as e:
+        print(f"    Error inserting game: {e}")
+        return None
+    return upsert_game(cursor, game)
+
+
+@METRICS.timed('db_write')
+def insert_r69_event(cursor, game_db_id, r69_data, final_home_score, final_away_score):
+    """
+    Insert R69 event into database
+
+    Args:
+        cursor: Database cursor
+        game_db_id: games.id of the game
+        r69_data: Detected event (see r69w.detector.detect_r69_event) plus team_name
+        final_home_score: Final home score
+        final_away_score: Final away score
+
+    Returns:
+        True if a row was inserted; False if the game already has its R69
+        event (teams aggregates are left untouched) or the insert failed
+    """
+    try:
+        # Determine if this was an R69W (won after hitting 69 first)
+        r69w, final_margin = r69_outcome(r69_data, final_home_score, final_away_score)
+
+        cursor.execute("""
+            INSERT INTO r69_events (
+                id, game_id, team_id, team_name,
+                t_to_69, period_at_69, margin_at_69,
+                score_at_69_team, score_at_69_opponent,
+                r69w, final_margin, play_description,
+                created_at
+            ) VALUES (
+                gen_random_uuid(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW()
+            )
+            ON CONFLICT (game_id) DO NOTHING
+            RETURNING id
+        """, (
+            game_db_id,
+            r69_data['team_id'],
+            r69_data['team_name'],
+            r69_data['t_to_69'],
+            r69_data['period'],
+            r69_data['margin_at_69'],
+            69,
+            r69_data['opponent_score'],
+            r69w,
+            final_margin,
+            r69_data.get('description', '')
+        ))
+        result = cursor.fetchone()
+        if not result:
+            # Already recorded: the game's event was counted when it was inserted
+            return False
+
+        # Counted now if the game is already final, otherwise when it goes final
+        apply_r69_event(cursor, game_db_id, result[0])
+        return True
+    except Exception as e:
+        print(f"      Error inserting R69 event: {e}")
+        return False
+
+
+# Column order for race_events rows produced by race_event_rows
+RACE_COLUMNS = (
+    'game_id', 'threshold', 'team_id', 'team_is_home', 't_to_n', 'period', 'margin', 'opponent_score', 'won'
+)
+
+
+def race_event_rows(game_db_id, race_events, final_home_score, final_away_score):
+    """
+    race_events row tuples (RACE_COLUMNS order) for one final game
+
+    Args:
+        race_events: Dict of threshold -> event (see r69w.detector.detect_race_events)
+    """
+    rows = []
+    for threshold, event in sorted(race_events.items()):
+        won, _ = r69_outcome(event, final_home_score, final_away_score)
+        rows.append((
+            game_db_id, threshold, event['team_id'], event['team_is_home'], event['t_to_69'],
+            event['period'], event['margin_at_69'], event['opponent_score'], won
+        ))
+    return rows
+
+
+@METRICS.timed('db_write')
+def upsert_race_events(cursor, rows):
+    """
+    Bulk upsert race_events rows (one statement per call)
+
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+
+    columns = ', '.join(RACE_COLUMNS)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in RACE_COLUMNS[2:])
+    execute_values(cursor, f"""
+        INSERT INTO race_events ({columns})
+        VALUES %s
+        ON CONFLICT (game_id, threshold) DO UPDATE SET {updates}
+    """, rows, page_size=max(len(rows), 1))
+    return len(rows)
+
+
+def delete_r69_events(cursor, game_db_id):
+    """
+    Delete a game's R69 events, removing them from the teams aggregates first
+
+    Returns:
+        Number of R69 events deleted
+    """
+    retract_r69_events(cursor, game_db_id)
+    cursor.execute("DELETE FROM r69_events WHERE game_id = %s", (game_db_id,))
+    return cursor.rowcount
+
+
+def finalize_r69_events(cursor, game_db_id):
+    """
+    Recompute r69w and final_margin for a game's R69 events from its stored final score
+
+    R69 events recorded while a game is live carry the score at the time of
+    insert; this settles them once the game row has been updated to final.
+
+    Returns:
+        Number of R69 events updated
+    """
+    cursor.execute("""
+        UPDATE r69_events e
+        SET r69w = CASE WHEN e.team_id = g.home_team_id
+                        THEN g.home_score > g.away_score
+                        ELSE g.away_score > g.home_score END,
+            final_margin = CASE WHEN e.team_id = g.home_team_id
+                                THEN g.home_score - g.away_score
+                                ELSE g.away_score - g.home_score END
+        FROM games g
+        WHERE g.id = e.game_id AND e.game_id = %s
+    """, (game_db_id,))
+    return cursor.rowcount
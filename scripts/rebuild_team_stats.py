@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rebuild Team Aggregates
+Recomputes the teams table (games played, R69 wins/losses, average time to
+69 and margin at 69 per team and season) from games and r69_events
+
+Ingestion keeps these aggregates current incrementally; run this once to
+seed the table, after bulk deletes (e.g. remove_old_seasons.py) or if a
+final score was corrected after the fact.
+
+Usage:
+    python rebuild_team_stats.py
+    python rebuild_team_stats.py --season 2024-25 --season 2023-24
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from r69w.aggregates import rebuild_team_aggregates
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild teams aggregates from games and r69_events")
+    parser.add_argument('--season', action='append', default=[],
+                        help="Season label to rebuild, e.g. 2024-25 (repeatable, default: all)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("\n" + "=" * 80)
+    print("🏀 REBUILD TEAM AGGREGATES")
+    print("=" * 80)
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        print("\n✅ Connected to database")
+    except Exception as e:
+        print(f"\n❌ Database connection failed: {e}")
+        return
+
+    scope = ', '.join(args.season) if args.season else 'all seasons'
+    print(f"Rebuilding: {scope}")
+
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        rows = rebuild_team_aggregates(cursor, args.season)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Rebuild failed: {e}")
+        return
+    finally:
+        cursor.close()
+        conn.close()
+
+    print(f"\n✅ {rows} team-season rows written in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
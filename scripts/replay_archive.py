@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+R69W Offline Replay
+Rebuilds games, play-by-play and R69 events from archived raw ESPN payloads
+
+Archives are written by `fetch_historical_data.py --archive-dir DIR` (one
+compressed JSONL file per league and season). Replay runs the same
+insert_game -> PBP bulk load -> detect_race_events -> insert_r69_event path
+with no network access, so recomputing R69 after an algorithm fix is
+bounded by local CPU and database speed.
+
+JSON decoding, play parsing and R69 detection run in a process pool
+(--workers, default: all cores); the main process only writes to the
+database.
+
+Usage:
+    python replay_archive.py --season 2023-24 --recompute-r69
+    python replay_archive.py --all --archive-dir /data/r69w-archive --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from functools import partial
+
+import psycopg2
+from dotenv import load_dotenv
+
+from fetch_historical_data import count_game, event_team_ids, load_pbp_batch, write_game
+from r69w.archive import PayloadArchive
+from r69w.batch_writer import BatchWriter
+from r69w.client import MENS_LEAGUE, extract_plays, league_path
+from r69w.clock import period_lengths
+from r69w.detector import R69_TARGET, detect_race_events
+from r69w.parser import ParallelParser, parse_plays_to_copy_block
+
+# Fix Windows console encoding for Unicode characters
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout.reconfigure(line_buffering=True)
+
+# Load environment variables
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env.local'))
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay archived ESPN payloads into the database")
+    parser.add_argument('--season', action='append', default=[],
+                        help="Season label to replay, e.g. 2023-24 (repeatable)")
+    parser.add_argument('--all', action='store_true', help="Replay every archived season")
+    parser.add_argument('--league', default=MENS_LEAGUE, type=league_path,
+                        help="mens, womens or an ESPN league path (default: men's)")
+    parser.add_argument('--archive-dir', default=None, help="Archive directory (default: scripts/.archive)")
+    parser.add_argument('--recompute-r69', action='store_true',
+                        help="Delete and re-detect existing R69 events for replayed games")
+    parser.add_argument('--batch-size', type=int, default=200, help="Games per commit (default: 200)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parser processes (default: CPU count, 1 = no pool)")
+    return parser.parse_args()
+
+
+def parse_archive_line(line, league=MENS_LEAGUE):
+    """
+    Parser worker: decode one archive line into a compact game result
+
+    `league` (the archive's league path) picks the game's period lengths.
+
+    Returns:
+        (event, race_events, copy_block, row_count), or None for a bad line
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+
+    event = record.get('event') or {}
+    plays = extract_plays(record.get('summary'))
+
+    if not plays:
+        return event, {}, '', 0
+
+    lengths = period_lengths(league)
+    home_team_id, away_team_id = event_team_ids(event)
+    race_events = detect_race_events(plays, home_team_id, away_team_id, lengths=lengths)
+    copy_block, row_count = parse_plays_to_copy_block(plays, lengths)
+
+    # Only the compact result crosses back to the writer process
+    return event, race_events, copy_block, row_count
+
+
+def replay_season(conn, archive, parser, league, season, args, stats):
+    """Replay one archived season, committing every --batch-size games (savepoint per game)"""
+    writer = BatchWriter(
+        conn, max_games=args.batch_size, max_seconds=None,
+        load_pbp=lambda cursor, rows, blocks: load_pbp_batch(cursor, rows, stats, blocks=blocks)
+    )
+
+    parse_line = partial(parse_archive_line, league=league)
+    for parsed in parser.imap(parse_line, archive.iter_lines(league, season)):
+        if parsed is None:
+            stats['errors'] += 1
+            continue
+
+        event, race_events, copy_block, row_count = parsed
+
+        outcome = {}
+        try:
+            with writer.game() as pending:
+                db_game_id = write_game(writer.cursor, event, race_events.get(R69_TARGET), season, outcome,
+                                        replace_r69=args.recompute_r69, league=league, race_events=race_events)
+                if db_game_id and row_count:
+                    pending.blocks.append((db_game_id, copy_block))
+        except Exception as e:
+            print(f"    ❌ Error replaying game {event.get('id')}: {e}")
+            stats['errors'] += 1
+            continue
+
+        if db_game_id and not pending.written:
+            print(f"    ❌ Rolled back game {event.get('id')} after a write error")
+            stats['errors'] += 1
+        elif db_game_id:
+            count_game(stats, outcome)
+
+        writer.maybe_flush()
+
+    writer.flush()
+    writer.close()
+
+
+def main():
+    args = parse_args()
+
+    print("\n" + "=" * 80)
+    print("🏀 R69W OFFLINE REPLAY")
+    print("=" * 80)
+
+    archive = PayloadArchive(args.archive_dir)
+    seasons = archive.seasons(args.league) if args.all else args.season
+
+    if not seasons:
+        print(f"\n❌ No seasons selected (archived: {', '.join(archive.seasons(args.league)) or 'none'})")
+        return
+
+    if not DATABASE_URL:
+        print("❌ DATABASE_URL not found in environment")
+        sys.exit(1)
+
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        print("\n✅ Connected to database")
+    except Exception as e:
+        print(f"\n❌ Database connection failed: {e}")
+        return
+
+    stats = {'games': 0, 'cached': 0, 'r69_events': 0, 'r69w': 0, 'errors': 0,
+             'pbp_rows': 0, 'pbp_seconds': 0.0}
+    start = time.perf_counter()
+
+    with ParallelParser(workers=args.workers) as parser:
+        print(f"Parser workers: {parser.workers}")
+
+        for season in seasons:
+            print(f"\n{'='*60}")
+            print(f"SEASON: {season} ({archive.path(args.league, season)})")
+            print(f"{'='*60}")
+            replay_season(conn, archive, parser, args.league, season, args, stats)
+
+    conn.close()
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "=" * 80)
+    print("📊 SUMMARY")
+    print("=" * 80)
+    print(f"Games replayed: {stats['games']}")
+    print(f"R69 events inserted: {stats['r69_events']}")
+    print(f"R69W: {stats['r69w']}")
+    print(f"PBP events loaded: {stats['pbp_rows']}")
+    print(f"Errors: {stats['errors']}")
+    if elapsed > 0:
+        print(f"Elapsed: {elapsed:.1f}s ({stats['games'] / elapsed:.1f} games/sec)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user")
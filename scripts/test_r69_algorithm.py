@@ -3,51 +3,30 @@
 """
 Test script to verify R69 detection algorithm handles edge cases correctly.
 
-This script tests the corrected R69 detection algorithm against various scenarios,
-including the edge case where a team reaches 69 first without previously leading.
+This script tests the shared R69 detection algorithm (r69w.detector) against
+various scenarios, including the edge case where a team reaches 69 first without
+previously leading.
 """
 import sys
 import io
 
+from r69w.analytics import SIDE_AWAY, SIDE_HOME, SIDE_NONE, compute_analytics
+from r69w.client import League
+from r69w.clock import HALVES, QUARTERS, calculate_elapsed_time, convert_clock_to_seconds, period_lengths
+from r69w.columnar import (
+    detect_r69_columnar, detect_race_columnar, elapsed_by_game, elapsed_from_remaining, offsets_from_index,
+    r69_event_at
+)
+from r69w.detector import IncrementalR69Detector, detect_r69_event, detect_race_events
+from r69w.parser import parse_plays, pbp_rows
+from r69w.summary import decode_summary, dumps, select_summary
+from r69w.writer import insert_r69_event
+from data_ingestion import GameProcessor
+
 # Fix Windows console encoding issues
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def calculate_elapsed_time(period_num, clock_display):
-    """Calculate elapsed time in seconds (simplified)"""
-    return 1200  # Dummy value for testing
-
-def detect_r69_event(plays, home_team_id, away_team_id):
-    """Detect R69 event from play-by-play data - tracks first team to reach 69"""
-    home_hit_69 = False
-    away_hit_69 = False
-
-    for play in plays:
-        home_score = play.get('homeScore', 0)
-        away_score = play.get('awayScore', 0)
-
-        # Check if home team hit 69 first (regardless of whether leading)
-        if home_score >= 69 and not home_hit_69 and not away_hit_69:
-            home_hit_69 = True
-            return {
-                'team_id': home_team_id,
-                'team_is_home': True,
-                'margin_at_69': home_score - away_score,
-                'opponent_score': away_score,
-            }
-
-        # Check if away team hit 69 first (regardless of whether leading)
-        if away_score >= 69 and not away_hit_69 and not home_hit_69:
-            away_hit_69 = True
-            return {
-                'team_id': away_team_id,
-                'team_is_home': False,
-                'margin_at_69': away_score - home_score,
-                'opponent_score': home_score,
-            }
-
-    return None
-
 
 def test_case_1_leading():
     """Test Case 1: Team hits 69 while leading (should detect)"""
@@ -153,6 +132,322 @@ def test_case_7_jump_to_70():
     print("✅ Test Case 7 PASSED: Jump to 70 detected via >= operator")
 
 
+def test_case_8_time_and_period():
+    """Test Case 8: Elapsed time and period come from the play that reached 69"""
+    plays = [
+        {'homeScore': 66, 'awayScore': 60, 'period': {'number': 2}, 'clock': {'displayValue': '5:10'}},
+        {'homeScore': 69, 'awayScore': 60, 'period': {'number': 2}, 'clock': {'displayValue': '4:30'},
+         'text': 'Three Point Jumper'},
+    ]
+    result = detect_r69_event(plays, 'home_team', 'away_team')
+
+    assert result is not None, "Should detect R69 event"
+    assert result['period'] == 2, "Period should be 2"
+    assert result['t_to_69'] == 2130, "Elapsed time should be 35:30 (2130s)"
+    assert result['description'] == 'Three Point Jumper', "Description should come from the 69 play"
+    print("✅ Test Case 8 PASSED: Time to 69 computed from period and clock")
+
+
+def test_case_9_incremental_matches_batch():
+    """Test Case 9: Streaming detector fires once, on the poll that reaches 69"""
+    plays = [
+        {'sequenceNumber': '1', 'homeScore': 66, 'awayScore': 67},
+        {'sequenceNumber': '2', 'homeScore': 66, 'awayScore': 68},
+        {'sequenceNumber': '3', 'homeScore': 69, 'awayScore': 68},  # Home hits 69 first
+        {'sequenceNumber': '4', 'homeScore': 69, 'awayScore': 70},
+    ]
+    detector = IncrementalR69Detector('home_team', 'away_team')
+
+    # Each poll returns the full play list so far
+    assert detector.feed(plays[:2]) is None, "No R69 event before 69"
+    result = detector.feed(plays[:3])
+    assert result == detect_r69_event(plays, 'home_team', 'away_team'), "Should match batch detection"
+    assert detector.feed(plays) is None, "R69 event should only be emitted once"
+    assert detector.plays_seen == 4, "Already seen plays should be skipped"
+    assert detector.lead_changes == 2, "Away -> home -> away is two lead changes"
+    print("✅ Test Case 9 PASSED: Incremental detector matches batch detection")
+
+
+def test_case_10_batch_analytics():
+    """Test Case 10: Batch analytics match lib/analytics.ts for a comeback after 69"""
+    games = [
+        {'game_id': 'g1', 'home_score': 80, 'away_score': 75, 'final_margin': 5,
+         'r69': {'t_to_69': 2000, 'is_home': True, 'margin_at_69': 4, 'r69w': True}},
+        {'game_id': 'g2', 'home_score': 69, 'away_score': 60, 'final_margin': 9, 'r69': None},
+    ]
+    # (game, elapsed, home, away, possession side)
+    rows = [
+        (0, 1990, 67, 65, SIDE_HOME),
+        (0, 2000, 69, 65, SIDE_HOME),  # R69 moment
+        (0, 2100, 69, 70, SIDE_AWAY),  # Lost the lead (100s, not leading)
+        (0, 2200, 72, 70, SIDE_HOME),  # Regained it (100s, not leading before this play)
+        (0, 2400, 80, 75, SIDE_NONE),  # 200s leading
+        (1, 2400, 69, 60, SIDE_HOME),
+    ]
+    result = compute_analytics(games, *zip(*rows))
+
+    game_id, pace_index, lead_duration, swing_margin, comeback, nice, double_nice, home_poss, away_poss, pace = result[0]
+    assert pace_index == 0.9, "R69 pace index is 1800 / t_to_69"
+    assert lead_duration == 300, "Lead duration counts time up to each leading play after 69"
+    assert swing_margin == 1, "Swing margin is final margin minus margin at 69 for an R69W"
+    assert comeback, "Losing and regaining the lead after 69 is a comeback"
+    assert (home_poss, away_poss) == (3, 1), "Possessions count shot/turnover plays per team"
+    assert pace == 155.0, "Pace rating is points per 40 minutes"
+    assert result[1][1:] == (None, None, None, False, True, False, None, None, None), \
+        "Games without R69 only get nice score flags"
+    print("✅ Test Case 10 PASSED: Batch analytics computed from play-by-play arrays")
+
+
+def test_case_11_columnar_matches_batch():
+    """Test Case 11: Columnar detection over many games matches per-game detection"""
+    def play(home, away, period=2, clock='10:00'):
+        return {'homeScore': home, 'awayScore': away, 'period': {'number': period}, 'clock': {'displayValue': clock}}
+
+    games = [
+        [play(66, 67), play(66, 69, clock='4:12'), play(71, 69)],            # Away first while trailing earlier
+        [],                                                                   # No plays at all
+        [play(60, 58), play(68, 68, clock='0:01')],                           # Nobody reaches 69
+        [play(67, 67, 3, '1:00'), play(70, 69, 3, '0:05'), play(72, 69, 3)],  # Both on one play in OT: home
+        [play(69, 50, 1, '2:30'), play(80, 60)],
+    ]
+
+    game_index, home, away, period, remaining = [], [], [], [], []
+    for i, plays in enumerate(games):
+        for p in plays:
+            game_index.append(i)
+            home.append(p['homeScore'])
+            away.append(p['awayScore'])
+            period.append(p['period']['number'])
+            remaining.append(convert_clock_to_seconds(p['clock']['displayValue']))
+
+    elapsed = elapsed_from_remaining(period, remaining)
+    assert list(elapsed) == [calculate_elapsed_time(p['period']['number'], p['clock']['displayValue'])
+                             for plays in games for p in plays], "Elapsed time should match the clock helper"
+
+    columns = detect_r69_columnar(offsets_from_index(game_index, len(games)), home, away, elapsed, period)
+    for i, plays in enumerate(games):
+        expected = detect_r69_event(plays, 'home_team', 'away_team')
+        result = r69_event_at(columns, i, 'home_team', 'away_team')
+        if expected is not None:
+            expected['description'] = ''
+        assert result == expected, f"Game {i} should match detect_r69_event"
+    print("✅ Test Case 11 PASSED: Columnar detection matches per-game detection")
+
+
+def test_case_12_race_to_n():
+    """Test Case 12: One pass records the first team to each threshold"""
+    plays = [
+        {'homeScore': 18, 'awayScore': 20},  # Away to 20
+        {'homeScore': 41, 'awayScore': 38},  # Home to 40 (jumped past it)
+        {'homeScore': 60, 'awayScore': 60},  # Tie at 60: home wins the race
+        {'homeScore': 66, 'awayScore': 69},  # Away to 69
+        {'homeScore': 82, 'awayScore': 80},  # Home to 80
+    ]
+    races = detect_race_events(plays, 'home_team', 'away_team', thresholds=(20, 40, 60, 69, 80, 100))
+
+    assert sorted(races) == [20, 40, 60, 69, 80], "100 was never reached"
+    assert [races[n]['team_id'] for n in (20, 40, 60, 69, 80)] == \
+        ['away_team', 'home_team', 'home_team', 'away_team', 'home_team']
+    assert races[40]['margin_at_69'] == 3, "Margin is taken on the play reaching N"
+    r69 = dict(races[69])
+    del r69['threshold']
+    assert r69 == detect_r69_event(plays, 'home_team', 'away_team'), "Race to 69 should match R69 detection"
+
+    columns = detect_race_columnar([0, len(plays)], [p['homeScore'] for p in plays],
+                                   [p['awayScore'] for p in plays], [0] * len(plays), [1] * len(plays),
+                                   thresholds=(20, 40, 60, 69, 80, 100))
+    for n, expected in races.items():
+        result = r69_event_at(columns[n], 0, 'home_team', 'away_team')
+        assert (result['team_id'], result['margin_at_69']) == (expected['team_id'], expected['margin_at_69']), \
+            f"Columnar race to {n} should match"
+    assert r69_event_at(columns[100], 0, 'home_team', 'away_team') is None
+    print("✅ Test Case 12 PASSED: Race to N thresholds found in one pass")
+
+
+def test_case_13_play_records():
+    """Test Case 13: GameProcessor's Play records detect the same event as raw plays"""
+    plays = [
+        {'sequenceNumber': '1', 'homeScore': 60, 'awayScore': 66, 'scoreValue': 2, 'text': 'Away jumper',
+         'period': {'number': 2}, 'clock': {'displayValue': '6:10'}, 'team': {'id': 'away_team'}},
+        {'sequenceNumber': '2', 'homeScore': 60, 'awayScore': 69, 'scoreValue': 3, 'text': 'Away three',
+         'period': {'number': 2}, 'clock': {'displayValue': '5:42'}, 'team': {'id': 'away_team'}},
+    ]
+    summary = {
+        'plays': plays,
+        'header': {'competitions': [{'competitors': [
+            {'homeAway': 'home', 'id': 'home_team', 'team': {'displayName': 'Home U'}},
+            {'homeAway': 'away', 'id': 'away_team', 'team': {'displayName': 'Away State'}},
+        ]}]},
+    }
+
+    class StubClient:
+        league = League.MENS
+
+        def get_play_by_play(self, game_id):
+            return summary
+
+    records, event = GameProcessor(StubClient()).process_play_by_play('401')
+    expected = detect_r69_event(plays, 'home_team', 'away_team')
+
+    assert not hasattr(records[0], '__dict__'), "Play records should be slotted"
+    assert records[1].row('game') == ('game', 2, 2, 342, 2058, 'away_team', '', '', 3, 60, 69,
+                                      'Away three'), "row() should follow PBP_COLUMNS"
+    assert [r.row('game') for r in records] == pbp_rows('game', plays), "Same rows as the backfill parser"
+    assert (event.team_id, event.team_name, event.t_to_69, event.period_at_69, event.margin_at_69,
+            event.score_at_69_opponent, event.play_description) == \
+        (expected['team_id'], 'Away State', expected['t_to_69'], expected['period'], expected['margin_at_69'],
+         expected['opponent_score'], expected['description']), "Should match detect_r69_event"
+    print("✅ Test Case 13 PASSED: Play records match raw-play detection")
+
+
+def test_case_14_selective_summary():
+    """Test Case 14: A selectively decoded summary parses and detects like the full one"""
+    plays = [
+        {'sequenceNumber': str(i), 'homeScore': 2 * i, 'awayScore': 2 * i - 1, 'scoreValue': 2,
+         'text': 'Layup', 'type': {'id': '1', 'text': 'Layup'}, 'period': {'number': 2, 'displayValue': '2nd'},
+         'clock': {'displayValue': f'{19 - i % 19}:00'}, 'team': {'id': 'home_team'},
+         'participants': [{'athlete': {'displayName': 'Player'}}, {'athlete': {'displayName': 'Assist'}}],
+         'coordinate': {'x': 1, 'y': 2}, 'wallclock': '2025-01-01T00:00:00Z'}
+        for i in range(1, 40)
+    ]
+    full = {
+        'header': {'id': '401', 'competitions': [{'id': '401', 'status': {'type': {'completed': True}},
+                                                  'competitors': [{'id': 'home_team', 'homeAway': 'home'}],
+                                                  'broadcasts': [{'market': 'national'}]}]},
+        'plays': [{'items': plays[:20]}, {'items': plays[20:]}],  # grouped form
+        'boxscore': {'players': [{'statistics': list(range(500))}]},
+        'winprobability': [{'playId': p['sequenceNumber'], 'homeWinPercentage': 0.5} for p in plays],
+    }
+    body = dumps(full)
+    summary = decode_summary(body)
+
+    assert set(summary) == {'header', 'plays'}, "Only the header and plays should be kept"
+    assert summary == select_summary(full), "Member-by-member decode should match selecting from a full decode"
+    try:
+        decode_summary(body[:-20])
+        assert False, "A truncated body should not decode"
+    except ValueError:
+        pass
+    assert 'broadcasts' not in summary['header']['competitions'][0]
+    assert len(dumps(summary)) < len(body), "Selective form should be smaller"
+    assert parse_plays(summary['plays']) == parse_plays(plays), "PBP rows should be unchanged"
+    assert detect_r69_event(summary['plays'], 'home_team', 'away_team') == \
+        detect_r69_event(plays, 'home_team', 'away_team'), "R69 detection should be unchanged"
+    print("✅ Test Case 14 PASSED: Selective summary keeps everything ingestion reads")
+
+
+def test_case_15_clock_parser():
+    """Test Case 15: Table-backed clock parser handles tenths and period lengths"""
+    assert convert_clock_to_seconds('12:34') == 754
+    assert convert_clock_to_seconds('05:00') == 300
+    assert convert_clock_to_seconds('45.3') == 45, "Sub-minute tenths keep the whole seconds"
+    assert convert_clock_to_seconds('0:09.9') == 9
+    assert convert_clock_to_seconds('25:00') == 1500, "Off-table displays are parsed too"
+    assert convert_clock_to_seconds('') == 0 and convert_clock_to_seconds(None) == 0
+    assert convert_clock_to_seconds('--') == 0, "Unparseable displays count as 0:00"
+
+    assert calculate_elapsed_time(1, '20:00') == 0
+    assert calculate_elapsed_time(2, '0.0') == 2400, "End of regulation in halves"
+    assert calculate_elapsed_time(3, '10:00', QUARTERS) == 1200, "Third quarter starts at 20:00"
+    assert calculate_elapsed_time(4, '0.0', QUARTERS) == 2400, "End of regulation in quarters"
+
+    elapsed = elapsed_from_remaining([1, 2, 3], [600, 600, 0], QUARTERS)
+    assert list(elapsed) == [calculate_elapsed_time(p, c, QUARTERS)
+                             for p, c in ((1, '10:00'), (2, '10:00'), (3, '0.0'))]
+    print("✅ Test Case 15 PASSED: Clock parser covers tenths and period lengths")
+
+
+class RecordingCursor:
+    """
+    Stand-in for a psycopg2 cursor: r69_events unique on game_id, and each
+    teams aggregate delta statement recorded
+    """
+
+    def __init__(self):
+        self.r69_game_ids = set()
+        self.aggregate_deltas = []
+        self._result = None
+
+    def execute(self, sql, params=None):
+        self._result = None
+        if 'INSERT INTO r69_events' in sql:
+            assert 'ON CONFLICT (game_id) DO NOTHING' in sql
+            game_id = params[0]
+            if game_id not in self.r69_game_ids:
+                self.r69_game_ids.add(game_id)
+                self._result = (f"event-{game_id}",)
+        elif 'INSERT INTO teams' in sql:
+            self.aggregate_deltas.append(params)
+
+    def fetchone(self):
+        return self._result
+
+    @property
+    def rowcount(self):
+        return 1
+
+
+def test_case_16_r69_insert_idempotent():
+    """Test Case 16: Re-inserting a game's R69 event leaves the team aggregates alone"""
+    plays = [
+        {'homeScore': 67, 'awayScore': 60},
+        {'homeScore': 69, 'awayScore': 62},  # Home hits 69 first and goes on to win
+    ]
+    r69_event = dict(detect_r69_event(plays, 'home_team', 'away_team'), team_name='Home')
+    cursor = RecordingCursor()
+
+    assert insert_r69_event(cursor, 'game-1', r69_event, 80, 70) is True
+    assert len(cursor.aggregate_deltas) == 1, "First insert applies its aggregate delta"
+
+    assert insert_r69_event(cursor, 'game-1', r69_event, 80, 70) is False, "Second insert is a no-op"
+    assert len(cursor.aggregate_deltas) == 1, "Aggregates must not be counted twice"
+
+    assert insert_r69_event(cursor, 'game-2', r69_event, 80, 70) is True
+    assert len(cursor.aggregate_deltas) == 2
+    print("✅ Test Case 16 PASSED: Duplicate R69 inserts don't change the aggregates")
+
+
+def test_case_17_womens_quarters():
+    """Test Case 17: Women's games are timed in quarters on every detection path"""
+    plays = [
+        {'sequenceNumber': '1', 'homeScore': 66, 'awayScore': 60, 'period': {'number': 4},
+         'clock': {'displayValue': '5:30'}, 'team': {'id': 'home_team'}},
+        {'sequenceNumber': '2', 'homeScore': 69, 'awayScore': 60, 'period': {'number': 4},
+         'clock': {'displayValue': '5:00'}, 'team': {'id': 'home_team'}, 'text': 'Home three'},
+    ]
+    assert period_lengths(League.WOMENS) is QUARTERS
+    assert period_lengths('womens') is QUARTERS and period_lengths('womens-college-basketball') is QUARTERS
+    assert period_lengths(League.MENS) is HALVES and period_lengths(None) is HALVES
+
+    lengths = period_lengths('womens')
+    event = detect_r69_event(plays, 'home_team', 'away_team', lengths)
+    assert event['t_to_69'] == 2100, f"Q4 with 5:00 left is 35:00 elapsed, got {event['t_to_69']}"
+    assert detect_race_events(plays, 'home_team', 'away_team', lengths=lengths)[69] == dict(event, threshold=69)
+    assert parse_plays(plays, lengths)[1][3] == 2100, "pbp elapsed_seconds should use quarters"
+
+    detector = IncrementalR69Detector('home_team', 'away_team', lengths)
+    assert detector.feed(plays[:1]) is None
+    assert detector.feed(plays)['t_to_69'] == 2100
+
+    class WomensClient:
+        league = League.WOMENS
+
+        def get_play_by_play(self, game_id):
+            return {'plays': plays, 'header': {'competitions': [{'competitors': [
+                {'homeAway': 'home', 'id': 'home_team', 'team': {'displayName': 'Home U'}},
+                {'homeAway': 'away', 'id': 'away_team', 'team': {'displayName': 'Away State'}},
+            ]}]}}
+
+    _, live_event = GameProcessor(WomensClient()).process_live_play_by_play('401')
+    assert live_event.t_to_69 == 2100, "Live processing should use the client's league"
+
+    # Columnar: one men's and one women's game in the same batch
+    offsets = offsets_from_index([0, 0, 1, 1], 2)
+    elapsed = elapsed_by_game([4, 4, 2, 2], [330, 300, 330, 300], offsets, [QUARTERS, HALVES])
+    assert list(elapsed) == [2070, 2100, 2070, 2100]
+    print("✅ Test Case 17 PASSED: Women's quarters are used for elapsed time")
+
+
 if __name__ == '__main__':
     print("=" * 70)
     print("R69 Detection Algorithm - Test Suite")
@@ -168,6 +463,16 @@ if __name__ == '__main__':
         test_case_5_no_r69_event()
         test_case_6_tied_at_68()
         test_case_7_jump_to_70()
+        test_case_8_time_and_period()
+        test_case_9_incremental_matches_batch()
+        test_case_10_batch_analytics()
+        test_case_11_columnar_matches_batch()
+        test_case_12_race_to_n()
+        test_case_13_play_records()
+        test_case_14_selective_summary()
+        test_case_15_clock_parser()
+        test_case_16_r69_insert_idempotent()
+        test_case_17_womens_quarters()
 
         print()
         print("=" * 70)